@@ -0,0 +1,58 @@
+"""
+Requests/s auf ``/graphql`` durch den kompletten Middleware-Stack der App.
+
+Die Requests laufen in-process über ``httpx.ASGITransport``, also ohne Netzwerk
+und Server; gemessen wird der Overhead von Middleware, Tracing und GraphQL. Für
+einen Vorher/Nachher-Vergleich das Skript auf beiden Commits ausführen:
+
+    uv run python benchmarks/bench_graphql_requests.py
+    uv run python benchmarks/bench_graphql_requests.py --requests 5000
+
+Die Konfiguration kommt wie beim Service aus ``.env``; MongoDB und Kafka werden
+nicht gebraucht, weil die Abfrage nur das Schema introspektiert.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+import httpx
+from loguru import logger
+
+from analytics.fastapi_app import app
+
+QUERY = {"query": "{ __schema { queryType { name } } }"}
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+async def run(requests: int, warmup: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"traceparent": TRACEPARENT}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        for _ in range(warmup):
+            await c.post("/graphql", json=QUERY, headers=headers)
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = await c.post("/graphql", json=QUERY, headers=headers)
+            response.raise_for_status()
+        return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    logging.disable(logging.CRITICAL)
+    rates = [asyncio.run(run(args.requests, args.warmup)) for _ in range(args.repeat)]
+    print(f"/graphql: {max(rates):.0f} req/s (best of {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Dekodierung eines synthetischen Fetches mit 1M Kafka-Records.
+
+Vergleicht den früheren ``value_deserializer`` (``json.loads`` auf dem
+dekodierten Text für jeden Record im Fetcher, Header-``dict`` und Log-f-String
+je Nachricht) mit dem heutigen Weg des Consumers: Records ohne Handler werden
+übersprungen, Header erst bei Zugriff dekodiert (``KafkaHeaders``) und die
+Nutzlast direkt aus den Bytes gelesen, per ``orjson`` bzw. typisiert per
+``model_validate_json``. 20 % der Records liegen auf einem Topic ohne Handler:
+
+    uv run python benchmarks/bench_kafka_decode.py
+    uv run python benchmarks/bench_kafka_decode.py --records 200000
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections.abc import Callable
+
+import orjson
+from loguru import logger
+
+from analytics.messaging.dto.kpi_events import OrderCreatedEvent
+from analytics.messaging.kafka_headers import KafkaHeaders
+
+TOPIC = "kpi.create.order"
+PAYLOAD = orjson.dumps(
+    {
+        "orderId": "o-123",
+        "customerId": "c-42",
+        "createdAt": "2025-01-05T10:00:00+01:00",
+        "totalAmount": 129.9,
+        "products": 3,
+    }
+)
+HEADERS = [
+    ("x-event-id", b"4f1c2a9e"),
+    ("traceparent", b"00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"),
+    ("x-service", b"order"),
+]
+
+
+class Record:
+    """Die Felder eines aiokafka-``ConsumerRecord``, die der Consumer liest."""
+
+    __slots__ = ("headers", "topic", "value")
+
+    def __init__(self, topic: str, value: bytes, headers: list) -> None:
+        self.topic, self.value, self.headers = topic, value, headers
+
+
+def fetch(records: int) -> list[Record]:
+    topics = [TOPIC] * 8 + ["audit.other"] * 2
+    return [Record(topics[i % 10], PAYLOAD, HEADERS) for i in range(records)]
+
+
+def before(records: list[Record], registered: set[str]) -> None:
+    for record in records:
+        value = json.loads(record.value.decode("utf-8"))
+        headers = {name: raw.decode("utf-8") for name, raw in record.headers}
+        logger.debug(f"📥 Kafka MSG: {value} on topic={record.topic} headers={headers}")
+        if record.topic not in registered:
+            continue
+
+
+def lazy(decode: Callable[[bytes], object]) -> Callable:
+    def after(records: list[Record], registered: set[str]) -> None:
+        for record in records:
+            if record.topic not in registered:
+                continue
+            headers = KafkaHeaders(record.headers)
+            logger.debug(
+                "📥 Kafka MSG: {} on topic={} headers={}",
+                record.value,
+                record.topic,
+                headers,
+            )
+            decode(record.value)
+
+    return after
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    records = fetch(args.records)
+    registered = {TOPIC}
+    variants = {
+        "json.loads im Fetcher": before,
+        "orjson, lazy": lazy(orjson.loads),
+        "model_validate_json, lazy": lazy(OrderCreatedEvent.model_validate_json),
+    }
+    for name, variant in variants.items():
+        started = time.perf_counter()
+        variant(records, registered)
+        seconds = time.perf_counter() - started
+        print(
+            f"{name:<26} {seconds:6.2f} s  "
+            f"{seconds / args.records * 1e9:5.0f} ns/Record"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Dekodierkosten je Zeile für 10k KPI-Dokumente in ``run_kpi_query``.
+
+Vergleicht den früheren Weg (Beanie-Dokument per pydantic validieren, ``dict()``,
+``dto_cls(**...)``) mit ``analytics.graphql.query._decode``, das die DTOs direkt
+aus den rohen Motor-Dokumenten baut, einmal mit allen Feldern und einmal nur
+mit den Feldern einer typischen Auswahl:
+
+    uv run python benchmarks/bench_kpi_decode.py
+    uv run python benchmarks/bench_kpi_decode.py --rows 100000
+
+Die Dokumente werden im Speicher erzeugt. Nur ``init_beanie`` braucht für den
+alten Weg die MongoDB aus ``.env``; gelesen oder geschrieben wird dort nichts.
+"""
+
+import argparse
+import asyncio
+import sys
+import timeit
+from uuid import uuid4
+
+from beanie import init_beanie
+from bson import Binary
+from loguru import logger
+
+from analytics.config.mongo import MONGO_DB_DATABASE, client
+from analytics.graphql.query import _decode, _graphql_field_names
+from analytics.model.entity.order_kpi import OrderKPI, OrderKPIType
+
+
+def documents(rows: int) -> list[dict]:
+    return [
+        {
+            "_id": Binary.from_uuid(uuid4()),
+            "year": 2000 + i // 12,
+            "month": i % 12 + 1,
+            "total_orders": i,
+            "basket_size_sum": 3.0 * i,
+            "order_value_sum": 42.5 * i,
+        }
+        for i in range(rows)
+    ]
+
+
+def pydantic_rows(docs: list[dict]) -> list[OrderKPIType]:
+    """Der Weg vor der Umstellung: ein Beanie-Dokument und ein ``dict`` je Zeile."""
+    return [
+        OrderKPIType(
+            **OrderKPI.model_validate({**doc, "id": doc["_id"].as_uuid()}).dict()
+        )
+        for doc in docs
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    asyncio.run(
+        init_beanie(
+            database=client[MONGO_DB_DATABASE],
+            document_models=[OrderKPI],
+            skip_indexes=True,
+        )
+    )
+    docs = documents(args.rows)
+    all_fields = frozenset(_graphql_field_names(OrderKPIType).values())
+    selected = frozenset({"year", "month", "total_orders"})
+    variants = {
+        "pydantic + dict()": lambda: pydantic_rows(docs),
+        "_decode, alle Felder": (
+            lambda: _decode(OrderKPI, OrderKPIType, all_fields, docs)
+        ),
+        "_decode, 3 Felder": lambda: _decode(OrderKPI, OrderKPIType, selected, docs),
+    }
+    for name, variant in variants.items():
+        seconds = min(timeit.repeat(variant, number=1, repeat=args.repeat))
+        print(f"{name:<22} {seconds / args.rows * 1e6:6.2f} µs/Zeile")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Lasttest für konkurrierende KPI-Writer auf denselben Monat (Sharded Counter).
+
+Jeder Locust-User ist ein Writer, der wie ein Consumer pro Event einen
+``$inc``-Upsert auf den laufenden Monat von ``OrderKPI`` schickt. Der Durchsatz
+(req/s) mit ``KPI_SHARDS=1`` zeigt den Hotspot eines einzelnen Dokuments, mit
+``KPI_SHARDS=8`` verteilen sich dieselben Writes auf acht Teil-Dokumente:
+
+    KPI_SHARDS=1 uv run locust -f benchmarks/locustfile_kpi_writes.py \\
+        --headless -u 64 -r 64 -t 60s
+    KPI_SHARDS=8 uv run locust -f benchmarks/locustfile_kpi_writes.py \\
+        --headless -u 64 -r 64 -t 60s
+
+MongoDB-URI und Datenbank kommen wie beim Service aus ``.env``. Geschrieben wird
+in eine eigene Datenbank ``<MONGO_DB_DATABASE>_loadtest``, die vor jedem Lauf
+geleert wird.
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Final
+
+from locust import User, constant, events, task
+from pymongo import MongoClient
+
+from analytics.config import env
+from analytics.model.entity.base import IngestionBucket, IngestionLayout
+from analytics.model.entity.order_kpi import OrderKPI
+
+LAYOUT: Final = IngestionLayout(
+    bucket=IngestionBucket.MONTH, shards=int(os.environ.get("KPI_SHARDS", "1"))
+)
+DATABASE: Final = f"{env.MONGO_DB_DATABASE}_loadtest"
+COLLECTION: Final = (
+    OrderKPI.Settings.name
+    if LAYOUT.direct
+    else f"{OrderKPI.Settings.name}_{LAYOUT.suffix}"
+)
+
+
+@events.test_start.add_listener
+def _reset(environment, **kwargs) -> None:
+    client = MongoClient(env.MONGO_DB_URI)
+    client.drop_database(DATABASE)
+    client[DATABASE][COLLECTION].create_indexes([LAYOUT.index])
+    client.close()
+
+
+class KpiWriter(User):
+    """Ein Consumer, der ohne Pause Bestellungen für den laufenden Monat zählt."""
+
+    wait_time = constant(0)
+
+    def on_start(self) -> None:
+        self._client = MongoClient(env.MONGO_DB_URI)
+        self._collection = self._client[DATABASE][COLLECTION]
+        now = datetime.now()
+        self._month = (now.year, now.month)
+
+    def on_stop(self) -> None:
+        self._client.close()
+
+    @task
+    def increment(self) -> None:
+        deltas = {"total_orders": 1, "basket_size_sum": 3.0, "order_value_sum": 42.5}
+        if LAYOUT.direct:
+            operation = OrderKPI.increment_operation(*self._month, **deltas)
+        else:
+            key = LAYOUT.document_key(self._month)
+            operation = OrderKPI.increment_bucket_operation(key, deltas)
+        started = time.perf_counter()
+        exception = None
+        try:
+            self._collection.bulk_write([operation])
+        except Exception as e:
+            exception = e
+        self.environment.events.request.fire(
+            request_type="mongo",
+            name=f"$inc {LAYOUT.suffix} shards={LAYOUT.shards}",
+            response_time=(time.perf_counter() - started) * 1000,
+            response_length=0,
+            exception=exception,
+            context={},
+        )
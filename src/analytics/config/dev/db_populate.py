@@ -1,6 +1,7 @@
 from loguru import logger
 from analytics.config import dev
 from analytics.config.dev.source_raw_kpi_entries import RAW_KPI_ENTRIES
+from analytics.model.entity.base import ROLLUPS
 from analytics.model.entity.revenue_kpi import RevenueKPI
 from analytics.model.entity.customer_growth_kpi import CustomerGrowthKPI
 from analytics.model.entity.order_kpi import OrderKPI
@@ -32,15 +33,19 @@ async def mongo_populate():
 
     logger.warning(">>> MongoDB wird im DEV-Modus befüllt <<<")
 
-    # Bestehende KPI-Daten löschen
+    # Bestehende KPI-Daten löschen; die Rollups entstehen beim Befüllen neu
     for model_cls in MODEL_MAP.values():
         deleted = await model_cls.find_all().delete()
         logger.info(f"🗑️  {deleted} Einträge aus {model_cls.__name__} gelöscht")
+        for granularity in ROLLUPS:
+            await model_cls.collection(granularity).delete_many({})
 
     # Neue Testdaten einfügen
+    # Mehrfache Einträge für denselben Monat werden wegen des eindeutigen
+    # (year, month)-Index aufsummiert statt doppelt eingefügt.
     for entry in RAW_KPI_ENTRIES:
         model_cls = MODEL_MAP[entry["model"]]
-        obj = model_cls(**entry["data"])
-        await obj.insert()
+        fields = dict(entry["data"])
+        await model_cls.increment(fields.pop("year"), fields.pop("month"), **fields)
 
     logger.success("✅ KPI-Testdaten erfolgreich eingefügt.")
@@ -0,0 +1,35 @@
+"""Konfiguration für das Speicherlayout eingehender KPI-Inkremente."""
+
+from typing import Final
+from zoneinfo import ZoneInfo
+
+from analytics.config.config import app_config
+from analytics.model.entity.base import IngestionBucket, IngestionLayout
+
+__all__ = ["ingestion_layout", "ingestion_rollup_interval", "ingestion_timezone"]
+
+
+_ingestion_toml: Final = app_config.get("ingestion", {})
+
+ingestion_layout: Final = IngestionLayout(
+    bucket=IngestionBucket[str(_ingestion_toml.get("bucket", "month")).upper()],
+    shards=int(_ingestion_toml.get("shards", 1)),
+)
+"""Bucket-Ebene (month, day, hour; default: month) und Anzahl Shards (default: 1)."""
+
+ingestion_rollup_interval: Final[float] = float(
+    _ingestion_toml.get("rollup-interval", 30)
+)
+"""
+Sekunden zwischen zwei Rollups geänderter Monate (default: 30). Abfragen lesen
+die Monatsdokumente; neue Bucket-Inkremente werden dort erst mit dem nächsten
+Rollup sichtbar.
+"""
+
+ingestion_timezone: Final[ZoneInfo | None] = (
+    ZoneInfo(str(_ingestion_toml["timezone"]))
+    if "timezone" in _ingestion_toml
+    else None
+)
+"""Berichts-Zeitzone der KPI-Buckets, z. B. "Europe/Berlin" (default: Ortszeit des
+Event-Zeitstempels)."""
@@ -7,6 +7,54 @@ class KafkaSettings(BaseSettings):
     bootstrap_servers: str = env.KAFKA_URI
     topic_log: str = "logstream.log.analytics"
     client_id: str = env.PROJECT_NAME
+    batch_enabled: bool = False
+    """Events per ``getmany()`` abholen und je KPI-Bucket gebündelt schreiben."""
+    batch_max_records: int = 500
+    """Maximale Anzahl Events pro Batch."""
+    batch_timeout_ms: int = 200
+    """Maximale Wartezeit auf neue Events pro Batch in Millisekunden."""
+    lane_queue_size: int = 1000
+    """Maximale Anzahl wartender Events je Stufe einer Partitions-Lane."""
+    lane_high_watermark: int = 800
+    """Ab so vielen offenen Events in einer Lane wird ihre Partition pausiert."""
+    lane_low_watermark: int = 200
+    """Bei so wenigen offenen Events wird eine pausierte Partition fortgesetzt."""
+    lane_drain_timeout_ms: int = 10_000
+    """So lange werden die Lanes entzogener Partitionen beim Rebalance abgearbeitet."""
+    commit_interval_ms: int = 1000
+    """Spätestens nach so vielen Millisekunden werden geschriebene Offsets
+    committet."""
+    commit_max_events: int = 1000
+    """Spätestens nach so vielen geschriebenen Events werden Offsets committet."""
+    write_max_retries: int = 5
+    """Wiederholungen eines vorübergehend fehlgeschlagenen KPI-Writes, bevor das
+    Event ins Dead-Letter-Topic geht."""
+    dead_letter_enabled: bool = True
+    """Ungültige Events an das Dead-Letter-Topic ``<topic><dead_letter_suffix>``
+    senden."""
+    dead_letter_suffix: str = ".dlq"
+    """Suffix der Dead-Letter-Topics."""
+    dedup_enabled: bool = False
+    """Erneut zugestellte Events am Header ``x-event-id`` bzw. an Topic, Partition
+    und Offset erkennen und verwerfen."""
+    dedup_window: int = 100_000
+    """Anzahl zuletzt geschriebener Events, die exakt erkannt werden."""
+    dedup_capacity: int = 250_000
+    """Events je Bloom-Filter-Generation; ältere Events erkennt der Filter."""
+    dedup_snapshot_path: str | None = None
+    """Datei, in die der Dedup-Index vor jedem Offset-Commit geschrieben wird;
+    bestätigte Schlüssel hängt ``confirm`` sofort an ``<Datei>.log`` an."""
+    accumulator_enabled: bool = False
+    """Deltas im Speicher sammeln (Write-Behind) und Offsets erst nach dem Flush
+    committen; hat Vorrang vor ``batch_enabled``."""
+    accumulator_flush_interval_ms: int = 1000
+    """Spätestens nach so vielen Millisekunden werden die Deltas geschrieben."""
+    accumulator_flush_max_events: int = 5000
+    """Spätestens nach so vielen Events werden die Deltas geschrieben."""
+    journal_path: str | None = None
+    """Datei des mmap-Journals für noch nicht geschriebene Deltas (None = aus)."""
+    journal_size_bytes: int = 16 * 1024 * 1024
+    """Feste Größe der Journal-Datei; ist sie voll, wird vorzeitig geschrieben."""
 
     class Config:
         env_prefix = "KAFKA_"
@@ -0,0 +1,33 @@
+"""Konfiguration für die Token-Verifikation mit Keycloak."""
+
+from pydantic_settings import BaseSettings
+
+from analytics.config import env
+
+__all__ = ["KeycloakSettings", "get_keycloak_settings"]
+
+
+class KeycloakSettings(BaseSettings):
+    jwks_url: str = (
+        f"http://{env.KC_SERVICE_HOST}:{env.KC_SERVICE_PORT}/auth/realms/"
+        f"{env.KC_SERVICE_REALM}/protocol/openid-connect/certs"
+    )
+    jwks_ttl_seconds: float = 300.0
+    """Alter, ab dem der JWKS-Cache beim nächsten Zugriff neu geladen wird."""
+    jwks_refresh_interval_seconds: float = 240.0
+    """Intervall der Hintergrund-Aktualisierung des JWKS-Caches."""
+    jwks_min_refresh_interval_seconds: float = 10.0
+    """Mindestabstand zwischen zwei Abrufen, z.B. bei unbekannten ``kid``s."""
+    jwks_timeout_seconds: float = 5.0
+    """Timeout für den Abruf des JWKS."""
+    token_cache_size: int = 1024
+    """Maximale Anzahl verifizierter Tokens im Cache (0 deaktiviert den Cache)."""
+    token_cache_max_ttl_seconds: float = 300.0
+    """Maximale Verweildauer eines Tokens im Cache, unabhängig von ``exp``."""
+
+    class Config:
+        env_prefix = "KEYCLOAK_"
+
+
+def get_keycloak_settings() -> KeycloakSettings:
+    return KeycloakSettings()
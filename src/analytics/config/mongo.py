@@ -3,12 +3,19 @@ MongoDB-Verbindung initialisieren für Beanie + Motor.
 """
 
 from typing import Final
+from uuid import uuid4
 
 from beanie import init_beanie
+from bson import Binary
 from loguru import logger
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import OperationFailure
+from tabulate import tabulate
 
 from analytics.config import env
+from analytics.config.ingestion import ingestion_layout
+from analytics.model.entity.base import REVISION_FIELD, ROLLUPS, BaseKPI, Granularity
 from analytics.model.entity.customer_growth_kpi import CustomerGrowthKPI
 from analytics.model.entity.invoice_kpi import InvoiceKPI
 from analytics.model.entity.order_kpi import OrderKPI
@@ -18,7 +25,13 @@ from analytics.model.entity.system_kpi import SystemKPI
 from analytics.model.entity.transaction_kpi import TransactionKPI
 
 
-__all__ = ["init_mongo"]
+__all__ = [
+    "KPI_MODELS",
+    "ensure_kpi_indexes",
+    "ensure_kpi_rollups",
+    "init_mongo",
+    "rebuild_kpi_rollup",
+]
 
 # Konfiguration aus der .env via pydantic-settings
 MONGO_DB_URI: Final[str] = env.MONGO_DB_URI
@@ -27,6 +40,16 @@ MONGO_DB_DATABASE: Final[str] = env.MONGO_DB_DATABASE
 # Der globale Client kann bei Bedarf wiederverwendet werden
 client: Final = AsyncIOMotorClient(MONGO_DB_URI)
 
+KPI_MODELS: Final[list[type[BaseKPI]]] = [
+    RevenueKPI,
+    CustomerGrowthKPI,
+    OrderKPI,
+    TransactionKPI,
+    InvoiceKPI,
+    SupportKPI,
+    SystemKPI,
+]
+
 
 async def init_mongo() -> None:
     """
@@ -35,19 +58,178 @@ async def init_mongo() -> None:
     """
     logger.info("🔌 Initialisiere MongoDB-Client mit URI {}", MONGO_DB_URI)
 
+    # Indizes werden nicht von Beanie, sondern von ensure_kpi_indexes() angelegt,
+    # damit ein fehlschlagender Index den Start nicht abbricht.
     await init_beanie(
         database=client[MONGO_DB_DATABASE],
-        document_models=[
-            RevenueKPI,
-            CustomerGrowthKPI,
-            OrderKPI,
-            TransactionKPI,
-            InvoiceKPI,
-            SupportKPI,
-            SystemKPI,
-        ],
+        document_models=KPI_MODELS,
+        skip_indexes=True,
+    )
+    report = await ensure_kpi_indexes()
+    logger.info(
+        "📇 KPI-Indizes:\n{}",
+        tabulate(report, headers=["Collection", "Index", "Status"]),
+    )
+    rollups = await ensure_kpi_rollups()
+    logger.info(
+        "🧾 KPI-Rollups:\n{}",
+        tabulate(rollups, headers=["Collection", "Dokumente", "Status"]),
     )
 
     logger.success(
         "✅ MongoDB-Initialisierung abgeschlossen (DB: {})", MONGO_DB_DATABASE
     )
+
+
+async def ensure_kpi_indexes() -> list[tuple[str, str, str]]:
+    """
+    Legt die in ``Settings.indexes`` deklarierten Indizes aller KPI-Collections an.
+
+    Ein vorhandener Index auf denselben Feldern, dem ``unique`` fehlt (oder der
+    unerwartet eindeutig ist), wird ersetzt, denn die Upserts über (year,
+    month) setzen einen eindeutigen Index voraus. Scheitert das an
+    doppelten Dokumenten, bleibt der bisherige Index bestehen.
+
+    :return: Je Collection und Index ein Tupel (Collection, Index, Status) mit
+        Status ``vorhanden``, ``angelegt``, ``neu angelegt``, ``nicht eindeutig``
+        oder ``fehlgeschlagen``
+    """
+    report: list[tuple[str, str, str]] = []
+    for model in KPI_MODELS:
+        # Die Rollup-Collections bekommen dieselben Indizes wie die Monatswerte.
+        for granularity in Granularity:
+            collection = model.collection(granularity)
+            existing = await collection.index_information()
+
+            for index_field in model.get_settings().indexes:
+                status = await _ensure_index(collection, index_field.index, existing)
+                report.append((collection.name, index_field.name, status))
+
+        if not ingestion_layout.direct:
+            collection = model.bucket_collection(ingestion_layout)
+            existing = await collection.index_information()
+            index = ingestion_layout.index
+            status = await _ensure_index(collection, index, existing)
+            report.append((collection.name, index.document["name"], status))
+    return report
+
+
+async def ensure_kpi_rollups() -> list[tuple[str, int, str]]:
+    """
+    Baut leere Rollup-Collections aus den Monatswerten auf.
+
+    Danach erhöhen ``BaseKPI.increment`` bzw. ``KpiBatch`` die Rollups im selben
+    ``bulk_write`` wie den Monat; im Rollup aus Buckets summiert
+    ``BaseKPI.refresh_rollups`` sie neu.
+    Bereits befüllte Rollups bleiben unangetastet, damit ein Neustart keine
+    parallel eintreffenden Inkremente überschreibt.
+
+    :return: Je Rollup-Collection ein Tupel (Collection, Dokumente, Status) mit
+        Status ``vorhanden``, ``aufgebaut``, ``leer`` oder ``fehlgeschlagen``
+    """
+    report: list[tuple[str, int, str]] = []
+    for model in KPI_MODELS:
+        for granularity in ROLLUPS:
+            collection = model.collection(granularity)
+            count = await collection.estimated_document_count()
+            status = "vorhanden"
+            if count == 0:
+                try:
+                    await rebuild_kpi_rollup(model, granularity)
+                except OperationFailure as e:
+                    # z.B. doppelte (year, month)-Rollups ohne eindeutigen Index
+                    logger.error(
+                        "❌ Rollup {} konnte nicht aufgebaut werden: {}",
+                        collection.name,
+                        e.details,
+                    )
+                    report.append((collection.name, 0, "fehlgeschlagen"))
+                    continue
+                count = await collection.estimated_document_count()
+                status = "aufgebaut" if count else "leer"
+            report.append((collection.name, count, status))
+    return report
+
+
+async def rebuild_kpi_rollup(model: type[BaseKPI], granularity: Granularity) -> None:
+    """
+    Summiert die Monatswerte von ``model`` per ``$group`` zu Perioden und schreibt
+    sie per Bulk-Upsert in die Rollup-Collection; neue Rollups bekommen wie alle
+    KPI-Dokumente eine UUID als ``_id``.
+    """
+    fields = [*model.stored_fields(), REVISION_FIELD]
+    offset = {"$mod": [{"$subtract": ["$month", 1]}, granularity.value]}
+    period_start = {"$subtract": ["$month", offset]}
+    pipeline = [
+        {
+            "$group": {
+                "_id": {"year": "$year", "month": period_start},
+                **{name: {"$sum": f"${name}"} for name in fields},
+            }
+        },
+    ]
+    periods = await model.get_motor_collection().aggregate(pipeline).to_list(None)
+    if not periods:
+        return
+    await model.collection(granularity).bulk_write(
+        [
+            UpdateOne(
+                period["_id"],
+                {
+                    "$set": {name: period[name] for name in fields},
+                    "$setOnInsert": {"_id": Binary.from_uuid(uuid4())},
+                },
+                upsert=True,
+            )
+            for period in periods
+        ],
+        ordered=False,
+    )
+
+
+async def _ensure_index(collection, index: IndexModel, existing: dict) -> str:
+    key = list(index.document["key"].items())
+    unique = index.document.get("unique", False)
+    current = next(
+        ((name, info) for name, info in existing.items() if list(info["key"]) == key),
+        None,
+    )
+    if current is not None:
+        name, info = current
+        if info.get("unique", False) == unique:
+            return "vorhanden"
+        # MongoDB erlaubt je Schlüssel nur einen Index: ersetzen statt ergänzen
+        logger.warning(
+            "⚠️ Index {} in {} hat unique={}, erwartet {}; wird neu angelegt",
+            name,
+            collection.name,
+            info.get("unique", False),
+            unique,
+        )
+        await collection.drop_index(name)
+
+    try:
+        await collection.create_indexes([index])
+    except OperationFailure as e:
+        # z.B. doppelte (year, month)-Dokumente aus der Zeit vor dem Index
+        logger.error(
+            "❌ Index {} für {} konnte nicht angelegt werden: {}",
+            index.document["name"],
+            collection.name,
+            e.details,
+        )
+        if current is None:
+            return "fehlgeschlagen"
+        # Den bisherigen Index wiederherstellen, damit Abfragen schnell bleiben
+        name, info = current
+        await collection.create_indexes([IndexModel(info["key"], name=name)])
+        return "nicht eindeutig"
+
+    if current is not None:
+        return "neu angelegt"
+    logger.warning(
+        "⚠️ Index {} fehlte in {} und wurde angelegt",
+        index.document["name"],
+        collection.name,
+    )
+    return "angelegt"
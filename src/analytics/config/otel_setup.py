@@ -12,13 +12,11 @@ from opentelemetry.sdk.metrics import MeterProvider
 from opentelemetry.exporter.prometheus import PrometheusMetricReader
 
 from opentelemetry import trace
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.pymongo import PymongoInstrumentor
 from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
-from opentelemetry.instrumentation.asgi import OpenTelemetryMiddleware
 
 from analytics.config import env
 from analytics.config.kafka import get_kafka_settings
@@ -40,10 +38,9 @@ def setup_otel(app):
     span_processor = BatchSpanProcessor(otlp_exporter)
     provider.add_span_processor(span_processor)
 
-    # Instrumentiere FastAPI und MongoDB
-    FastAPIInstrumentor().instrument_app(app)
+    # Instrumentiere MongoDB
     PymongoInstrumentor().instrument()
 
-    # 🛠 TraceContextMiddleware aktivieren
+    # 🛠 TraceContextMiddleware aktivieren: einziger Server-Span pro HTTP-Request
+    # (ersetzt FastAPIInstrumentor + OpenTelemetryMiddleware)
     app.add_middleware(TraceContextMiddleware)
-    app.add_middleware(OpenTelemetryMiddleware)
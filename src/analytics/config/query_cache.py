@@ -0,0 +1,19 @@
+"""Konfiguration für den Ergebnis-Cache der KPI-Abfragen."""
+
+from typing import Final
+
+from analytics.config.config import app_config
+
+__all__ = ["query_cache_enabled", "query_cache_max_entries", "query_cache_ttl"]
+
+
+_query_cache_toml: Final = app_config.get("query-cache", {})
+
+query_cache_enabled: Final[bool] = bool(_query_cache_toml.get("enabled", False))
+"""Flag, ob KPI-Abfragen an MongoDB zwischengespeichert werden (default: False)."""
+
+query_cache_max_entries: Final[int] = int(_query_cache_toml.get("max-entries", 1024))
+"""Maximale Anzahl zwischengespeicherter Abfragen (LRU)."""
+
+query_cache_ttl: Final[float] = float(_query_cache_toml.get("ttl", 300))
+"""Sekunden, die ein Ergebnis höchstens zwischengespeichert wird."""
@@ -0,0 +1,18 @@
+"""Konfiguration für das In-Memory-Lesemodell der KPIs."""
+
+from typing import Final
+
+from analytics.config.config import app_config
+
+__all__ = ["read_model_enabled", "read_model_refresh_interval"]
+
+
+_read_model_toml: Final = app_config.get("read-model", {})
+
+read_model_enabled: Final[bool] = bool(_read_model_toml.get("enabled", False))
+"""Flag, ob GraphQL-Abfragen aus dem Lesemodell beantwortet werden (default: False)."""
+
+read_model_refresh_interval: Final[float] = float(
+    _read_model_toml.get("refresh-interval", 60)
+)
+"""Sekunden zwischen zwei vollständigen Neuladevorgängen aus MongoDB (0 = nie)."""
@@ -1,11 +1,11 @@
 """MainApp."""
 
-from collections.abc import AsyncGenerator, Awaitable, Callable
+from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Final
+from typing import Final
 
-from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from loguru import logger
@@ -19,9 +19,13 @@ from analytics.error.exceptions import NotAllowedError, NotFoundError, VersionOu
 from analytics.graphql.schema import graphql_router
 from analytics.messaging.kafka_producer_service import KafkaProducerService
 from analytics.messaging.kafka_singleton import get_kafka_consumer, get_kafka_producer
-from analytics.security.keycloak_service import KeycloakService
+from analytics.security.jwks_cache import get_jwks_cache
+from analytics.security.keycloak_middleware import KeycloakMiddleware
 
 from analytics.health.router import router as health_router
+from analytics.router.read_model_router import router as read_model_router
+from analytics.services.kpi_read_model import get_kpi_read_model
+from analytics.services.kpi_rollup_service import get_kpi_rollup_service
 
 from .banner import banner
 
@@ -46,20 +50,35 @@ kafka_producer = KafkaProducerService()
 async def lifespan(app: FastAPI) -> AsyncGenerator[None]:  # noqa: RUF029
     """Startup/Shutdown-Logik: MongoDB, Kafka, Banner."""
     await init_mongo()
+    rollup_service = get_kpi_rollup_service()
+    if rollup_service is not None:
+        await rollup_service.start()
     kafka_consumer = await get_kafka_consumer()
     kafka_producer = get_kafka_producer()
 
+    if dev:
+        await mongo_populate()
+    # Das Lesemodell muss vor dem Consumer laufen, sonst fehlen ihm dessen Writes
+    read_model = get_kpi_read_model()
+    if read_model is not None:
+        await read_model.start()
+
     logger.info("Starte Kafka Producer…")
     await kafka_producer.start()
     await kafka_consumer.start()
-    if dev:
-        await mongo_populate()
+    await get_jwks_cache().start()
     banner(app.routes)
     yield
 
     logger.info("← Shutting down services…")
-    await kafka_producer.stop()
+    # Erst den Consumer: Beim Stoppen können noch Dead-Letter-Events anfallen
     await kafka_consumer.stop()
+    await kafka_producer.stop()
+    if rollup_service is not None:
+        await rollup_service.stop()
+    await get_jwks_cache().stop()
+    if read_model is not None:
+        await read_model.stop()
     logger.info("Der Server wird heruntergefahren")
 
 if env.APP_ENV == "development":
@@ -79,28 +98,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-
-@app.middleware("http")
-async def inject_keycloak(request: Request, call_next):
-    # Sonderfall: Introspection oder kein Token
-    try:
-        body = await request.body()
-        if b"__schema" in body or b"__introspection" in body:
-            request.state.keycloak = None
-            return await call_next(request)
-    except Exception:
-        request.state.keycloak = None
-        return await call_next(request)
-
-    # Normale Authentifizierung
-    try:
-        request.state.keycloak = await KeycloakService.create(request)
-    except HTTPException as e:
-        logger.warning("Keycloak Token-Fehler: {}", e.detail)
-        request.state.keycloak = None  # sicherstellen, dass Attribut gesetzt ist
-
-    return await call_next(request)
+app.add_middleware(KeycloakMiddleware)
 
 
 # Setup Observability
@@ -110,6 +108,7 @@ Instrumentator().instrument(app).expose(app)  # Prometheus-Metriken
 # R E S T
 # --------------------------------------------------------------------------------------
 app.include_router(health_router)
+app.include_router(read_model_router)
 
 
 # --------------------------------------------------------------------------------------
@@ -3,6 +3,11 @@ from typing import Optional
 
 import strawberry
 
+from analytics.model.entity.base import Granularity
+
+MonthRange = tuple[tuple[int, int], tuple[int, int]]
+"""Zeitraum als (erster Monat, letzter Monat), jeweils (Jahr, Monat) inklusive."""
+
 
 @strawberry.input
 class KpiFilter:
@@ -10,3 +15,43 @@ class KpiFilter:
     month: Optional[int] = None
     from_date: Optional[date] = None
     to_date: Optional[date] = None
+    granularity: Granularity = Granularity.MONTH
+
+
+def month_range(filter: KpiFilter) -> Optional[MonthRange]:
+    """
+    Ermittelt die vom Filter abgedeckten Monate.
+
+    Bei ``from_date``/``to_date`` zählt ein Monat, wenn sein Monatserster im
+    Zeitraum liegt. Bei Quartalen bzw. Jahren wird der Zeitraum auf alle
+    Perioden erweitert, die einen dieser Monate enthalten.
+
+    :return: Zeitraum oder ``None``, falls der Filter alle Monate umfasst
+    """
+    if filter.year and filter.month:
+        months = (filter.year, filter.month), (filter.year, filter.month)
+    elif filter.year:
+        months = (filter.year, 1), (filter.year, 12)
+    elif filter.from_date and filter.to_date:
+        first = (filter.from_date.year, filter.from_date.month)
+        if filter.from_date.day > 1:
+            first = _next_month(*first)
+        months = first, (filter.to_date.year, filter.to_date.month)
+    else:
+        return None
+    return _align(months, filter.granularity)
+
+
+def _align(months: MonthRange, granularity: Granularity) -> MonthRange:
+    (from_year, from_month), (to_year, to_month) = months
+    if granularity is Granularity.MONTH or months[0] > months[1]:
+        return months
+    to_start = granularity.period_start(to_month)
+    return (
+        (from_year, granularity.period_start(from_month)),
+        (to_year, to_start + granularity.value - 1),
+    )
+
+
+def _next_month(year: int, month: int) -> tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
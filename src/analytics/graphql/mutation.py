@@ -1,6 +1,8 @@
 import strawberry
 
 from analytics.config.dev.db_populate import mongo_populate
+from analytics.services.kpi_query_cache import get_kpi_query_cache
+from analytics.services.kpi_read_model import get_kpi_read_model
 
 
 @strawberry.type
@@ -8,4 +10,11 @@ class Mutation:
     @strawberry.mutation
     async def dev_seed_kpis(self) -> bool:
         await mongo_populate()
+        # Der Seed ersetzt alle KPI-Daten, ohne ``notify_kpi_written`` auszulösen
+        cache = get_kpi_query_cache()
+        if cache is not None:
+            cache.clear()
+        read_model = get_kpi_read_model()
+        if read_model is not None:
+            await read_model.reload()
         return True
@@ -1,6 +1,11 @@
-from typing import List, Optional, Type, TypeVar
+import asyncio
+from functools import cache
+from typing import Iterable, Iterator, List, Optional, Type, TypeVar
 import strawberry
-from analytics.graphql.filters import KpiFilter
+from strawberry.types.nodes import SelectedField, Selection
+from strawberry.utils.str_converters import to_camel_case
+from analytics.graphql.filters import KpiFilter, MonthRange, month_range
+from analytics.model.entity.base import DELTA_FIELDS, Granularity, format_kpi_id
 from analytics.model.entity.customer_growth_kpi import CustomerGrowthKPI, CustomerGrowthKPIType
 from analytics.model.entity.invoice_kpi import InvoiceKPI, InvoiceKPIType
 from analytics.model.entity.order_kpi import OrderKPI, OrderKPIType
@@ -8,35 +13,205 @@ from analytics.model.entity.revenue_kpi import RevenueKPI, RevenueKPIType
 from analytics.model.entity.support_kpi import SupportKPI, SupportKPIType
 from analytics.model.entity.system_kpi import SystemKPI, SystemKPIType
 from analytics.model.entity.transaction_kpi import TransactionKPI, TransactionKPIType
+from analytics.services.kpi_query_cache import get_kpi_query_cache
+from analytics.services.kpi_read_model import get_kpi_read_model
 
 
 T = TypeVar("T")
 
 def build_filter_query(filter: KpiFilter) -> dict:
     if filter.year and filter.month:
-        return {"year": filter.year, "month": filter.month}
+        month = filter.granularity.period_start(filter.month)
+        return {"year": filter.year, "month": month}
     elif filter.year:
         return {"year": filter.year}
     elif filter.from_date and filter.to_date:
-        return {
-            "$expr": {
-                "$and": [
-                    {
-                        "$gte": [
-                            {"$dateFromParts": {"year": "$year", "month": "$month"}},
-                            {"$date": filter.from_date.isoformat()},
-                        ]
-                    },
-                    {
-                        "$lte": [
-                            {"$dateFromParts": {"year": "$year", "month": "$month"}},
-                            {"$date": filter.to_date.isoformat()},
-                        ]
+        return build_month_range_query(*month_range(filter))
+    return {}
+
+
+def build_month_range_query(
+    from_month: tuple[int, int], to_month: tuple[int, int]
+) -> dict:
+    """
+    Filter für alle Monate von ``from_month`` bis ``to_month`` (jeweils inklusive).
+
+    Statt ``$expr`` mit ``$dateFromParts`` entstehen reine Bereichsprädikate auf
+    ``year`` und ``month``, sodass MongoDB den (year, month)-Index nutzen kann.
+
+    :param from_month: Erster Monat als (Jahr, Monat)
+    :param to_month: Letzter Monat als (Jahr, Monat)
+    :return: MongoDB-Filter
+    """
+    (from_year, first_month), (to_year, last_month) = from_month, to_month
+    if from_month > to_month:
+        return {"year": {"$in": []}}
+    if from_year == to_year:
+        return {"year": from_year, "month": {"$gte": first_month, "$lte": last_month}}
+
+    clauses: list[dict] = [{"year": from_year, "month": {"$gte": first_month}}]
+    if to_year - from_year > 1:
+        clauses.append({"year": {"$gt": from_year, "$lt": to_year}})
+    clauses.append({"year": to_year, "month": {"$lte": last_month}})
+    return {"$or": clauses}
+
+
+@cache
+def _graphql_field_names(dto_cls: type) -> dict[str, str]:
+    """GraphQL-Feldname → Python-Attribut eines Strawberry-Typs."""
+    return {
+        field.graphql_name or to_camel_case(field.python_name): field.python_name
+        for field in dto_cls.__strawberry_definition__.fields
+    }
+
+
+def selected_fields(info: strawberry.Info, dto_cls: type) -> frozenset[str]:
+    """
+    Python-Namen der Felder von ``dto_cls``, die das Selection Set anfragt.
+
+    Fragmente und Inline-Fragmente werden aufgelöst; ``__typename`` und
+    unbekannte Felder werden ignoriert.
+    """
+    return fields_of(
+        [s for field in info.selected_fields for s in field.selections], dto_cls
+    )
+
+
+def fields_of(selections: Iterable[Selection], dto_cls: type) -> frozenset[str]:
+    """Wie ``selected_fields``, aber für eine beliebige Liste von Selections."""
+    names = _graphql_field_names(dto_cls)
+    return frozenset(
+        names[field.name]
+        for field in flatten_selections(selections)
+        if field.name in names
+    )
+
+
+def flatten_selections(selections: Iterable[Selection]) -> Iterator[SelectedField]:
+    """Liefert die ausgewählten Felder, wobei Fragmente aufgelöst werden."""
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            yield selection
+        else:
+            yield from flatten_selections(selection.selections)
+
+
+def _decode(
+    model, dto_cls: Type[T], fields: frozenset[str], docs: list[dict]
+) -> List[T]:
+    """
+    Baut DTOs direkt aus rohen MongoDB-Dokumenten.
+
+    Es entsteht weder ein Beanie-Dokument noch ein Zwischen-``dict``; nur die
+    angefragten Felder werden gesetzt, fehlende bekommen den Default des Modells.
+    """
+    defaults = {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if name in fields and not field.is_required()
+    }
+    values = [name for name in fields if name != "id"]
+    with_id = "id" in fields
+    new = object.__new__
+    dtos: List[T] = []
+    for doc in docs:
+        dto = new(dto_cls)
+        attributes = dto.__dict__
+        for name in values:
+            attributes[name] = doc.get(name, defaults.get(name))
+        if with_id:
+            attributes["id"] = format_kpi_id(doc["_id"])
+        dtos.append(dto)
+    return dtos
+
+
+def build_derived_pipeline(
+    model,
+    months: Optional[MonthRange],
+    fields: frozenset[str],
+    sort: bool = True,
+    limit: Optional[int] = None,
+    granularity: Granularity = Granularity.MONTH,
+) -> list[dict]:
+    """
+    Aggregation, die die abgeleiteten Felder in ``fields`` in MongoDB berechnet.
+
+    Verhältnisse entstehen per ``$divide``, ``mom_delta``/``yoy_delta`` über
+    ``$setWindowFields`` mit Bereichsfenstern auf einem fortlaufenden Monatsindex.
+    Für die Deltas beginnt der ``$match`` zwölf Monate früher; die zusätzlichen
+    Monate werden nach der Fensterberechnung wieder entfernt. Zurück kommen nur
+    die angefragten Felder.
+
+    :param months: Zeitraum oder ``None`` für alle Monate
+    :param fields: Angefragte Python-Feldnamen
+    :param granularity: Bei Rollups vergleicht ``mom_delta`` mit der Vorperiode
+    :return: Aggregations-Pipeline
+    """
+    step = granularity.value
+    deltas = fields & DELTA_FIELDS if model.headline else frozenset()
+    pipeline: list[dict] = []
+    if months is not None:
+        (from_year, from_month), to_month = months
+        first = from_year * 12 + from_month - 1
+        match_year, match_month = divmod(first - 12 if deltas else first, 12)
+        from_month_match = (match_year, match_month + 1)
+        pipeline.append({"$match": build_month_range_query(from_month_match, to_month)})
+
+    if deltas:
+        headline = f"${model.headline}"
+        pipeline += [
+            {
+                "$set": {
+                    "_month_index": {
+                        "$add": [{"$multiply": ["$year", 12]}, "$month", -1]
+                    }
+                }
+            },
+            {
+                "$setWindowFields": {
+                    "sortBy": {"_month_index": 1},
+                    "output": {
+                        "_previous_month": {
+                            "$first": headline,
+                            "window": {"range": [-step, -step]},
+                        },
+                        "_previous_year": {
+                            "$first": headline,
+                            "window": {"range": [-12, -12]},
+                        },
                     },
+                }
+            },
+        ]
+        if months is not None:
+            pipeline.append({"$match": {"_month_index": {"$gte": first}}})
+
+    derived: dict = {}
+    for name, (numerator, denominator) in model.ratios.items():
+        if name in fields:
+            derived[name] = {
+                "$cond": [
+                    {"$gt": [f"${denominator}", 0]},
+                    {"$divide": [f"${numerator}", f"${denominator}"]},
+                    0,
                 ]
             }
-        }
-    return {}
+    # $subtract liefert null, wenn der Vormonat bzw. Vorjahresmonat fehlt.
+    if "mom_delta" in deltas:
+        derived["mom_delta"] = {"$subtract": [headline, "$_previous_month"]}
+    if "yoy_delta" in deltas:
+        derived["yoy_delta"] = {"$subtract": [headline, "$_previous_year"]}
+    if derived:
+        pipeline.append({"$set": derived})
+
+    if sort:
+        pipeline.append({"$sort": {"year": 1, "month": 1}})
+    if limit:
+        pipeline.append({"$limit": limit})
+    projection = {"year": 1, "month": 1}
+    projection.update(dict.fromkeys(fields - {"id"}, 1))
+    pipeline.append({"$project": projection})
+    return pipeline
 
 
 async def run_kpi_query(
@@ -45,63 +220,236 @@ async def run_kpi_query(
     filter: KpiFilter,
     sort: bool = True,
     limit: Optional[int] = None,
+    info: Optional[strawberry.Info] = None,
 ) -> List[T]:
-    query = build_filter_query(filter)
-    cursor = model.find(query)
-    if sort:
-        cursor.sort([("year", 1), ("month", 1)])
-    if limit:
-        cursor.limit(limit)
+    """
+    Liest die KPI-Dokumente eines Zeitraums als DTOs.
+
+    :param info: Resolver-Info; nur die darin angefragten Felder werden gelesen,
+        ohne ``info`` alle Felder
+    :return: DTOs, bei ``sort`` aufsteigend nach Jahr und Monat
+    """
+    fields = None if info is None else selected_fields(info, dto_cls)
+    return await query_kpis(model, dto_cls, filter, sort, limit, fields)
 
-    results = await cursor.to_list()
-    return [dto_cls(**r.dict()) for r in results]
+
+async def query_kpis(
+    model,
+    dto_cls: Type[T],
+    filter: KpiFilter,
+    sort: bool = True,
+    limit: Optional[int] = None,
+    fields: Optional[frozenset[str]] = None,
+) -> List[T]:
+    """
+    Wie ``run_kpi_query``, aber mit bereits ermittelten Feldern.
+
+    :param fields: Python-Namen der zu lesenden Felder; ``None`` liest alle
+    """
+    if fields is None:
+        fields = frozenset(_graphql_field_names(dto_cls).values())
+    months = month_range(filter)
+    read_model = get_kpi_read_model()
+    granularity = filter.granularity
+    # Das Lesemodell hält nur Monatswerte; Rollups kommen aus MongoDB.
+    if (
+        read_model is not None
+        and read_model.loaded
+        and granularity is Granularity.MONTH
+    ):
+        return read_model.query(model, dto_cls, months, limit, fields, sort)
+
+    cache = get_kpi_query_cache()
+    if cache is not None:
+        key = (model, months, sort, limit, fields, granularity)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        generation = cache.generation(model)
+
+    collection = model.collection(granularity)
+    if fields & model.derived_fields():
+        pipeline = build_derived_pipeline(
+            model, months, fields, sort, limit, granularity
+        )
+        cursor = collection.aggregate(pipeline)
+    else:
+        # year/month stehen immer in der Projektion, damit sie nie leer ist.
+        projection = {"year": 1, "month": 1}
+        projection.update(dict.fromkeys(fields - {"id"}, 1))
+        cursor = collection.find(build_filter_query(filter), projection)
+        if sort:
+            cursor = cursor.sort([("year", 1), ("month", 1)])
+        if limit:
+            cursor = cursor.limit(limit)
+
+    dtos = _decode(model, dto_cls, fields, await cursor.to_list(None))
+    if cache is not None:
+        # Deltas hängen auch von den zwölf Monaten vor dem Zeitraum ab.
+        lookback = 12 if fields & DELTA_FIELDS else 0
+        cache.put(key, generation, dtos, lookback)
+    return dtos
+
+
+@strawberry.type
+class KpiDashboardRowType:
+    """Alle KPI-Familien eines Monats; fehlt ein Dokument, ist das Feld ``null``."""
+
+    year: int
+    month: int
+    revenue: Optional[RevenueKPIType] = None
+    customer_growth: Optional[CustomerGrowthKPIType] = None
+    orders: Optional[OrderKPIType] = None
+    transactions: Optional[TransactionKPIType] = None
+    invoices: Optional[InvoiceKPIType] = None
+    support: Optional[SupportKPIType] = None
+    system: Optional[SystemKPIType] = None
+
+
+_FAMILIES: dict[str, tuple[type, type]] = {
+    "revenue": (RevenueKPI, RevenueKPIType),
+    "customer_growth": (CustomerGrowthKPI, CustomerGrowthKPIType),
+    "orders": (OrderKPI, OrderKPIType),
+    "transactions": (TransactionKPI, TransactionKPIType),
+    "invoices": (InvoiceKPI, InvoiceKPIType),
+    "support": (SupportKPI, SupportKPIType),
+    "system": (SystemKPI, SystemKPIType),
+}
+"""Feld der Dashboard-Zeile → (KPI-Dokument, DTO-Typ)."""
+
+_GRAPHQL_NAMES: dict[str, str] = {to_camel_case(name): name for name in _FAMILIES}
+
+
+async def run_kpi_dashboard(
+    info: strawberry.Info, filter: KpiFilter
+) -> list[KpiDashboardRowType]:
+    """
+    Liest alle im Selection Set angefragten KPI-Familien nebenläufig und fügt sie
+    zu einer Zeile pro Monat zusammen.
+
+    Nicht angefragte Familien werden gar nicht gelesen, und jede Familie liest
+    nur ihre angefragten Felder.
+
+    :return: Zeilen aufsteigend nach Jahr und Monat
+    """
+    selections: dict[str, list] = {}
+    for field in flatten_selections(
+        s for row in info.selected_fields for s in row.selections
+    ):
+        if field.name in _GRAPHQL_NAMES:
+            name = _GRAPHQL_NAMES[field.name]
+            selections.setdefault(name, []).extend(field.selections)
+
+    results = await asyncio.gather(
+        *(
+            _query_family(name, filter, selected)
+            for name, selected in selections.items()
+        )
+    )
+
+    rows: dict[tuple[int, int], KpiDashboardRowType] = {}
+    for attribute, dtos in zip(selections, results):
+        for dto in dtos:
+            key = (dto.year, dto.month)
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = KpiDashboardRowType(year=dto.year, month=dto.month)
+            setattr(row, attribute, dto)
+    return [rows[key] for key in sorted(rows)]
+
+
+async def _query_family(name: str, filter: KpiFilter, selections: list) -> list:
+    model, dto_cls = _FAMILIES[name]
+    # year/month werden für das Zusammenführen immer gebraucht.
+    fields = fields_of(selections, dto_cls) | {"year", "month"}
+    return await query_kpis(model, dto_cls, filter, fields=fields)
 
 
 @strawberry.type
 class Query:
 
+    @strawberry.field
+    async def kpi_dashboard(
+        self, info: strawberry.Info, filter: KpiFilter
+    ) -> List[KpiDashboardRowType]:
+        return await run_kpi_dashboard(info, filter)
+
     @strawberry.field
     async def revenue_kpis(
-        self, filter: KpiFilter, sort: bool = True, limit: Optional[int] = None
+        self,
+        info: strawberry.Info,
+        filter: KpiFilter,
+        sort: bool = True,
+        limit: Optional[int] = None,
     ) -> List[RevenueKPIType]:
-        return await run_kpi_query(RevenueKPI, RevenueKPIType, filter, sort, limit)
+        return await run_kpi_query(
+            RevenueKPI, RevenueKPIType, filter, sort, limit, info
+        )
 
     @strawberry.field
     async def customer_growth_kpis(
-        self, filter: KpiFilter, sort: bool = True, limit: Optional[int] = None
+        self,
+        info: strawberry.Info,
+        filter: KpiFilter,
+        sort: bool = True,
+        limit: Optional[int] = None,
     ) -> List[CustomerGrowthKPIType]:
         return await run_kpi_query(
-            CustomerGrowthKPI, CustomerGrowthKPIType, filter, sort, limit
+            CustomerGrowthKPI, CustomerGrowthKPIType, filter, sort, limit, info
         )
 
     @strawberry.field
     async def order_kpis(
-        self, filter: KpiFilter, sort: bool = True, limit: Optional[int] = None
+        self,
+        info: strawberry.Info,
+        filter: KpiFilter,
+        sort: bool = True,
+        limit: Optional[int] = None,
     ) -> List[OrderKPIType]:
-        return await run_kpi_query(OrderKPI, OrderKPIType, filter, sort, limit)
+        return await run_kpi_query(OrderKPI, OrderKPIType, filter, sort, limit, info)
 
     @strawberry.field
     async def transaction_kpis(
-        self, filter: KpiFilter, sort: bool = True, limit: Optional[int] = None
+        self,
+        info: strawberry.Info,
+        filter: KpiFilter,
+        sort: bool = True,
+        limit: Optional[int] = None,
     ) -> List[TransactionKPIType]:
         return await run_kpi_query(
-            TransactionKPI, TransactionKPIType, filter, sort, limit
+            TransactionKPI, TransactionKPIType, filter, sort, limit, info
         )
 
     @strawberry.field
     async def invoice_kpis(
-        self, filter: KpiFilter, sort: bool = True, limit: Optional[int] = None
+        self,
+        info: strawberry.Info,
+        filter: KpiFilter,
+        sort: bool = True,
+        limit: Optional[int] = None,
     ) -> List[InvoiceKPIType]:
-        return await run_kpi_query(InvoiceKPI, InvoiceKPIType, filter, sort, limit)
+        return await run_kpi_query(
+            InvoiceKPI, InvoiceKPIType, filter, sort, limit, info
+        )
 
     @strawberry.field
     async def support_kpis(
-        self, filter: KpiFilter, sort: bool = True, limit: Optional[int] = None
+        self,
+        info: strawberry.Info,
+        filter: KpiFilter,
+        sort: bool = True,
+        limit: Optional[int] = None,
     ) -> List[SupportKPIType]:
-        return await run_kpi_query(SupportKPI, SupportKPIType, filter, sort, limit)
+        return await run_kpi_query(
+            SupportKPI, SupportKPIType, filter, sort, limit, info
+        )
 
     @strawberry.field
     async def system_kpis(
-        self, filter: KpiFilter, sort: bool = True, limit: Optional[int] = None
+        self,
+        info: strawberry.Info,
+        filter: KpiFilter,
+        sort: bool = True,
+        limit: Optional[int] = None,
     ) -> List[SystemKPIType]:
-        return await run_kpi_query(SystemKPI, SystemKPIType, filter, sort, limit)
+        return await run_kpi_query(SystemKPI, SystemKPIType, filter, sort, limit, info)
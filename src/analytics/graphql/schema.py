@@ -7,13 +7,14 @@ from analytics.graphql.mutation import Mutation
 from strawberry.fastapi import GraphQLRouter
 
 from analytics.graphql.query import Query
+from analytics.security.keycloak_service import KeycloakService
 
 
 # Kontextbereitstellung
 async def get_context(request: Request) -> dict:
     return {
         "request": request,
-        "keycloak": getattr(request.state, "keycloak", None),
+        "keycloak": await KeycloakService.from_request(request),
     }
 
 
@@ -0,0 +1,91 @@
+"""
+Typisierte KPI-Events – ein Modell je Kafka-Topic.
+
+Die Modelle werden von ``KafkaEventDispatcher`` anhand der Annotation des ersten
+Handler-Parameters erkannt und mit ``model_validate_json`` in einem Durchgang
+direkt aus den Bytes der Nachricht dekodiert und validiert; das Schema kompiliert
+pydantic-core einmalig beim Import.
+
+Zeitstempel bleiben ISO-8601-Text: Die Handler brauchen nur den Bucket-Schlüssel,
+den ``bucket_key`` je Stunde einmal aus dem vollständigen Zeitstempel berechnet
+und danach aus dem Präfix liest, statt jedes Mal ein ``datetime`` zu parsen.
+"""
+
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+__all__ = [
+    "AccountRegisteredEvent",
+    "InvoiceIssuedEvent",
+    "InvoiceOverdueEvent",
+    "KpiEvent",
+    "OrderCreatedEvent",
+    "PaymentCompletedEvent",
+    "SupportRequestedEvent",
+    "SystemErrorOccurredEvent",
+    "TransactionFailedEvent",
+]
+
+
+class KpiEvent(BaseModel):
+    """Basisklasse der KPI-Events: camelCase im JSON, unbekannte Felder ignoriert."""
+
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        extra="ignore",
+        frozen=True,
+    )
+
+
+class AccountRegisteredEvent(KpiEvent):
+    """Topic ``kpi.create.person``: ein neuer Kunde hat sich registriert."""
+
+    created_at: str
+
+
+class InvoiceIssuedEvent(KpiEvent):
+    """Topic ``kpi.create.invoice``: eine Rechnung wurde ausgestellt."""
+
+    issued_at: str
+
+
+class InvoiceOverdueEvent(KpiEvent):
+    """Topic ``kpi.delete.invoice``: eine Rechnung ist überfällig."""
+
+    due_date: str
+
+
+class OrderCreatedEvent(KpiEvent):
+    """Topic ``kpi.create.order``: eine Bestellung wurde angelegt."""
+
+    created_at: str
+    total_amount: float
+    products: int
+    """Anzahl der Artikel im Warenkorb."""
+
+
+class PaymentCompletedEvent(KpiEvent):
+    """Topic ``kpi.create.payment``: eine Zahlung wurde abgeschlossen."""
+
+    timestamp: str
+    amount: float
+
+
+class SupportRequestedEvent(KpiEvent):
+    """Topic ``kpi.create.support``: eine Support-Anfrage ist eingegangen."""
+
+    timestamp: str
+    response_time: float
+
+
+class SystemErrorOccurredEvent(KpiEvent):
+    """Topic ``kpi.create.orchestrator``: ein Systemfehler ist aufgetreten."""
+
+    timestamp: str
+
+
+class TransactionFailedEvent(KpiEvent):
+    """Topic ``kpi.error.transaction``: eine Transaktion ist fehlgeschlagen."""
+
+    timestamp: str
@@ -1,13 +1,25 @@
 # analytics/kafka/handlers/account_registered.handler.py
-from datetime import datetime
+from collections.abc import Mapping
 
 from analytics.messaging.decorator.kafka_handler_registry import kafka_handler
+from analytics.messaging.dto.kpi_events import AccountRegisteredEvent
+from analytics.messaging.kpi_bucket_key import bucket_key
+from analytics.messaging.kpi_increment import KpiIncrement
 from analytics.model.entity.customer_growth_kpi import CustomerGrowthKPI
 
 
 @kafka_handler("kpi.create.person")
-async def handle_account_registered(payload: dict, headers: dict):
-    dt = datetime.fromisoformat(payload["createdAt"])
-    growth = await CustomerGrowthKPI.get_or_create(dt.year, dt.month)
-    growth.new_customers += 1
-    await growth.save()
+async def handle_account_registered(
+    event: AccountRegisteredEvent, headers: Mapping[str, str]
+) -> list[KpiIncrement]:
+    year, month, day, hour = bucket_key(event.created_at)
+    return [
+        KpiIncrement(
+            model=CustomerGrowthKPI,
+            year=year,
+            month=month,
+            day=day,
+            hour=hour,
+            deltas={"new_customers": 1},
+        )
+    ]
@@ -1,13 +1,25 @@
 # analytics/kafka/handlers/invoice_issued.handler.py
-from datetime import datetime
+from collections.abc import Mapping
 
 from analytics.messaging.decorator.kafka_handler_registry import kafka_handler
+from analytics.messaging.dto.kpi_events import InvoiceIssuedEvent
+from analytics.messaging.kpi_bucket_key import bucket_key
+from analytics.messaging.kpi_increment import KpiIncrement
 from analytics.model.entity.invoice_kpi import InvoiceKPI
 
 
 @kafka_handler("kpi.create.invoice")
-async def handle_invoice_issued(payload: dict):
-    dt = datetime.fromisoformat(payload["issuedAt"])
-    inv = await InvoiceKPI.get_or_create(dt.year, dt.month)
-    inv.invoices_issued += 1
-    await inv.save()
+async def handle_invoice_issued(
+    event: InvoiceIssuedEvent, headers: Mapping[str, str]
+) -> list[KpiIncrement]:
+    year, month, day, hour = bucket_key(event.issued_at)
+    return [
+        KpiIncrement(
+            model=InvoiceKPI,
+            year=year,
+            month=month,
+            day=day,
+            hour=hour,
+            deltas={"invoices_issued": 1},
+        )
+    ]
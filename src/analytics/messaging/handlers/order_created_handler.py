@@ -1,21 +1,38 @@
 # analytics/kafka/handlers/order_created.handler.py
-from datetime import datetime
+from collections.abc import Mapping
 
 from analytics.messaging.decorator.kafka_handler_registry import kafka_handler
+from analytics.messaging.dto.kpi_events import OrderCreatedEvent
+from analytics.messaging.kpi_bucket_key import bucket_key
+from analytics.messaging.kpi_increment import KpiIncrement
 from analytics.model.entity.order_kpi import OrderKPI
 from analytics.model.entity.revenue_kpi import RevenueKPI
 
 
 @kafka_handler("kpi.create.order")
-async def handle_order_created(payload: dict):
-    dt = datetime.fromisoformat(payload["createdAt"])
-    revenue = await RevenueKPI.get_or_create(dt.year, dt.month)
-    order = await OrderKPI.get_or_create(dt.year, dt.month)
-
-    revenue.total_revenue += payload["totalAmount"]
-    order.total_orders += 1
-    order.basket_size_sum += payload["products"]
-    order.order_value_sum += payload["totalAmount"]
-
-    await revenue.save()
-    await order.save()
+async def handle_order_created(
+    event: OrderCreatedEvent, headers: Mapping[str, str]
+) -> list[KpiIncrement]:
+    year, month, day, hour = bucket_key(event.created_at)
+    return [
+        KpiIncrement(
+            model=RevenueKPI,
+            year=year,
+            month=month,
+            day=day,
+            hour=hour,
+            deltas={"total_revenue": event.total_amount},
+        ),
+        KpiIncrement(
+            model=OrderKPI,
+            year=year,
+            month=month,
+            day=day,
+            hour=hour,
+            deltas={
+                "total_orders": 1,
+                "basket_size_sum": event.products,
+                "order_value_sum": event.total_amount,
+            },
+        ),
+    ]
@@ -1,13 +1,25 @@
 # analytics/kafka/handlers/payment_completed.handler.py
-from datetime import datetime
+from collections.abc import Mapping
 
 from analytics.messaging.decorator.kafka_handler_registry import kafka_handler
+from analytics.messaging.dto.kpi_events import PaymentCompletedEvent
+from analytics.messaging.kpi_bucket_key import bucket_key
+from analytics.messaging.kpi_increment import KpiIncrement
 from analytics.model.entity.transaction_kpi import TransactionKPI
 
 
 @kafka_handler("kpi.create.payment")
-async def handle_payment_completed(payload: dict):
-    dt = datetime.fromisoformat(payload["timestamp"])
-    txn = await TransactionKPI.get_or_create(dt.year, dt.month)
-    txn.transaction_volume += payload["amount"]
-    await txn.save()
+async def handle_payment_completed(
+    event: PaymentCompletedEvent, headers: Mapping[str, str]
+) -> list[KpiIncrement]:
+    year, month, day, hour = bucket_key(event.timestamp)
+    return [
+        KpiIncrement(
+            model=TransactionKPI,
+            year=year,
+            month=month,
+            day=day,
+            hour=hour,
+            deltas={"transaction_volume": event.amount},
+        )
+    ]
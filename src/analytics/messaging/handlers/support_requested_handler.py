@@ -1,15 +1,29 @@
 # analytics/kafka/handlers/support_requested.handler.py
-from datetime import datetime
+from collections.abc import Mapping
 
 from analytics.messaging.decorator.kafka_handler_registry import kafka_handler
+from analytics.messaging.dto.kpi_events import SupportRequestedEvent
+from analytics.messaging.kpi_bucket_key import bucket_key
+from analytics.messaging.kpi_increment import KpiIncrement
 from analytics.model.entity.support_kpi import SupportKPI
 
 
 @kafka_handler("kpi.create.support")
-async def handle_support_requested(payload: dict):
-    dt = datetime.fromisoformat(payload["timestamp"])
-    support = await SupportKPI.get_or_create(dt.year, dt.month)
-    support.support_requests += 1
-    support.avg_response_time_total += payload["responseTime"]
-    support.request_count += 1
-    await support.save()
+async def handle_support_requested(
+    event: SupportRequestedEvent, headers: Mapping[str, str]
+) -> list[KpiIncrement]:
+    year, month, day, hour = bucket_key(event.timestamp)
+    return [
+        KpiIncrement(
+            model=SupportKPI,
+            year=year,
+            month=month,
+            day=day,
+            hour=hour,
+            deltas={
+                "support_requests": 1,
+                "avg_response_time_total": event.response_time,
+                "request_count": 1,
+            },
+        )
+    ]
@@ -1,14 +1,25 @@
 # analytics/kafka/handlers/system_error_occurred.handler.py
-from datetime import datetime
+from collections.abc import Mapping
 
 from analytics.messaging.decorator.kafka_handler_registry import kafka_handler
+from analytics.messaging.dto.kpi_events import SystemErrorOccurredEvent
+from analytics.messaging.kpi_bucket_key import bucket_key
+from analytics.messaging.kpi_increment import KpiIncrement
 from analytics.model.entity.system_kpi import SystemKPI
 
 
 @kafka_handler("kpi.create.orchestrator")
-async def handle_system_error_occurred(payload: dict):
-    dt = datetime.fromisoformat(payload["timestamp"])
-    system = await SystemKPI.get_or_create(dt.year, dt.month)
-    system.error_count += 1
-    system.total_requests += 1
-    await system.save()
+async def handle_system_error_occurred(
+    event: SystemErrorOccurredEvent, headers: Mapping[str, str]
+) -> list[KpiIncrement]:
+    year, month, day, hour = bucket_key(event.timestamp)
+    return [
+        KpiIncrement(
+            model=SystemKPI,
+            year=year,
+            month=month,
+            day=day,
+            hour=hour,
+            deltas={"error_count": 1, "total_requests": 1},
+        )
+    ]
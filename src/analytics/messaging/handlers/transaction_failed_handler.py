@@ -1,13 +1,25 @@
 # analytics/kafka/handlers/transaction_failed.handler.py
-from datetime import datetime
+from collections.abc import Mapping
 
 from analytics.messaging.decorator.kafka_handler_registry import kafka_handler
+from analytics.messaging.dto.kpi_events import TransactionFailedEvent
+from analytics.messaging.kpi_bucket_key import bucket_key
+from analytics.messaging.kpi_increment import KpiIncrement
 from analytics.model.entity.transaction_kpi import TransactionKPI
 
 
 @kafka_handler("kpi.error.transaction")
-async def handle_transaction_failed(payload: dict):
-    dt = datetime.fromisoformat(payload["timestamp"])
-    txn = await TransactionKPI.get_or_create(dt.year, dt.month)
-    txn.failed_transactions += 1
-    await txn.save()
+async def handle_transaction_failed(
+    event: TransactionFailedEvent, headers: Mapping[str, str]
+) -> list[KpiIncrement]:
+    year, month, day, hour = bucket_key(event.timestamp)
+    return [
+        KpiIncrement(
+            model=TransactionKPI,
+            year=year,
+            month=month,
+            day=day,
+            hour=hour,
+            deltas={"failed_transactions": 1},
+        )
+    ]
@@ -2,12 +2,54 @@
 KafkaConsumerService – liest Log-Nachrichten aus Kafka und verarbeitet sie.
 """
 
-from aiokafka import AIOKafkaConsumer
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, TopicPartition
 from loguru import logger
-import asyncio, json
+import asyncio
+from collections import deque
+from typing import Final
+
+from prometheus_client import Counter
+from pymongo.errors import ConnectionFailure, PyMongoError
 
 from analytics.config import env
-from analytics.messaging.kafka_event_dispatcher import KafkaEventDispatcher
+from analytics.config.ingestion import ingestion_layout
+from analytics.config.kafka import get_kafka_settings
+from analytics.messaging.kafka_event_dispatcher import (
+    KafkaEventDispatcher,
+    KafkaPayloadError,
+)
+from analytics.messaging.kafka_headers import KafkaHeaders
+from analytics.messaging.kafka_offset_committer import KafkaOffsetCommitter
+from analytics.messaging.kafka_partition_lanes import PartitionLanes
+from analytics.messaging.kafka_producer_service import KafkaProducerService
+from analytics.messaging.kpi_accumulator import KpiAccumulator
+from analytics.messaging.kpi_batch import KpiBatch
+from analytics.messaging.kpi_dedup import EVENT_ID_HEADER, KpiDeduplicator, event_key
+from analytics.messaging.kpi_increment import KpiIncrement
+from analytics.messaging.kpi_journal import KpiJournal
+
+_dead_letters_counter: Final = Counter(
+    "analytics_kafka_dead_letters",
+    "In die Dead-Letter-Topics umgeleitete Events",
+    ["topic"],
+)
+
+_WRITE_RETRY_DELAY = 1.0
+"""Wartezeit in Sekunden, bevor ein fehlgeschlagener Write wiederholt wird."""
+
+
+class _RebalanceListener(ConsumerRebalanceListener):
+    """Schreibt und committet alles Offene, bevor Partitionen entzogen werden."""
+
+    def __init__(self, service: "KafkaConsumerService") -> None:
+        self._service = service
+
+    async def on_partitions_revoked(self, revoked: set[TopicPartition]) -> None:
+        await self._service._on_partitions_revoked(revoked)
+
+    async def on_partitions_assigned(self, assigned: set[TopicPartition]) -> None:
+        logger.info("🧭 Kafka-Partitionen zugewiesen: {}", sorted(assigned))
+
 
 class KafkaConsumerService:
     """Asynchrone Kafka-Consumer-Logik für Log-Einträge."""
@@ -17,27 +59,88 @@ class KafkaConsumerService:
         dispatcher: KafkaEventDispatcher,
         topics: list[str],
         bootstrap_servers: str = env.KAFKA_URI,
+        producer: KafkaProducerService | None = None,
     ):
         self.dispatcher = dispatcher
         self.topics = topics
+        self._producer = producer
         self._bootstrap_servers = bootstrap_servers
         self._consumer = None
         self._task = None
+        self._committer: KafkaOffsetCommitter | None = None
+        self._dedup: KpiDeduplicator | None = None
+        self._accumulator: KpiAccumulator | None = None
+        self._lanes: PartitionLanes | None = None
+
+        self._settings = settings = get_kafka_settings()
+        self._batch_enabled = settings.batch_enabled
+        self._batch_max_records = settings.batch_max_records
+        self._batch_timeout_ms = settings.batch_timeout_ms
+        self._accumulator_enabled = settings.accumulator_enabled
+        self._layout = ingestion_layout
 
     async def start(self):
         self._consumer = AIOKafkaConsumer(
-            *self.topics,
             bootstrap_servers=self._bootstrap_servers,
-            value_deserializer=lambda v: json.loads(v.decode("utf-8")),
             auto_offset_reset="earliest",
-            enable_auto_commit=True,
+            # Offsets werden erst nach bestätigten KPI-Writes committet.
+            enable_auto_commit=False,
             group_id="inventory-group",
         )
         # logger.info(f"🧭 Kafka Consumer subscribed auf Topics: {self.topics}")
 
         await self._consumer.start()
-        self._task = asyncio.create_task(self._consume())
-        logger.info("📡 Kafka Consumer gestartet.")
+        settings = self._settings
+        if settings.dedup_enabled:
+            self._dedup = KpiDeduplicator(
+                window=settings.dedup_window,
+                capacity=settings.dedup_capacity,
+                path=settings.dedup_snapshot_path,
+            )
+            self._dedup.load()
+        self._committer = KafkaOffsetCommitter(
+            self._consumer,
+            interval_ms=settings.commit_interval_ms,
+            max_events=settings.commit_max_events,
+            # Schlüssel-Log vor jedem Commit in den Dedup-Snapshot übernehmen
+            before_commit=self._dedup.save if self._dedup else None,
+        )
+        if self._accumulator_enabled:
+            journal = (
+                KpiJournal(settings.journal_path, settings.journal_size_bytes)
+                if settings.journal_path
+                else None
+            )
+            self._accumulator = KpiAccumulator(
+                layout=self._layout,
+                flush_interval_ms=settings.accumulator_flush_interval_ms,
+                flush_max_events=settings.accumulator_flush_max_events,
+                commit=self._committer.commit,
+                journal=journal,
+                dedup=self._dedup,
+            )
+            await self._accumulator.start()
+            consume = self._consume_accumulated
+        elif self._batch_enabled:
+            consume = self._consume_batches
+        else:
+            self._lanes = PartitionLanes(
+                self._consumer,
+                self._prepare,
+                self._write,
+                queue_size=settings.lane_queue_size,
+                high_watermark=settings.lane_high_watermark,
+                low_watermark=settings.lane_low_watermark,
+                drain_timeout_ms=settings.lane_drain_timeout_ms,
+            )
+            consume = self._consume
+        self._consumer.subscribe(self.topics, listener=_RebalanceListener(self))
+        self._task = asyncio.create_task(consume())
+        logger.info(
+            "📡 Kafka Consumer gestartet (Batch-Modus: {}, Write-Behind: {}).",
+            self._batch_enabled,
+            self._accumulator_enabled,
+        )
 
     async def stop(self):
         if self._task:
@@ -46,23 +149,316 @@ class KafkaConsumerService:
                 await self._task
             except asyncio.CancelledError:
                 pass
+        if self._lanes:
+            await self._lanes.close()
+        if self._accumulator:
+            # Offene Deltas schreiben und committen, solange der Consumer läuft
+            await self._accumulator.stop()
+        elif self._committer:
+            await self._committer.flush()
+        if self._dedup:
+            self._dedup.close()
         if self._consumer:
             await self._consumer.stop()
 
     async def _consume(self):
-        async for msg in self._consumer:
-            topic = msg.topic
-            headers = dict((k, v.decode("utf-8")) for k, v in (msg.headers or []))
-            logger.debug(f"📥 Kafka MSG: {msg.value} on topic={topic} headers={headers}")
-            handler = self.dispatcher.get_handler(topic)
-            if handler:
+        """
+        Fetch-Stufe: verteilt die Events je Partition auf eigene Lanes, die sie
+        einzeln verarbeiten und ihre Inkremente sofort schreiben. Rückstau
+        pausiert die betroffenen Partitionen, statt diese Schleife zu blockieren.
+        """
+        consumer = self._consumer
+        while True:
+            records = await consumer.getmany(
+                timeout_ms=self._batch_timeout_ms,
+                max_records=self._batch_max_records,
+            )
+            assigned = consumer.assignment()
+            for tp, partition_records in records.items():
+                # Events inzwischen entzogener Partitionen gehören dem neuen Besitzer
+                if tp not in assigned:
+                    continue
+                # Topics ohne Handler werden übersprungen, ohne sie zu dekodieren
+                if self.dispatcher.get_handler(tp.topic) is None:
+                    self._committer.track(
+                        tp, partition_records[-1].offset, len(partition_records)
+                    )
+                    continue
+                for msg in partition_records:
+                    await self._lanes.submit(tp, msg)
+            await self._committer.commit_due()
+
+    async def _prepare(self, msg) -> tuple:
+        """
+        Handle-Stufe einer Lane: dekodiert das Event und ruft seinen Handler auf.
+
+        Scheitert der Handler oder die Vorbereitung, landet das Event im
+        Dead-Letter-Topic (siehe ``_handle``); die Write-Stufe erhält es ohne
+        Inkremente, rückt nur seinen Offset vor und bestätigt seinen Schlüssel
+        nicht. So bleibt die Lane nicht an einem Event hängen, das Kafka sonst
+        endlos erneut zustellt.
+
+        :return: (Event, Deduplizierungsschlüssel, Inkremente); ``None`` statt der
+            Inkremente, falls das Event bereits geschrieben wurde oder nicht
+            verarbeitet werden konnte
+        """
+        try:
+            key = self._event_key(msg)
+            if key is not None and self._dedup.seen(key):
+                return msg, key, None
+            return msg, key, await self._handle(msg)
+        except Exception as e:
+            logger.exception(f"❌ Event auf Topic '{msg.topic}' nicht verarbeitet: {e}")
+            await self._dead_letter(msg, KafkaHeaders(msg.headers), e)
+            return msg, None, None
+
+    async def _write(self, item: tuple) -> None:
+        """
+        Write-Stufe einer Lane: schreibt die Inkremente und merkt den Offset vor.
+
+        Vorübergehende Fehler (Verbindung, Timeout) werden bis zu
+        ``write_max_retries``-mal wiederholt; jede Wiederholung setzt beim ersten
+        noch nicht vollständig geschriebenen Inkrement fort. Scheitert der Write
+        endgültig, landet das Event im Dead-Letter-Topic und sein Offset rückt
+        trotzdem vor, damit die Lane nicht stehen bleibt.
+        """
+        msg, key, increments = item
+        tp = TopicPartition(msg.topic, msg.partition)
+        if increments is None or not self._claim(key):
+            self._committer.track(tp, msg.offset)
+            return
+        pending = deque(increments)
+        attempts = 0
+        written = False
+        try:
+            while pending:
                 try:
-                    await handler(msg.value, headers)
-                    logger.debug(f"✅ Handler für Topic '{topic}' erfolgreich ausgeführt")
+                    await pending[0].apply(self._layout)
+                    pending.popleft()
                 except Exception as e:
-                    logger.exception(f"❌ Fehler im Handler für Topic '{topic}': {e}")
+                    attempts += 1
+                    retries = self._settings.write_max_retries
+                    if attempts <= retries and _retryable(e):
+                        logger.warning(
+                            "⚠️ KPI-Write für '{}' fehlgeschlagen ({}. Versuch): {}",
+                            msg.topic,
+                            attempts,
+                            e,
+                        )
+                        await asyncio.sleep(_WRITE_RETRY_DELAY)
+                        continue
+                    done = len(increments) - len(pending)
+                    logger.exception(
+                        f"❌ KPIs für Topic '{msg.topic}' nicht geschrieben "
+                        f"({done}/{len(increments)} Inkremente): {e}"
+                    )
+                    await self._dead_letter(
+                        msg,
+                        KafkaHeaders(msg.headers),
+                        f"{e} ({done}/{len(increments)} Inkremente geschrieben)",
+                    )
+                    break
             else:
-                logger.warning(f"⚠️ Kein Handler für Topic: {topic}")
+                written = True
+        finally:
+            if not written:
+                self._release(key)
+        if written:
+            self._confirm([key])
+        self._committer.track(tp, msg.offset)
+
+    async def _on_partitions_revoked(self, revoked: set[TopicPartition]) -> None:
+        """Arbeitet die Lanes entzogener Partitionen ab und committet deren Offsets."""
+        if self._lanes:
+            await self._lanes.drain(revoked)
+        if self._accumulator:
+            await self._accumulator.flush()
+        elif self._committer:
+            await self._committer.flush()
+
+    async def _consume_batches(self):
+        """
+        Holt Events per ``getmany()`` ab, faltet ihre Inkremente je
+        (Collection, Jahr, Monat) und schreibt sie mit einem Bulk-Write pro Batch.
+
+        Ein fehlgeschlagener Batch bleibt erhalten; bis er geschrieben ist, sind
+        alle Partitionen pausiert und jeder weitere Versuch folgt nach
+        ``_WRITE_RETRY_DELAY``. Erst danach werden seine Offsets vorgemerkt,
+        außer für inzwischen entzogene Partitionen.
+        """
+        consumer = self._consumer
+        committer = self._committer
+        batch = KpiBatch(self._layout)
+        offsets: dict[TopicPartition, tuple[int, int]] = {}
+        keys: list[int | None] = []
+        while True:
+            records = await consumer.getmany(
+                timeout_ms=self._batch_timeout_ms,
+                max_records=self._batch_max_records,
+            )
+            assigned = consumer.assignment()
+            for tp, partition_records in records.items():
+                # Events inzwischen entzogener Partitionen gehören dem neuen Besitzer
+                if tp not in assigned or not partition_records:
+                    continue
+                # Topics ohne Handler: nur den Offset vorrücken, nichts dekodieren
+                if self.dispatcher.get_handler(tp.topic) is not None:
+                    for msg in partition_records:
+                        key = self._event_key(msg)
+                        if not self._claim(key):
+                            continue
+                        increments = await self._handle(msg)
+                        if increments is None:
+                            self._release(key)
+                            continue
+                        keys.append(key)
+                        batch.add(increments)
+                _, events = offsets.get(tp, (0, 0))
+                offsets[tp] = (
+                    partition_records[-1].offset,
+                    events + len(partition_records),
+                )
+            try:
+                await batch.flush()
+            except Exception as e:
+                logger.exception(f"❌ Fehler beim Schreiben des KPI-Batches: {e}")
+                # Keine neuen Events, bis der offene Batch geschrieben ist
+                consumer.pause(*assigned)
+                await asyncio.sleep(_WRITE_RETRY_DELAY)
+                continue
+            if paused := consumer.paused():
+                consumer.resume(*paused)
+            self._confirm(keys)
+            assigned = consumer.assignment()
+            for tp, (offset, events) in offsets.items():
+                if tp in assigned:
+                    committer.track(tp, offset, events)
+            offsets, keys = {}, []
+            await committer.commit_due()
+
+    async def _consume_accumulated(self):
+        """
+        Übergibt die Inkremente jedes Events an den ``KpiAccumulator``, der sie
+        periodisch schreibt und erst danach die Offsets committet.
+        """
+        accumulator = self._accumulator
+        while True:
+            records = await self._consumer.getmany(
+                timeout_ms=self._batch_timeout_ms,
+                max_records=self._batch_max_records,
+            )
+            for tp, partition_records in records.items():
+                if self.dispatcher.get_handler(tp.topic) is None:
+                    # Topics ohne Handler: nur den Offset vorrücken
+                    await accumulator.add(tp, partition_records[-1].offset, [])
+                    continue
+                for msg in partition_records:
+                    if accumulator.skip(tp, msg.offset):
+                        continue
+                    key = self._event_key(msg)
+                    if not self._claim(key):
+                        # Offset vorrücken, ohne erneut zu zählen
+                        await accumulator.add(tp, msg.offset, [])
+                        continue
+                    increments = await self._handle(msg)
+                    if increments is None:
+                        # Im Dead-Letter-Topic: Offset vorrücken, nichts bestätigen
+                        self._release(key)
+                        await accumulator.add(tp, msg.offset, [])
+                        continue
+                    try:
+                        await accumulator.add(tp, msg.offset, increments, key)
+                    except Exception as e:
+                        self._release(key)
+                        logger.exception(f"❌ KPI-Deltas nicht geschrieben: {e}")
+
+    def _event_key(self, msg) -> int | None:
+        """Deduplizierungsschlüssel des Events oder ``None`` ohne Deduplizierung."""
+        if self._dedup is None:
+            return None
+        event_id = next(
+            (v for k, v in msg.headers or () if k == EVENT_ID_HEADER), None
+        )
+        return event_key(msg.topic, event_id, msg.partition, msg.offset)
+
+    def _claim(self, key: int | None) -> bool:
+        """
+        Merkt ein Event zur Verarbeitung vor.
+
+        :return: ``False``, falls es bereits angenommen oder geschrieben wurde
+        """
+        if key is None:
+            return True
+        if self._dedup.seen(key):
+            return False
+        self._dedup.reserve(key)
+        return True
+
+    def _release(self, key: int | None) -> None:
+        if key is not None:
+            self._dedup.release(key)
+
+    def _confirm(self, keys: list[int | None]) -> None:
+        if self._dedup is not None:
+            self._dedup.confirm(k for k in keys if k is not None)
+
+    async def _handle(self, msg) -> list[KpiIncrement] | None:
+        """
+        Übergibt das Event an den kompilierten Handler zum Topic.
+
+        Der Handler dekodiert die Nutzlast selbst direkt aus den Bytes, die
+        Header erst bei einem Zugriff. Ungültige Events und Events, bei denen
+        der Handler scheitert, landen im Dead-Letter-Topic; sie gelten nicht
+        als verarbeitet, ihr Deduplizierungsschlüssel wird also nicht bestätigt.
+
+        :return: KPI-Inkremente des Handlers oder ``None``, falls das Event
+            nicht verarbeitet wurde
+        """
+        topic = msg.topic
+        handler = self.dispatcher.get_handler(topic)
+        if not handler:
+            logger.warning(f"⚠️ Kein Handler für Topic: {topic}")
+            return []
+        headers = KafkaHeaders(msg.headers)
+        logger.debug(
+            "📥 Kafka MSG: {} on topic={} headers={}", msg.value, topic, headers
+        )
+        try:
+            increments = await handler(msg.value, headers)
+            logger.debug("✅ Handler für Topic '{}' erfolgreich ausgeführt", topic)
+            return increments
+        except KafkaPayloadError as e:
+            logger.warning(f"⚠️ Event auf Topic '{topic}' verworfen: {e}")
+            await self._dead_letter(msg, headers, e)
+        except Exception as e:
+            logger.exception(f"❌ Fehler im Handler für Topic '{topic}': {e}")
+            await self._dead_letter(msg, headers, e)
+        return None
+
+    async def _dead_letter(
+        self, msg, headers: KafkaHeaders, error: Exception | str
+    ) -> None:
+        """Leitet ein ungültiges Event unverändert an ``<topic><Suffix>`` weiter."""
+        settings = self._settings
+        if not settings.dead_letter_enabled or self._producer is None:
+            return
+        topic = f"{msg.topic}{settings.dead_letter_suffix}"
+        try:
+            await self._producer.publish(
+                topic,
+                msg.value,
+                headers=[
+                    *headers.items(),
+                    ("x-dlq-topic", msg.topic),
+                    ("x-dlq-partition", msg.partition),
+                    ("x-dlq-offset", msg.offset),
+                    ("x-dlq-error", str(error)[:1000]),
+                ],
+            )
+        except Exception as e:
+            logger.error(f"❌ Event nicht an Dead-Letter-Topic '{topic}' gesendet: {e}")
+            return
+        _dead_letters_counter.labels(msg.topic).inc()
 
     async def handle_log(self, event: dict):
         """Verarbeitet empfangene Kafka-Events."""
@@ -82,3 +478,12 @@ class KafkaConsumerService:
         await self.stop()  # zuerst Kafka-Consumer stoppen
         loop = asyncio.get_event_loop()
         loop.call_later(1, loop.stop)  # sanfter Stop (optional: os._exit(0))
+
+
+def _retryable(error: Exception) -> bool:
+    """``True`` für Fehler, die eine Wiederholung beheben kann (Verbindung, Timeout)."""
+    if isinstance(error, (ConnectionFailure, OSError, TimeoutError)):
+        return True
+    return isinstance(error, PyMongoError) and error.has_error_label(
+        "RetryableWriteError"
+    )
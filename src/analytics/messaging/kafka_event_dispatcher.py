@@ -1,20 +1,174 @@
-from typing import Callable, Awaitable, Any
+import inspect
+import time
+from collections.abc import Mapping
+from typing import Awaitable, Callable, Final
 
+import orjson
 from loguru import logger
+from prometheus_client import Counter, Histogram
+from pydantic import BaseModel, ValidationError
+
+from analytics.messaging.kpi_increment import KpiIncrement
+
+__all__ = ["KafkaEventDispatcher", "KafkaHandler", "KafkaPayloadError"]
+
+KafkaHandler = Callable[[bytes, Mapping[str, str]], Awaitable[list[KpiIncrement]]]
+"""Kompilierter Handler: (Nachricht als Bytes, Header) → KPI-Inkremente."""
+
+_POSITIONAL: Final = (
+    inspect.Parameter.POSITIONAL_ONLY,
+    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+)
+
+_handler_seconds: Final = Histogram(
+    "analytics_kafka_handler_seconds",
+    "Laufzeit der Kafka-Handler in Sekunden",
+    ["topic"],
+)
+_decode_seconds: Final = Histogram(
+    "analytics_kafka_decode_seconds",
+    "Dauer der Dekodierung und Validierung einer Nachricht in Sekunden",
+    ["topic"],
+)
+_decoded_bytes_counter: Final = Counter(
+    "analytics_kafka_decoded_bytes", "Dekodierte Nachrichten-Bytes", ["topic"]
+)
+_invalid_events_counter: Final = Counter(
+    "analytics_kafka_invalid_events",
+    "Kafka-Events mit ungültiger Nutzlast",
+    ["topic"],
+)
+
+
+class KafkaPayloadError(ValueError):
+    """Exception, falls die Nutzlast eines Kafka-Events ungültig ist."""
+
+    def __init__(self, topic: str, reason: str) -> None:
+        super().__init__(f"Ungültige Nutzlast auf Topic '{topic}': {reason}")
+        self.topic = topic
 
 
 class KafkaEventDispatcher:
+    """
+    Dispatch-Tabelle Topic → Handler.
+
+    Jeder Handler wird bei der Registrierung in einen Wrapper mit der
+    einheitlichen Signatur ``(value, headers)`` übersetzt, der die Nachricht
+    selbst dekodiert: Ist der erste Parameter mit einem pydantic-Modell
+    annotiert (siehe ``analytics.messaging.dto.kpi_events``), wird sie per
+    ``model_validate_json`` in einem Durchgang aus den Bytes validiert, sonst
+    per ``orjson`` als ``dict`` übergeben. Handler mit nur einem Parameter
+    erhalten nur das Event, ``headers`` darf auch Keyword-only sein.
+
+    Der Wrapper misst Dekodierung und Laufzeit je Topic und meldet ungültige
+    Nachrichten als ``KafkaPayloadError``. Lässt sich eine Signatur nicht
+    anpassen, schlägt bereits die Registrierung und damit der Start fehl.
+    """
+
     def __init__(self):
-        self._handlers: dict[str, Callable[[dict, dict], Awaitable[Any]]] = {}
+        self._handlers: dict[str, KafkaHandler] = {}
 
-    def register(self, topic: str, handler: Callable[[dict, dict], Awaitable[Any]]):
-        self._handlers[topic] = handler
+    def register(self, topic: str, handler: Callable):
+        self._handlers[topic] = _compile(topic, handler)
         # logger.info(
         #     f"📡 Kafka-Handler registriert für Topic: '{topic}' → {handler.__module__}.{handler.__name__}"
         # )
 
-    def get_handler(self, topic: str) -> Callable[[dict, dict], Awaitable[Any]] | None:
+    def get_handler(self, topic: str) -> KafkaHandler | None:
         return self._handlers.get(topic)
 
     def list_topics(self) -> list[str]:
         return list(self._handlers.keys())
+
+
+def _compile(topic: str, handler: Callable) -> KafkaHandler:
+    """
+    Erzeugt den Wrapper ``(value, headers)`` für einen Handler.
+
+    :raises TypeError: falls der Handler keine Coroutine-Funktion ist oder seine
+        Signatur weder ``(event)`` noch ``(event, headers)`` entspricht
+    """
+    name = f"{handler.__module__}.{handler.__qualname__}"
+    if not inspect.iscoroutinefunction(handler):
+        raise TypeError(f"Kafka-Handler {name} für '{topic}' ist nicht async")
+
+    required = [
+        p
+        for p in inspect.signature(handler, eval_str=True).parameters.values()
+        if p.default is p.empty and p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+    ]
+    # headers darf auch ein Keyword-only-Parameter sein: (payload, *, headers)
+    keyword = len(required) == 2 and required[1].kind == required[1].KEYWORD_ONLY
+    if (
+        not 1 <= len(required) <= 2
+        or required[0].kind not in _POSITIONAL
+        or (len(required) == 2 and not keyword and required[1].kind not in _POSITIONAL)
+        or (keyword and required[1].name != "headers")
+    ):
+        raise TypeError(
+            f"Signatur von Kafka-Handler {name} für '{topic}' nicht anpassbar: "
+            "erwartet (payload) oder (payload, headers)"
+        )
+    with_headers = len(required) == 2
+    event_type = required[0].annotation
+    typed = isinstance(event_type, type) and issubclass(event_type, BaseModel)
+    decode = event_type.model_validate_json if typed else _decode_object
+
+    timer = _handler_seconds.labels(topic)
+    decode_timer = _decode_seconds.labels(topic)
+    decoded_bytes = _decoded_bytes_counter.labels(topic)
+    invalid = _invalid_events_counter.labels(topic)
+
+    async def dispatch(
+        value: bytes, headers: Mapping[str, str]
+    ) -> list[KpiIncrement]:
+        started = time.perf_counter()
+        try:
+            payload = decode(value)
+        except ValueError as e:
+            invalid.inc()
+            raise KafkaPayloadError(topic, _reason(e)) from e
+        finally:
+            decode_timer.observe(time.perf_counter() - started)
+            decoded_bytes.inc(len(value))
+
+        started = time.perf_counter()
+        try:
+            if keyword:
+                return await handler(payload, headers=headers)
+            if with_headers:
+                return await handler(payload, headers)
+            return await handler(payload)
+        except (KeyError, ValueError) as e:
+            invalid.inc()
+            raise KafkaPayloadError(topic, repr(e)) from e
+        finally:
+            timer.observe(time.perf_counter() - started)
+
+    dispatch.__name__ = handler.__name__
+    dispatch.__qualname__ = handler.__qualname__
+    dispatch.__module__ = handler.__module__
+    logger.debug(
+        "🔌 Kafka-Handler {} für '{}' kompiliert (Event: {}, Header: {})",
+        name,
+        topic,
+        event_type.__name__ if typed else "dict",
+        with_headers,
+    )
+    return dispatch
+
+
+def _decode_object(value: bytes) -> dict:
+    payload = orjson.loads(value)
+    if not isinstance(payload, dict):
+        raise ValueError(f"JSON-Objekt erwartet: {type(payload).__name__}")
+    return payload
+
+
+def _reason(error: ValueError) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, e['loc'])) or '<root>'}: {e['msg']}"
+            for e in error.errors(include_url=False)
+        )
+    return str(error)
@@ -0,0 +1,44 @@
+"""
+KafkaHeaders – Header einer Kafka-Nachricht, die erst beim Zugriff dekodiert werden.
+"""
+
+from collections.abc import Iterator, Mapping, Sequence
+from typing import Optional
+
+__all__ = ["KafkaHeaders"]
+
+
+class KafkaHeaders(Mapping[str, str]):
+    """
+    Read-only-Sicht auf die Header einer Nachricht.
+
+    aiokafka liefert die Header als Folge von ``(Name, Bytes)``. Dekodiert wird erst,
+    wenn ein Handler tatsächlich auf einen Header zugreift; die meisten Handler
+    tun das nie.
+    """
+
+    __slots__ = ("_decoded", "_raw")
+
+    def __init__(self, raw: Optional[Sequence[tuple[str, bytes]]]) -> None:
+        self._raw = raw or ()
+        self._decoded: Optional[dict[str, str]] = None
+
+    def _headers(self) -> dict[str, str]:
+        if self._decoded is None:
+            self._decoded = {
+                name: value.decode("utf-8") if value is not None else ""
+                for name, value in self._raw
+            }
+        return self._decoded
+
+    def __getitem__(self, name: str) -> str:
+        return self._headers()[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._headers())
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __repr__(self) -> str:
+        return repr(self._headers())
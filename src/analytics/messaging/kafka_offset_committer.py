@@ -0,0 +1,124 @@
+"""
+KafkaOffsetCommitter – committet Kafka-Offsets erst nach bestätigten KPI-Writes.
+"""
+
+import time
+from collections.abc import Callable
+from typing import Final, Optional
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from aiokafka.errors import KafkaError
+from loguru import logger
+from prometheus_client import Counter, Gauge, Histogram
+
+__all__ = ["KafkaOffsetCommitter"]
+
+_commit_latency: Final = Histogram(
+    "analytics_kafka_commit_latency_seconds",
+    "Dauer eines Offset-Commits in Sekunden",
+)
+_commit_failures_counter: Final = Counter(
+    "analytics_kafka_commit_failures", "Fehlgeschlagene Offset-Commits"
+)
+_consumer_lag: Final = Gauge(
+    "analytics_kafka_consumer_lag",
+    "Nachrichten zwischen committetem Offset und High Watermark",
+    ["topic", "partition"],
+)
+
+
+class KafkaOffsetCommitter:
+    """
+    Sammelt die Offsets verarbeiteter Events je Partition und committet sie
+    gebündelt.
+
+    Ein Offset wird erst mit ``track`` vorgemerkt, nachdem die KPI-Writes des
+    Events von MongoDB bestätigt wurden. Committet wird je Partition nur der
+    höchste Offset, spätestens nach ``interval_ms`` Millisekunden oder
+    ``max_events`` Events. ``before_commit`` läuft unmittelbar vor jedem Commit,
+    z. B. um Zustand zu sichern, der zu den Offsets passen muss.
+    """
+
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        *,
+        interval_ms: int,
+        max_events: int,
+        before_commit: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._consumer: Final = consumer
+        self._before_commit: Final = before_commit
+        self._interval: Final = interval_ms / 1000
+        self._max_events: Final = max_events
+        self._pending: dict[TopicPartition, int] = {}
+        self._events = 0
+        self._last_commit = time.monotonic()
+
+    def track(self, tp: TopicPartition, offset: int, events: int = 1) -> None:
+        """
+        Merkt den Offset geschriebener Events zum Commit vor.
+
+        :param offset: Offset des letzten geschriebenen Events der Partition
+        :param events: Anzahl der Events, die damit abgeschlossen sind
+        """
+        self._pending[tp] = max(self._pending.get(tp, 0), offset + 1)
+        self._events += events
+
+    async def commit_due(self) -> None:
+        """Committet, falls das Intervall abgelaufen oder das Limit erreicht ist."""
+        if (
+            self._events >= self._max_events
+            or time.monotonic() - self._last_commit >= self._interval
+        ):
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Committet alle vorgemerkten Offsets."""
+        pending, self._pending = self._pending, {}
+        self._events = 0
+        self._last_commit = time.monotonic()
+        for tp, offset in (await self.commit(pending)).items():
+            self._pending[tp] = max(offset, self._pending.get(tp, 0))
+
+    async def commit(
+        self, offsets: dict[TopicPartition, int]
+    ) -> dict[TopicPartition, int]:
+        """
+        Committet die Offsets (nächster zu lesender Offset je Partition) der
+        zugewiesenen Partitionen. Offsets entzogener Partitionen werden verworfen,
+        deren Events stellt Kafka dem neuen Besitzer erneut zu.
+
+        :return: Offsets, die wegen eines Fehlers nicht committet wurden
+        """
+        assigned = self._consumer.assignment()
+        commit = {tp: offset for tp, offset in offsets.items() if tp in assigned}
+        if len(commit) < len(offsets):
+            logger.debug(
+                "Offsets entzogener Partitionen verworfen: {}",
+                [tp for tp in offsets if tp not in assigned],
+            )
+        if not commit:
+            return {}
+
+        if self._before_commit is not None:
+            try:
+                self._before_commit()
+            except OSError as e:
+                logger.warning("⚠️ Zustand vor Offset-Commit nicht gesichert: {}", e)
+        started = time.perf_counter()
+        try:
+            await self._consumer.commit(commit)
+        except KafkaError as e:
+            _commit_failures_counter.inc()
+            logger.warning("⚠️ Offsets nicht committet: {}", e)
+            return commit
+        _commit_latency.observe(time.perf_counter() - started)
+
+        for tp, offset in commit.items():
+            highwater = self._consumer.highwater(tp)
+            if highwater is not None:
+                _consumer_lag.labels(tp.topic, str(tp.partition)).set(
+                    max(highwater - offset, 0)
+                )
+        return {}
@@ -0,0 +1,198 @@
+"""
+PartitionLanes – verarbeitet Kafka-Events je Partition nebenläufig und in Reihenfolge.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, Final, Optional
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from loguru import logger
+from prometheus_client import Gauge
+
+__all__ = ["PartitionLanes"]
+
+_queue_depth: Final = Gauge(
+    "analytics_kafka_queue_depth",
+    "Wartende Events je Stufe und Partition",
+    ["stage", "topic", "partition"],
+)
+_paused_partitions: Final = Gauge(
+    "analytics_kafka_paused_partitions", "Wegen Rückstau pausierte Partitionen"
+)
+
+
+class _Stage:
+    """Begrenzte Warteschlange einer Stufe samt Worker-Task und Tiefen-Gauge."""
+
+    __slots__ = ("depth", "queue", "task")
+
+    def __init__(self, name: str, tp: TopicPartition, size: int) -> None:
+        self.queue: Final[asyncio.Queue] = asyncio.Queue(size)
+        self.depth: Final = _queue_depth.labels(name, tp.topic, str(tp.partition))
+        self.task: Optional[asyncio.Task] = None
+
+
+class _Lane:
+    """Handle- und Write-Stufe einer Partition."""
+
+    __slots__ = ("handle", "paused", "write")
+
+    def __init__(self, tp: TopicPartition, size: int) -> None:
+        self.handle: Final = _Stage("handle", tp, size)
+        self.write: Final = _Stage("write", tp, size)
+        self.paused = False
+
+    @property
+    def stages(self) -> tuple[_Stage, _Stage]:
+        return self.handle, self.write
+
+    @property
+    def depth(self) -> int:
+        return self.handle.queue.qsize() + self.write.queue.qsize()
+
+
+class PartitionLanes:
+    """
+    Eine zweistufige Pipeline je zugewiesener Partition.
+
+    Der Fetch-Task reicht Events mit ``submit`` an die Handle-Stufe weiter, die
+    sie an ``handle`` übergibt (Dekodieren, Handler); deren Ergebnis schreibt die
+    Write-Stufe mit ``write``. Jede Stufe hat eine begrenzte Warteschlange und
+    genau einen Worker-Task, sodass die Reihenfolge innerhalb einer Partition
+    erhalten bleibt, während Partitionen, Topics und die beiden Stufen
+    nebenläufig laufen.
+
+    Erreichen die Warteschlangen einer Partition zusammen ``high_watermark``,
+    wird sie per ``consumer.pause()`` angehalten und nach dem Abbau auf
+    ``low_watermark`` mit ``resume()`` fortgesetzt. So staut sich bei langsamen
+    Writes nichts im Speicher, und der Fetch-Task bleibt frei, um die
+    Gruppenmitgliedschaft zu halten. Lanes entstehen beim ersten Event einer
+    Partition und werden bei einem Rebalance mit ``drain`` geleert und beendet.
+
+    ``handle`` soll selbst nicht scheitern, sondern auch für fehlerhafte Events
+    ein Ergebnis liefern, über das ``write`` den Offset vorrückt; ein Event,
+    bei dem ``handle`` dennoch eine Ausnahme wirft, erreicht ``write`` nie.
+    """
+
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        handle: Callable[[Any], Awaitable[Any]],
+        write: Callable[[Any], Awaitable[None]],
+        *,
+        queue_size: int,
+        high_watermark: int,
+        low_watermark: int,
+        drain_timeout_ms: int,
+    ) -> None:
+        self._consumer: Final = consumer
+        self._handle: Final = handle
+        self._write: Final = write
+        self._queue_size: Final = queue_size
+        self._high_watermark: Final = min(high_watermark, queue_size)
+        self._low_watermark: Final = min(low_watermark, self._high_watermark)
+        self._drain_timeout: Final = drain_timeout_ms / 1000
+        self._lanes: dict[TopicPartition, _Lane] = {}
+
+    def __len__(self) -> int:
+        return len(self._lanes)
+
+    async def submit(self, tp: TopicPartition, msg: Any) -> None:
+        """
+        Reiht ein Event in die Handle-Stufe seiner Partition ein.
+
+        Erreicht die Lane die obere Marke, wird die Partition pausiert; warten
+        muss der Aufrufer nur, wenn ein einzelner Fetch mehr Events liefert, als
+        noch in die Warteschlange passen.
+        """
+        lane = self._lanes.get(tp)
+        if lane is None:
+            lane = self._lanes[tp] = _Lane(tp, self._queue_size)
+            lane.handle.task = asyncio.create_task(self._run_handle(tp, lane))
+            lane.write.task = asyncio.create_task(self._run_write(tp, lane))
+        await lane.handle.queue.put(msg)
+        lane.handle.depth.inc()
+        if not lane.paused and lane.depth >= self._high_watermark:
+            self._consumer.pause(tp)
+            lane.paused = True
+            _paused_partitions.inc()
+            logger.debug("⏸️ Partition {} pausiert ({} Events offen)", tp, lane.depth)
+
+    async def drain(self, tps: Iterable[TopicPartition]) -> None:
+        """
+        Arbeitet die Lanes der Partitionen ab und beendet sie.
+
+        Was nach ``drain_timeout_ms`` noch offen ist, wird verworfen; die Offsets
+        dieser Events sind nicht committet, Kafka stellt sie erneut zu.
+        """
+        lanes = [(tp, lane) for tp in tps if (lane := self._lanes.pop(tp, None))]
+        if not lanes:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(_join(lane) for _, lane in lanes)),
+                self._drain_timeout,
+            )
+        except TimeoutError:
+            logger.warning(
+                "⚠️ Lanes nicht rechtzeitig abgearbeitet, offene Events verworfen: {}",
+                {tp: lane.depth for tp, lane in lanes},
+            )
+        tasks = [stage.task for _, lane in lanes for stage in lane.stages]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for tp, lane in lanes:
+            for name in ("handle", "write"):
+                _queue_depth.remove(name, tp.topic, str(tp.partition))
+            if lane.paused:
+                _paused_partitions.dec()
+
+    async def close(self) -> None:
+        """Arbeitet alle Lanes ab und beendet sie."""
+        await self.drain(list(self._lanes))
+
+    async def _run_handle(self, tp: TopicPartition, lane: _Lane) -> None:
+        stage = lane.handle
+        while True:
+            msg = await stage.queue.get()
+            try:
+                item = await self._handle(msg)
+                await lane.write.queue.put(item)
+                lane.write.depth.inc()
+            except Exception as e:
+                logger.exception(f"❌ Fehler in der Lane {tp.topic}/{tp.partition}: {e}")
+            finally:
+                stage.depth.dec()
+                stage.queue.task_done()
+            self._resume_if_drained(tp, lane)
+
+    async def _run_write(self, tp: TopicPartition, lane: _Lane) -> None:
+        stage = lane.write
+        while True:
+            item = await stage.queue.get()
+            try:
+                await self._write(item)
+            except Exception as e:
+                logger.exception(f"❌ Fehler in der Lane {tp.topic}/{tp.partition}: {e}")
+            finally:
+                stage.depth.dec()
+                stage.queue.task_done()
+            self._resume_if_drained(tp, lane)
+
+    def _resume_if_drained(self, tp: TopicPartition, lane: _Lane) -> None:
+        if not lane.paused or lane.depth > self._low_watermark:
+            return
+        lane.paused = False
+        _paused_partitions.dec()
+        # Nach einem Rebalance ist die Partition womöglich nicht mehr zugewiesen
+        if tp in self._consumer.assignment():
+            self._consumer.resume(tp)
+            logger.debug("▶️ Partition {} fortgesetzt", tp)
+
+
+async def _join(lane: _Lane) -> None:
+    # Erst die Handle-Stufe: Sie füllt beim Abarbeiten noch die Write-Stufe.
+    await lane.handle.queue.join()
+    await lane.write.queue.join()
@@ -29,4 +29,5 @@ async def get_kafka_consumer() -> KafkaConsumerService:
         dispatcher=dispatcher,
         topics=dispatcher.list_topics(),
         bootstrap_servers=env.KAFKA_URI,
+        producer=get_kafka_producer(),
     )
@@ -0,0 +1,237 @@
+"""
+KpiAccumulator – Write-Behind-Puffer zwischen Kafka-Handlern und MongoDB.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Final, Optional
+
+from aiokafka import TopicPartition
+from loguru import logger
+
+from analytics.config.mongo import KPI_MODELS
+from analytics.messaging.kpi_batch import KpiBatch
+from analytics.messaging.kpi_dedup import KpiDeduplicator
+from analytics.messaging.kpi_increment import KpiIncrement
+from analytics.messaging.kpi_journal import KpiJournal
+from analytics.model.entity.base import IngestionLayout
+
+__all__ = ["KpiAccumulator", "OffsetCommitter"]
+
+OffsetCommitter = Callable[
+    [dict[TopicPartition, int]], Awaitable[dict[TopicPartition, int]]
+]
+"""
+Committet die Offsets (nächster zu lesender Offset je Partition) und liefert die
+Offsets zurück, die noch nicht committet werden konnten.
+"""
+
+
+class KpiAccumulator:
+    """
+    Sammelt die Deltas vieler Events je Bucket im Speicher und schreibt sie alle
+    ``flush_interval_ms`` Millisekunden oder nach ``flush_max_events`` Events mit
+    einem ``KpiBatch``-Flush.
+
+    Kafka-Offsets werden erst nach einem erfolgreichen Flush committet. Damit
+    Deltas, die bereits gelesen, aber noch nicht geschrieben wurden, einen Absturz
+    überleben, landet jedes Event vorher im ``KpiJournal``. Nach jedem Flush
+    hält ein Checkpoint-Eintrag die geschriebenen Offsets fest, bis sie
+    committet sind. Beim Start werden offene Journal-Einträge zuerst geschrieben;
+    Kafka stellt die zugehörigen Events erneut zu, ``skip`` erkennt sie am Offset.
+
+    Event-Einträge werden nicht einzeln gesynct und überstehen nur einen Absturz
+    des Prozesses; fehlen sie nach einem Absturz des Hosts, stellt Kafka die
+    Events erneut zu, da ihre Offsets noch nicht committet sind. Der Checkpoint
+    dagegen wird vor dem Offset-Commit gesynct, sonst würden bereits geschriebene
+    Deltas nach einem Absturz des Hosts doppelt gezählt.
+
+    Ist ein ``KpiDeduplicator`` gesetzt, übernimmt er die Schlüssel der Events
+    erst nach dem Flush, der ihre Deltas geschrieben hat.
+    """
+
+    def __init__(
+        self,
+        *,
+        layout: IngestionLayout,
+        flush_interval_ms: int,
+        flush_max_events: int,
+        commit: OffsetCommitter,
+        journal: Optional[KpiJournal] = None,
+        dedup: Optional[KpiDeduplicator] = None,
+    ) -> None:
+        self._layout: Final = layout
+        self._flush_interval: Final = flush_interval_ms / 1000
+        self._flush_max_events: Final = flush_max_events
+        self._commit: Final = commit
+        self._journal: Final = journal
+        self._dedup: Final = dedup
+        self._batch = KpiBatch(layout)
+        self._offsets: dict[TopicPartition, int] = {}
+        self._keys: list[int] = []
+        self._replayed: dict[TopicPartition, int] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._journal is not None:
+            self._journal.open()
+            await self._replay()
+        self._task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        finally:
+            if self._journal is not None:
+                self._journal.close()
+
+    def skip(self, tp: TopicPartition, offset: int) -> bool:
+        """``True``, falls das Event bereits aus dem Journal geschrieben wurde."""
+        replayed = self._replayed.get(tp)
+        if replayed is None or offset > replayed:
+            return False
+        self._offsets[tp] = max(self._offsets.get(tp, 0), offset + 1)
+        return True
+
+    async def add(
+        self,
+        tp: TopicPartition,
+        offset: int,
+        increments: list[KpiIncrement],
+        key: Optional[int] = None,
+    ) -> None:
+        """
+        Übernimmt die Inkremente eines Events; flusht beim Erreichen des Limits.
+
+        :param key: Deduplizierungsschlüssel des Events, falls aktiv
+        """
+        if self._journal is not None and increments:
+            entry = _journal_entry(tp, offset, increments, key)
+            if not self._journal.append(entry):
+                await self.flush()
+                if not self._journal.append(entry):
+                    raise ValueError(
+                        f"KPI-Journal zu klein für Event {tp.topic}@{offset}"
+                    )
+        self._batch.add(increments)
+        self._offsets[tp] = offset + 1
+        if key is not None:
+            self._keys.append(key)
+        if self._batch.events >= self._flush_max_events:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Schreibt alle offenen Deltas, gibt das Journal frei und committet die Offsets.
+
+        :return: Anzahl geschriebener Buckets
+        """
+        async with self._lock:
+            batch, self._batch = self._batch, KpiBatch(self._layout)
+            offsets, self._offsets = self._offsets, {}
+            keys, self._keys = self._keys, []
+            mark = self._journal.position if self._journal is not None else 0
+            try:
+                written = await batch.flush()
+            except BaseException:
+                batch.absorb(self._batch)
+                self._batch = batch
+                for tp, offset in offsets.items():
+                    self._offsets[tp] = max(offset, self._offsets.get(tp, 0))
+                self._keys[:0] = keys
+                raise
+
+            if self._dedup is not None:
+                self._dedup.confirm(keys)
+
+            if self._journal is not None:
+                self._journal.release(mark)
+                self._checkpoint(offsets)
+            if offsets:
+                for tp, offset in (await self._commit(offsets)).items():
+                    self._offsets.setdefault(tp, offset)
+            return written
+
+    async def _replay(self) -> None:
+        entries = self._journal.entries()
+        if not entries:
+            return
+        models = {model.__name__: model for model in KPI_MODELS}
+        events = 0
+        for entry in entries:
+            if "flushed" in entry:
+                for topic, partition, offset in entry["flushed"]:
+                    self._mark_replayed(TopicPartition(topic, partition), offset - 1)
+                continue
+            tp = TopicPartition(entry["topic"], entry["partition"])
+            increments = [
+                KpiIncrement(
+                    model=models[name],
+                    year=year,
+                    month=month,
+                    day=day,
+                    hour=hour,
+                    deltas=deltas,
+                )
+                for name, year, month, day, hour, deltas in entry["increments"]
+            ]
+            self._batch.add(increments)
+            self._mark_replayed(tp, entry["offset"])
+            if entry.get("key") is not None:
+                self._keys.append(entry["key"])
+            events += 1
+        written = await self.flush()
+        self._checkpoint({tp: offset + 1 for tp, offset in self._replayed.items()})
+        logger.warning(
+            "📓 {} Events aus dem KPI-Journal nachgeholt ({} Buckets)",
+            events,
+            written,
+        )
+
+    def _mark_replayed(self, tp: TopicPartition, offset: int) -> None:
+        self._replayed[tp] = max(self._replayed.get(tp, -1), offset)
+
+    def _checkpoint(self, offsets: dict[TopicPartition, int]) -> None:
+        """Merkt geschriebene, aber noch nicht committete Offsets im Journal vor."""
+        if not offsets:
+            return
+        entry = {"flushed": [[tp.topic, tp.partition, o] for tp, o in offsets.items()]}
+        if not self._journal.append(entry):
+            logger.warning("⚠️ KPI-Journal voll, Checkpoint nicht geschrieben")
+            return
+        # Vor dem Offset-Commit auf die Platte, nicht nur in den Page Cache
+        self._journal.sync()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception(f"❌ Fehler beim Schreiben der KPI-Deltas: {e}")
+
+
+def _journal_entry(
+    tp: TopicPartition,
+    offset: int,
+    increments: list[KpiIncrement],
+    key: Optional[int],
+) -> dict:
+    return {
+        "topic": tp.topic,
+        "partition": tp.partition,
+        "offset": offset,
+        "key": key,
+        "increments": [
+            [i.model.__name__, i.year, i.month, i.day, i.hour, i.deltas]
+            for i in increments
+        ],
+    }
@@ -0,0 +1,156 @@
+"""
+KpiBatch – fasst KPI-Inkremente je Bucket zusammen und schreibt sie gebündelt.
+"""
+
+from collections.abc import Iterable
+from typing import Any
+
+from loguru import logger
+from pymongo import UpdateOne
+
+from analytics.messaging.kpi_increment import (
+    KpiIncrement,
+    notify_bucket_written,
+    notify_kpi_written,
+)
+from analytics.model.entity.base import (
+    ROLLUPS,
+    BaseKPI,
+    Granularity,
+    IngestionLayout,
+    bulk_write_kpis,
+)
+
+__all__ = ["KpiBatch"]
+
+_Deltas = dict[str, int | float]
+_Bucket = tuple[type[BaseKPI], tuple[int, ...]]
+"""(KPI-Dokumentklasse, Werte von ``bucket.key_fields``)"""
+_Period = tuple[type[BaseKPI], Granularity, int, int]
+"""(KPI-Dokumentklasse, Granularität, Jahr, erster Monat der Periode)"""
+
+
+class KpiBatch:
+    """
+    Sammelt die Inkremente beliebig vieler Events im Speicher.
+
+    Alle Inkremente für denselben Bucket, z. B. (Collection, Jahr, Monat), werden
+    aufsummiert, sodass beim Flush pro Bucket genau ein ``$inc``-Upsert entsteht.
+    Auf Monatsebene werden die Deltas zusätzlich je Quartal und Jahr gefaltet;
+    alle Upserts gehen zusammen in einen ``bulk_write_kpis``. Bei Tages- oder
+    Stunden-Buckets bzw. Sharding entstehen alle gröberen Ebenen später per
+    Rollup.
+    """
+
+    def __init__(self, layout: IngestionLayout = IngestionLayout()) -> None:
+        self._layout = layout
+        self._buckets: dict[_Bucket, _Deltas] = {}
+        self._rollups: dict[_Period, _Deltas] = {}
+        self.events = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def add(self, increments: Iterable[KpiIncrement]) -> None:
+        """Faltet die Inkremente eines Events in die offenen Buckets."""
+        direct = self._layout.direct
+        for increment in increments:
+            key = (increment.model, increment.key(self._layout.bucket))
+            _fold(self._buckets.setdefault(key, {}), increment.deltas)
+            if direct:
+                for granularity in ROLLUPS:
+                    start = granularity.period_start(increment.month)
+                    period = (increment.model, granularity, increment.year, start)
+                    _fold(self._rollups.setdefault(period, {}), increment.deltas)
+        self.events += 1
+
+    async def flush(self) -> int:
+        """
+        Schreibt alle offenen Buckets und Rollups nach MongoDB und leert den Batch.
+
+        Schlägt ein Teil der Writes fehl, bleiben nur die nicht geschriebenen
+        Buckets bzw. Rollups erhalten, und die erste Exception wird
+        weitergereicht. Ein erneuter Flush zählt bereits geschriebene Upserts
+        daher nicht doppelt; nur bei unklarem Ausgang, etwa nach einem
+        Verbindungsabbruch, wird der ganze Write wiederholt (at least once).
+
+        :return: Anzahl geschriebener Buckets
+        """
+        if not self._buckets and not self._rollups:
+            return 0
+
+        buckets, self._buckets = self._buckets, {}
+        rollups, self._rollups = self._rollups, {}
+        events, self.events = self.events, 0
+        operations = [
+            self._operation(model, key, deltas)
+            for (model, key), deltas in buckets.items()
+        ]
+        operations += [
+            model.rollup_operation(granularity, year, month, deltas)
+            for (model, granularity, year, month), deltas in rollups.items()
+        ]
+        try:
+            failed, error = await bulk_write_kpis(operations, ordered=False)
+        except BaseException:
+            # Abbruch, z. B. beim Beenden: alles für einen weiteren Flush behalten
+            self._restore(buckets, rollups, events)
+            raise
+
+        keys = [*buckets, *rollups]
+        failed_keys = {keys[index] for index in failed}
+        written = [bucket for bucket in buckets if bucket not in failed_keys]
+        if failed:
+            self._restore(
+                {k: d for k, d in buckets.items() if k in failed_keys},
+                {k: d for k, d in rollups.items() if k in failed_keys},
+                events,
+            )
+        self._notify(buckets, written)
+        if error is not None:
+            raise error
+        logger.debug(
+            "📦 KPI-Batch geschrieben: {} Events → {} Buckets", events, len(buckets)
+        )
+        return len(buckets)
+
+    def absorb(self, other: "KpiBatch") -> None:
+        """Übernimmt die offenen Buckets, Rollups und Events eines anderen Batches."""
+        self._restore(other._buckets, other._rollups, other.events)
+        other._buckets, other._rollups, other.events = {}, {}, 0
+
+    def _restore(
+        self,
+        buckets: dict[_Bucket, _Deltas],
+        rollups: dict[_Period, _Deltas],
+        events: int,
+    ) -> None:
+        for key, deltas in buckets.items():
+            _fold(self._buckets.setdefault(key, {}), deltas)
+        for period, deltas in rollups.items():
+            _fold(self._rollups.setdefault(period, {}), deltas)
+        self.events += events
+
+    def _operation(
+        self, model: type[BaseKPI], key: tuple[int, ...], deltas: _Deltas
+    ) -> tuple[Any, UpdateOne]:
+        layout = self._layout
+        if layout.direct:
+            return model.month_operation(*key, deltas)
+        return model.bucket_operation(layout, layout.document_key(key), deltas)
+
+    def _notify(self, buckets: dict[_Bucket, _Deltas], written: list[_Bucket]) -> None:
+        if self._layout.direct:
+            for model, (year, month) in written:
+                notify_kpi_written(model, year, month, buckets[model, (year, month)])
+            return
+        months: dict[tuple[type[BaseKPI], int, int], _Deltas] = {}
+        for model, key in written:
+            _fold(months.setdefault((model, key[0], key[1]), {}), buckets[model, key])
+        for (model, year, month), deltas in months.items():
+            notify_bucket_written(model, year, month, deltas)
+
+
+def _fold(fields: _Deltas, deltas: _Deltas) -> None:
+    for name, delta in deltas.items():
+        fields[name] = fields.get(name, 0) + delta
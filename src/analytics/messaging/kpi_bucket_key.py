@@ -0,0 +1,141 @@
+"""
+Bucket-Schlüssel (Jahr, Monat, Tag, Stunde) aus ISO-8601-Zeitstempeln der Events.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime, timedelta, tzinfo
+from typing import Final, NamedTuple, Optional
+
+from analytics.config.ingestion import ingestion_timezone
+
+__all__ = ["BucketKey", "KpiBucketKeys", "bucket_key", "bucket_keys"]
+
+_CACHE_SIZE: Final = 4096
+"""Maximale Anzahl gemerkter Präfixe; ein Monat hat höchstens 744 Stunden."""
+
+_HOUR: Final = timedelta(hours=1)
+_MINUTE: Final = timedelta(minutes=1)
+_TICK: Final = timedelta(microseconds=1)
+
+
+class BucketKey(NamedTuple):
+    """Zeitliche Position eines KPI-Inkrements."""
+
+    year: int
+    month: int
+    day: int
+    hour: int
+
+
+_new: Final = tuple.__new__
+"""Baut ``BucketKey`` ohne den langsameren ``NamedTuple``-Konstruktor."""
+
+
+class KpiBucketKeys:
+    """
+    Liest den Bucket-Schlüssel aus dem Präfix ``YYYY-MM-DDTHH`` eines Zeitstempels.
+
+    Gemerkt wird der Schlüssel je Präfix und UTC-Offset; Events derselben
+    Stunde kosten so einen Dict-Zugriff. Ein Präfix gelangt erst nach einem
+    vollständigen ``datetime.fromisoformat`` in den Cache, Präfix und Offset
+    sind damit geprüft; Minuten, Sekunden und Bruchteile prüft nur der erste
+    Zeitstempel je Präfix und Offset. Ungültige Präfixe und Offsets lösen
+    ``ValueError`` aus.
+
+    Ohne Berichts-Zeitzone zählt die Ortszeit des Zeitstempels selbst, ebenso für
+    Zeitstempel ohne Offset (gelten als bereits in der Berichts-Zeitzone); der
+    Schlüssel steht dann vollständig im Präfix, wie bei UTC-Zeitstempeln und
+    UTC als Berichts-Zeitzone. Sonst wird beim ersten Zeitstempel einer Stunde
+    umgerechnet: Unterscheiden sich Quell- und Ziel-Offset die ganze Stunde über
+    um ganze Stunden, gilt das Ergebnis für die Stunde, bei ganzen Minuten (etwa
+    ``+05:30`` nach UTC) je Minute. Nur bei anderen Offsets und einem Wechsel
+    der Ziel-Zeitzone innerhalb einer Minute wird jeder Zeitstempel vollständig
+    geparst, ebenso im Basisformat und bei reinen Datumsangaben.
+    """
+
+    __slots__ = ("_cache", "_timezone")
+
+    def __init__(self, timezone: Optional[tzinfo] = None) -> None:
+        self._timezone: Final = timezone
+        self._cache: dict[str, BucketKey] = {}
+
+    def key(self, value: str | datetime) -> BucketKey:
+        """
+        Bucket-Schlüssel eines Zeitstempels.
+
+        :param value: ISO-8601-Zeitstempel als Text oder ``datetime``
+        :return: (Jahr, Monat, Tag, Stunde) in der Berichts-Zeitzone
+        :raises ValueError: falls der Zeitstempel kein ISO-8601 ist
+        """
+        if not isinstance(value, str):
+            return self._convert(value)
+        offset = "Z" if value[-1:] == "Z" else _offset(value)
+        key = self._cache.get(value[:13] + offset)
+        if key is None:
+            key = self._cache.get(value[:16] + offset) or self._miss(value, offset)
+        return key
+
+    def keys(self, values: Iterable[str | datetime]) -> list[BucketKey]:
+        """Bucket-Schlüssel mehrerer Zeitstempel, z. B. eines Batches."""
+        cache, key = self._cache, self.key
+        return [
+            cache.get(v[:13] + ("Z" if v[-1:] == "Z" else _offset(v))) or key(v)
+            if isinstance(v, str)
+            else key(v)
+            for v in values
+        ]
+
+    def _miss(self, value: str, offset: str) -> BucketKey:
+        dt = datetime.fromisoformat(value)
+        key = self._convert(dt)
+        if value[4:5] != "-" or value[7:8] != "-" or value[13:14] != ":":
+            # Basisformat, nur Datum o. Ä.: kein Präfix ``YYYY-MM-DDTHH:``
+            return key
+        if self._timezone is None or dt.tzinfo is None:
+            self._store(value[:13] + offset, key)
+            return key
+        hour = dt.replace(minute=0, second=0, microsecond=0)
+        if self._steady(hour, _HOUR):
+            self._store(value[:13] + offset, key)
+        elif self._steady(hour.replace(minute=dt.minute), _MINUTE):
+            self._store(value[:16] + offset, key)
+        return key
+
+    def _steady(self, start: datetime, length: timedelta) -> bool:
+        """
+        ``True``, falls der Ziel-Offset im Zeitraum gleich bleibt und sich vom
+        Quell-Offset um ein Vielfaches von ``length`` unterscheidet: Dann liegen
+        alle Zeitstempel des Zeitraums im selben Bucket.
+        """
+        first = start.astimezone(self._timezone).utcoffset()
+        last = (start + length - _TICK).astimezone(self._timezone).utcoffset()
+        shift = first - start.utcoffset()
+        return first == last and not shift % length
+
+    def _store(self, prefix: str, key: BucketKey) -> None:
+        if len(self._cache) >= _CACHE_SIZE:
+            self._cache.clear()
+        self._cache[prefix] = key
+
+    def _convert(self, dt: datetime) -> BucketKey:
+        if self._timezone is not None and dt.tzinfo is not None:
+            dt = dt.astimezone(self._timezone)
+        return _new(BucketKey, (dt.year, dt.month, dt.day, dt.hour))
+
+
+def _offset(value: str) -> str:
+    """UTC-Offset eines ISO-8601-Zeitstempels als Text, leer ohne Offset."""
+    if value[-1:] in ("Z", "z"):
+        return value[-1:]
+    # Nach dem Datum kommen Vorzeichen nur noch im Offset vor
+    sign = max(value.rfind("+"), value.rfind("-"))
+    return value[sign:] if sign > 10 else ""
+
+
+_default: Final = KpiBucketKeys(ingestion_timezone)
+
+bucket_key: Final = _default.key
+"""Bucket-Schlüssel eines Zeitstempels in der konfigurierten Berichts-Zeitzone."""
+
+bucket_keys: Final = _default.keys
+"""Bucket-Schlüssel mehrerer Zeitstempel in der konfigurierten Berichts-Zeitzone."""
@@ -0,0 +1,280 @@
+"""
+KpiDeduplicator – erkennt erneut zugestellte Kafka-Events, bevor ihre KPI-Inkremente
+ein zweites Mal geschrieben werden.
+"""
+
+import os
+import struct
+from array import array
+from collections import deque
+from collections.abc import Iterable
+from functools import cache
+from hashlib import blake2b
+from pathlib import Path
+from typing import Final, Optional
+
+from loguru import logger
+from prometheus_client import Counter
+
+__all__ = ["EVENT_ID_HEADER", "KpiDeduplicator", "event_key"]
+
+EVENT_ID_HEADER: Final = "x-event-id"
+"""Header mit der fachlichen Event-ID; fehlt er, zählt die Position der Nachricht."""
+
+_duplicates_counter: Final = Counter(
+    "analytics_kafka_duplicate_events",
+    "Verworfene, bereits verarbeitete Kafka-Events",
+    ["source"],
+)
+
+_PATTERNS: Final = 1 << 12
+"""Anzahl vorberechneter Bitmuster je 64-Bit-Wort."""
+
+_PATTERN_MASK: Final = _PATTERNS - 1
+
+_BITS_PER_PATTERN: Final = 5
+"""Gesetzte Bits je Muster und Wort; jeder Schlüssel belegt zwei Wörter."""
+
+_SNAPSHOT_HEADER: Final = struct.Struct("<4sHIIQ")
+"""Magic, Version, Wörter je Filter, Fenstergröße, Einträge im aktiven Filter."""
+
+_SNAPSHOT_MAGIC: Final = b"KDDP"
+_SNAPSHOT_VERSION: Final = 2
+"""Version 2: Schlüssel enthalten das Topic; Snapshots der Version 1 verfallen."""
+
+_KEY_BYTES: Final = 16
+
+_LOG_SUFFIX: Final = ".log"
+"""Endung des Schlüssel-Logs neben dem Snapshot."""
+_POSITION: Final = struct.Struct("<iq")
+
+
+def event_key(
+    topic: str, event_id: Optional[bytes], partition: int, offset: int
+) -> int:
+    """
+    Bildet den Deduplizierungsschlüssel eines Events.
+
+    Ohne Event-ID bestimmen Topic, Partition und Offset das Event: Genau diese
+    wiederholen sich bei einer erneuten Zustellung, während gleiche Nutzlasten
+    unterschiedlicher Events (z. B. nur ein ``timestamp``) verschieden bleiben.
+
+    :param topic: Topic der Kafka-Nachricht
+    :param event_id: Wert des Headers ``x-event-id``, falls vorhanden
+    :param partition: Partition der Kafka-Nachricht
+    :param offset: Offset der Kafka-Nachricht
+    :return: 128-Bit-Fingerabdruck (BLAKE2b)
+    """
+    digest = blake2b(topic.encode(), digest_size=_KEY_BYTES)
+    if event_id:
+        digest.update(b"\0id\0" + event_id)
+    else:
+        digest.update(b"\0pos\0" + _POSITION.pack(partition, offset))
+    return int.from_bytes(digest.digest(), "little")
+
+
+@cache
+def _patterns() -> tuple[int, ...]:
+    # Deterministisch aus BLAKE2b abgeleitet, damit Snapshots Neustarts und
+    # Python-Versionen überdauern.
+    patterns: list[int] = []
+    for index in range(_PATTERNS):
+        digest = blake2b(index.to_bytes(4, "little"), digest_size=32).digest()
+        pattern = 0
+        for byte in digest:
+            pattern |= 1 << (byte & 63)
+            if pattern.bit_count() == _BITS_PER_PATTERN:
+                break
+        patterns.append(pattern)
+    return tuple(patterns)
+
+
+class KpiDeduplicator:
+    """
+    Speicherbegrenzter Index bereits geschriebener Events.
+
+    Die letzten ``window`` Schlüssel stehen exakt in einem Set. Ältere Schlüssel
+    erkennt ein rotierender, geblockter Bloom-Filter: Jeder Schlüssel setzt ein
+    vorberechnetes Bitmuster in zwei 64-Bit-Wörtern, sodass eine Prüfung nur zwei
+    Array-Zugriffe kostet. Neue Schlüssel landen im aktiven und im nächsten
+    Filter; geprüft wird nur der aktive. Nach ``capacity`` Schlüsseln wird der
+    nächste Filter aktiv und ein leerer rückt nach – jeder Schlüssel bleibt so
+    für mindestens ``capacity`` weitere Events erkennbar.
+
+    Schlüssel werden mit ``reserve`` vorgemerkt, sobald ein Event angenommen
+    wird, und erst mit ``confirm`` übernommen, wenn seine Writes bestätigt sind.
+    ``confirm`` hängt sie sofort an das Schlüssel-Log ``<path>.log`` an: Gerade
+    die geschriebenen, aber noch nicht committeten Events stellt Kafka nach
+    einem Absturz erneut zu. ``save`` läuft vor jedem Offset-Commit, schreibt
+    den Snapshot und leert danach das Log; ``load`` liest beides. Das Log wird
+    per ``os.write`` ohne ``fsync`` geschrieben und übersteht so einen Absturz
+    des Prozesses, nicht aber des Betriebssystems.
+    """
+
+    def __init__(
+        self, *, window: int, capacity: int, path: Optional[str | Path] = None
+    ) -> None:
+        # Das Fenster muss im aktiven Filter liegen, siehe ``seen``.
+        self._window: Final = min(window, capacity)
+        self._capacity: Final = capacity
+        self._path: Final = Path(path) if path else None
+        # ≥ 32 Bit je Schlüssel und Filter: Fehlerrate ≈ 1e-5
+        self._words: Final = 1 << max(capacity // 2, 1).bit_length()
+        self._mask: Final = self._words - 1
+        self._patterns: Final = _patterns()
+        self._active = array("Q", bytes(8 * self._words))
+        self._next = array("Q", bytes(8 * self._words))
+        self._filled = 0
+        self._recent: set[int] = set()
+        self._order: deque[int] = deque()
+        self._pending: set[int] = set()
+        self._dirty = False
+        self._log: Optional[int] = None
+
+    def seen(self, key: int) -> bool:
+        """``True``, falls das Event bereits angenommen oder geschrieben wurde."""
+        # Das Fenster ist eine Teilmenge des aktiven Filters: Für neue Events, den
+        # Normalfall, entscheidet meist schon das erste Wort.
+        if key in self._pending:
+            _duplicates_counter.labels("window").inc()
+            return True
+        words, patterns, mask = self._active, self._patterns, self._mask
+        pattern = patterns[(key >> 32) & _PATTERN_MASK]
+        if words[key & mask] & pattern != pattern:
+            return False
+        pattern = patterns[(key >> 80) & _PATTERN_MASK]
+        if words[(key >> 48) & mask] & pattern != pattern:
+            return False
+        _duplicates_counter.labels("window" if key in self._recent else "bloom").inc()
+        return True
+
+    def reserve(self, key: int) -> None:
+        """Merkt ein angenommenes, noch nicht geschriebenes Event vor."""
+        self._pending.add(key)
+
+    def release(self, key: int) -> None:
+        """Gibt ein vorgemerktes Event frei, dessen Write fehlgeschlagen ist."""
+        self._pending.discard(key)
+
+    def confirm(self, keys: Iterable[int]) -> None:
+        """Übernimmt die Schlüssel geschriebener Events in Fenster, Filter und Log."""
+        added = [key for key in keys if self._add(key)]
+        if added and self._log is not None:
+            data = b"".join(key.to_bytes(_KEY_BYTES, "little") for key in added)
+            os.write(self._log, data)
+
+    def _add(self, key: int) -> bool:
+        self._pending.discard(key)
+        if key in self._recent:
+            return False
+        if len(self._order) >= self._window:
+            self._recent.discard(self._order.popleft())
+        self._order.append(key)
+        self._recent.add(key)
+
+        patterns, mask = self._patterns, self._mask
+        first, second = key & mask, (key >> 48) & mask
+        first_pattern = patterns[(key >> 32) & _PATTERN_MASK]
+        second_pattern = patterns[(key >> 80) & _PATTERN_MASK]
+        for words in (self._active, self._next):
+            words[first] |= first_pattern
+            words[second] |= second_pattern
+        self._filled += 1
+        if self._filled >= self._capacity:
+            self._active = self._next
+            self._next = array("Q", bytes(8 * self._words))
+            self._filled = 0
+        self._dirty = True
+        return True
+
+    def load(self) -> None:
+        """
+        Lädt den Snapshot, sofern vorhanden und zur Konfiguration passend, und
+        danach die Schlüssel aus dem Log; öffnet das Log für ``confirm``.
+        """
+        if self._path is None:
+            return
+        if self._path.exists():
+            self._load_snapshot(self._path.read_bytes())
+        log = self._path.with_suffix(self._path.suffix + _LOG_SUFFIX)
+        if log.exists():
+            data = log.read_bytes()
+            # Ein beim Absturz halb geschriebener Schlüssel am Ende zählt nicht
+            end = len(data) - len(data) % _KEY_BYTES
+            for i in range(0, end, _KEY_BYTES):
+                self._add(int.from_bytes(data[i : i + _KEY_BYTES], "little"))
+            if end:
+                logger.info("🧾 Dedup-Log geladen: {} Schlüssel", end // _KEY_BYTES)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._log = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        if log.stat().st_size % _KEY_BYTES:
+            # Halben Schlüssel abschneiden, sonst verschieben sich alle folgenden
+            os.ftruncate(self._log, end)
+
+    def close(self) -> None:
+        """Schließt das Schlüssel-Log."""
+        if self._log is not None:
+            os.close(self._log)
+            self._log = None
+
+    def _load_snapshot(self, data: bytes) -> None:
+        filter_bytes = 8 * self._words
+        try:
+            magic, version, words, window, filled = _SNAPSHOT_HEADER.unpack_from(
+                data
+            )
+        except struct.error:
+            magic = None
+        offset = _SNAPSHOT_HEADER.size
+        if (
+            magic != _SNAPSHOT_MAGIC
+            or version != _SNAPSHOT_VERSION
+            or words != self._words
+            or (len(data) - offset - 2 * filter_bytes) % _KEY_BYTES
+        ):
+            logger.warning(
+                "⚠️ Dedup-Snapshot {} passt nicht zur Konfiguration, ignoriert",
+                self._path,
+            )
+            return
+
+        self._active = array("Q", data[offset : offset + filter_bytes])
+        offset += filter_bytes
+        self._next = array("Q", data[offset : offset + filter_bytes])
+        offset += filter_bytes
+        self._filled = filled
+        keys = [
+            int.from_bytes(data[i : i + _KEY_BYTES], "little")
+            for i in range(offset, len(data), _KEY_BYTES)
+        ][-self._window :]
+        self._order = deque(keys)
+        self._recent = set(keys)
+        logger.info(
+            "🧾 Dedup-Snapshot geladen: {} Schlüssel im Fenster", len(self._recent)
+        )
+
+    def save(self) -> None:
+        """Schreibt alle bestätigten Schlüssel atomar in den Snapshot, leert das Log."""
+        if self._path is None or not self._dirty:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self._path.with_suffix(self._path.suffix + ".tmp")
+        with temporary.open("wb") as file:
+            file.write(
+                _SNAPSHOT_HEADER.pack(
+                    _SNAPSHOT_MAGIC,
+                    _SNAPSHOT_VERSION,
+                    self._words,
+                    self._window,
+                    self._filled,
+                )
+            )
+            file.write(self._active.tobytes())
+            file.write(self._next.tobytes())
+            file.write(b"".join(k.to_bytes(_KEY_BYTES, "little") for k in self._order))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self._path)
+        if self._log is not None:
+            os.ftruncate(self._log, 0)
+        self._dirty = False
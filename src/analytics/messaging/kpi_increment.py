@@ -0,0 +1,117 @@
+"""Beschreibung einer KPI-Änderung, wie sie ein Kafka-Handler liefert."""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from analytics.model.entity.base import (
+    BaseKPI,
+    IngestionBucket,
+    IngestionLayout,
+    bulk_write_kpis,
+)
+
+__all__ = [
+    "KpiIncrement",
+    "KpiWriteListener",
+    "notify_bucket_written",
+    "notify_kpi_written",
+    "on_bucket_written",
+    "on_kpi_written",
+]
+
+KpiWriteListener = Callable[[type[BaseKPI], int, int, dict[str, int | float]], None]
+"""Callback (model, year, month, deltas) nach einem bestätigten KPI-Write."""
+
+_write_listeners: list[KpiWriteListener] = []
+_bucket_listeners: list[KpiWriteListener] = []
+
+
+def on_kpi_written(listener: KpiWriteListener) -> KpiWriteListener:
+    """Registriert einen Listener, der nach jedem bestätigten KPI-Write läuft."""
+    _write_listeners.append(listener)
+    return listener
+
+
+def notify_kpi_written(
+    model: type[BaseKPI], year: int, month: int, deltas: dict[str, int | float]
+) -> None:
+    for listener in _write_listeners:
+        listener(model, year, month, deltas)
+
+
+def on_bucket_written(listener: KpiWriteListener) -> KpiWriteListener:
+    """
+    Registriert einen Listener für Writes auf Tages- oder Stunden-Buckets.
+
+    Die Deltas sind je Monat zusammengefasst; die Monatsdokumente selbst sind zu
+    diesem Zeitpunkt noch nicht aktualisiert.
+    """
+    _bucket_listeners.append(listener)
+    return listener
+
+
+def notify_bucket_written(
+    model: type[BaseKPI], year: int, month: int, deltas: dict[str, int | float]
+) -> None:
+    for listener in _bucket_listeners:
+        listener(model, year, month, deltas)
+
+
+@dataclass(eq=False, slots=True, kw_only=True)
+class KpiIncrement:
+    """Data class für die Inkremente eines KPI-Buckets (Collection, Jahr, Monat)."""
+
+    model: type[BaseKPI]
+    """KPI-Dokumentklasse, deren Collection verändert wird."""
+
+    year: int
+    """Jahr des Buckets."""
+
+    month: int
+    """Monat des Buckets."""
+
+    day: int = 1
+    """Tag des Buckets; nur bei ``IngestionBucket.DAY``/``HOUR`` relevant."""
+
+    hour: int = 0
+    """Stunde des Buckets; nur bei ``IngestionBucket.HOUR`` relevant."""
+
+    deltas: dict[str, int | float]
+    """Feldname → Betrag, um den das Feld erhöht wird."""
+
+    written: int = field(default=0, init=False)
+    """Anzahl der von ``apply`` bereits geschriebenen ``$inc``-Upserts."""
+
+    def key(self, bucket: IngestionBucket) -> tuple[int, ...]:
+        """Werte von ``bucket.key_fields``, z. B. (Jahr, Monat, Tag)."""
+        return tuple(getattr(self, name) for name in bucket.key_fields)
+
+    async def apply(self, layout: IngestionLayout = IngestionLayout()) -> None:
+        """
+        Schreibt das Inkrement sofort.
+
+        Im direkten Layout gehen Monat, Quartal und Jahr als ``$inc``-Upserts
+        geordnet in einen ``bulk_write_kpis``, ab MongoDB 8.0 ein Round Trip;
+        sonst ein Upsert in die Bucket-Collection, aus der die Monatswerte per
+        Rollup entstehen. Nach einem Fehler setzt ein erneuter Aufruf beim
+        ersten nicht geschriebenen Upsert fort, keiner zählt doppelt.
+        """
+        if layout.direct:
+            operations = self.model.increment_operations(
+                self.year, self.month, self.deltas
+            )
+            notify = notify_kpi_written
+        else:
+            key = layout.document_key(self.key(layout.bucket))
+            operations = [self.model.bucket_operation(layout, key, self.deltas)]
+            notify = notify_bucket_written
+        pending = operations[self.written :]
+        if not pending:
+            return
+        failed, error = await bulk_write_kpis(pending, ordered=True)
+        if not self.written and len(failed) < len(pending):
+            # Der Monat bzw. Bucket ist geschrieben
+            notify(self.model, self.year, self.month, self.deltas)
+        self.written += len(pending) - len(failed)
+        if error is not None:
+            raise error
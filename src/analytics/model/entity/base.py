@@ -1,16 +1,141 @@
+import asyncio
+import random
+from collections.abc import Iterable
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, ClassVar, Final, Optional
 from uuid import UUID, uuid4
 from beanie import Document
 from datetime import datetime
 
+from bson import Binary
+from loguru import logger
 from pydantic import Field
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, ClientBulkWriteException, InvalidOperation
 import strawberry
 
 
+DELTA_FIELDS: Final = frozenset({"mom_delta", "yoy_delta"})
+"""Veränderung der Leitkennzahl zur Vorperiode bzw. zur Vorjahresperiode."""
+
+
+@strawberry.enum
+class Granularity(Enum):
+    """Zeitraum eines KPI-Dokuments; der Wert ist die Anzahl Monate."""
+
+    MONTH = 1
+    QUARTER = 3
+    YEAR = 12
+
+    def period_start(self, month: int) -> int:
+        """Erster Monat der Periode, in der ``month`` liegt."""
+        return month - (month - 1) % self.value
+
+
+ROLLUPS: Final = (Granularity.QUARTER, Granularity.YEAR)
+"""Granularitäten, die als eigene Rollup-Collections gepflegt werden."""
+
+_ROLLUP_SUFFIXES: Final = {Granularity.QUARTER: "quarterly", Granularity.YEAR: "yearly"}
+
+REVISION_FIELD: Final = "revision"
+"""
+Zähler je Monatsdokument, den jeder Write erhöht; Rollups tragen die Summe über
+ihre Monate und werden nur durch einen gleich alten oder neueren Stand ersetzt.
+"""
+
+BASELINE_FIELD: Final = "baseline"
+"""
+Teil-Dokument je Monat mit den direkt, also nicht über Buckets geschriebenen
+Werten. Der Rollup aus Buckets setzt einen Monat auf Baseline + Bucket-Summen,
+sodass ein Wechsel des Ingestion-Layouts keine Monatswerte verliert.
+"""
+
+
+class IngestionBucket(Enum):
+    """Feinste Ebene, auf der eingehende KPI-Inkremente gespeichert werden."""
+
+    MONTH = ("year", "month")
+    DAY = ("year", "month", "day")
+    HOUR = ("year", "month", "day", "hour")
+
+    @property
+    def key_fields(self) -> tuple[str, ...]:
+        """Zeitfelder, die ein Bucket-Dokument bestimmen."""
+        return self.value
+
+
+_BUCKET_SUFFIXES: Final = {
+    IngestionBucket.MONTH: "monthly",
+    IngestionBucket.DAY: "daily",
+    IngestionBucket.HOUR: "hourly",
+}
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class IngestionLayout:
+    """Data class dafür, wie eingehende KPI-Inkremente gespeichert werden."""
+
+    bucket: IngestionBucket = IngestionBucket.MONTH
+    """Feinste Zeitebene der Bucket-Dokumente."""
+
+    shards: int = 1
+    """Teil-Dokumente je Bucket (Sharded Counter); 1 schaltet Sharding ab."""
+
+    @property
+    def direct(self) -> bool:
+        """Handler erhöhen die Monatsdokumente direkt, ohne Rollup."""
+        return self.bucket is IngestionBucket.MONTH and self.shards <= 1
+
+    @property
+    def sharded(self) -> bool:
+        return self.shards > 1
+
+    @property
+    def key_fields(self) -> tuple[str, ...]:
+        """Felder, die ein Bucket-Dokument eindeutig bestimmen."""
+        return self.bucket.key_fields + (("shard",) if self.sharded else ())
+
+    @property
+    def suffix(self) -> str:
+        """Namenszusatz der Bucket-Collections, z. B. ``daily_sharded``."""
+        suffix = _BUCKET_SUFFIXES[self.bucket]
+        return f"{suffix}_sharded" if self.sharded else suffix
+
+    @property
+    def index(self) -> IndexModel:
+        """Eindeutiger Index über ``key_fields``."""
+        return IndexModel(
+            [(name, ASCENDING) for name in self.key_fields],
+            name=f"{'_'.join(self.key_fields)}_unique",
+            unique=True,
+        )
+
+    def document_key(self, values: tuple[int, ...]) -> dict[str, int]:
+        """
+        Filter auf das Bucket-Dokument zu ``values`` (Werte von ``bucket.key_fields``).
+
+        Bei Sharding wird pro Aufruf zufällig eines der Teil-Dokumente gewählt,
+        sodass parallele Writer sich selten dasselbe Dokument teilen.
+        """
+        key = dict(zip(self.bucket.key_fields, values))
+        if self.sharded:
+            key["shard"] = random.randrange(self.shards)
+        return key
+
+
 @strawberry.type
 class BaseKPIType:
     id: strawberry.ID | None
     year: int
     month: int
+    mom_delta: Optional[float] = None
+    yoy_delta: Optional[float] = None
+
+
+def format_kpi_id(value) -> str:
+    """Wandelt die ``_id`` eines rohen KPI-Dokuments in die GraphQL-ID um."""
+    return str(value.as_uuid()) if isinstance(value, Binary) else str(value)
 
 
 class BaseKPI(Document):
@@ -18,8 +143,92 @@ class BaseKPI(Document):
     year: int
     month: int
 
+    headline: ClassVar[Optional[str]] = None
+    """Leitkennzahl, für die ``mom_delta`` und ``yoy_delta`` berechnet werden."""
+
+    ratios: ClassVar[dict[str, tuple[str, str]]] = {}
+    """Abgeleitetes Feld → (Zähler, Nenner); bei Nenner 0 ist der Wert 0."""
+
     class Settings:
         use_state_management = True
+        indexes = [
+            IndexModel(
+                [("year", ASCENDING), ("month", ASCENDING)],
+                name="year_month_unique",
+                unique=True,
+            )
+        ]
+
+    @classmethod
+    def collection(cls, granularity: Granularity = Granularity.MONTH):
+        """
+        Motor-Collection für die Granularität.
+
+        Quartals- und Jahreswerte liegen in ``<name>_quarterly`` bzw.
+        ``<name>_yearly``; ``month`` ist dort der erste Monat der Periode.
+        """
+        collection = cls.get_motor_collection()
+        if granularity is Granularity.MONTH:
+            return collection
+        return collection.database[f"{collection.name}_{_ROLLUP_SUFFIXES[granularity]}"]
+
+    @classmethod
+    def bucket_collection(cls, layout: IngestionLayout):
+        """
+        Motor-Collection für Inkremente im Layout ``layout``.
+
+        Ohne Tages-/Stunden-Buckets und ohne Sharding sind das die Monatsdokumente
+        selbst. Sonst z. B. ``<name>_daily`` oder ``<name>_monthly_sharded``;
+        Monatswerte werden daraus per Rollup abgeleitet.
+        """
+        collection = cls.get_motor_collection()
+        if layout.direct:
+            return collection
+        return collection.database[f"{collection.name}_{layout.suffix}"]
+
+    @classmethod
+    def stored_fields(cls) -> list[str]:
+        """KPI-Felder, die in MongoDB gespeichert werden."""
+        return [name for name in cls.model_fields if name not in BaseKPI.model_fields]
+
+    @classmethod
+    def derived_fields(cls) -> frozenset[str]:
+        """Felder, die nicht gespeichert, sondern beim Lesen berechnet werden."""
+        return frozenset(cls.ratios) | (DELTA_FIELDS if cls.headline else frozenset())
+
+    @classmethod
+    def derive(
+        cls,
+        values: dict[str, Any],
+        previous_month: Optional[dict[str, Any]] = None,
+        previous_year: Optional[dict[str, Any]] = None,
+    ) -> dict[str, Any]:
+        """
+        Berechnet die abgeleiteten Felder eines Monats in Python.
+
+        Gegenstück zur Aggregation in ``analytics.graphql.query`` für Daten, die
+        bereits im Speicher liegen.
+
+        :param values: Gespeicherte Felder des Monats
+        :param previous_month: Gespeicherte Felder des Vormonats, falls vorhanden
+        :param previous_year: Gespeicherte Felder des Vorjahresmonats, falls vorhanden
+        :return: Abgeleitetes Feld → Wert
+        """
+        derived: dict[str, Any] = {}
+        for name, (numerator, denominator) in cls.ratios.items():
+            divisor = values.get(denominator) or 0
+            derived[name] = values.get(numerator, 0) / divisor if divisor > 0 else 0
+        if cls.headline:
+            current = values.get(cls.headline)
+            for name, previous in (
+                ("mom_delta", previous_month),
+                ("yoy_delta", previous_year),
+            ):
+                before = previous.get(cls.headline) if previous else None
+                derived[name] = (
+                    None if current is None or before is None else current - before
+                )
+        return derived
 
     @classmethod
     async def get_or_create(cls, year: int, month: int):
@@ -28,3 +237,312 @@ class BaseKPI(Document):
             instance = cls(year=year, month=month)
             await instance.insert()
         return instance
+
+    @classmethod
+    async def increment(cls, year: int, month: int, **deltas: int | float) -> None:
+        """
+        Erhöht KPI-Felder eines Monats samt Quartal und Jahr atomar je Dokument.
+
+        Alle drei ``$inc``-Upserts aus ``increment_operations`` gehen geordnet in
+        einen ``bulk_write`` (siehe ``bulk_write_kpis``). Im Gegensatz zu
+        ``get_or_create`` + ``save`` verlieren parallele Consumer keine Updates.
+
+        :raises Exception: erster Fehler, falls nicht alle Writes durchgingen
+        """
+        _, error = await bulk_write_kpis(
+            cls.increment_operations(year, month, deltas), ordered=True
+        )
+        if error is not None:
+            raise error
+
+    @classmethod
+    def increment_operations(
+        cls, year: int, month: int, deltas: dict[str, int | float]
+    ) -> list[tuple[Any, UpdateOne]]:
+        """
+        ``$inc``-Upserts für Monat, Quartal und Jahr, in dieser Reihenfolge.
+
+        :return: (Motor-Collection, Operation) je Granularität
+        """
+        return [
+            cls.month_operation(year, month, deltas),
+            *(
+                cls.rollup_operation(granularity, year, month, deltas)
+                for granularity in ROLLUPS
+            ),
+        ]
+
+    @classmethod
+    def increment_operation(
+        cls, year: int, month: int, **deltas: int | float
+    ) -> UpdateOne:
+        """
+        ``$inc``-Upsert auf das Monatsdokument als Bulk-Operation einer Collection.
+
+        Die Deltas zählen auch in die Baseline (``BASELINE_FIELD``).
+        """
+        return UpdateOne(
+            {"year": year, "month": month}, cls._month_update(deltas), upsert=True
+        )
+
+    @classmethod
+    def month_operation(
+        cls, year: int, month: int, deltas: dict[str, int | float]
+    ) -> tuple[Any, UpdateOne]:
+        """
+        ``increment_operation`` mit Namespace für ``bulk_write_kpis``.
+
+        :return: (Motor-Collection, Operation)
+        """
+        collection = cls.collection()
+        operation = UpdateOne(
+            {"year": year, "month": month},
+            cls._month_update(deltas),
+            upsert=True,
+            namespace=collection.full_name,
+        )
+        return collection, operation
+
+    @classmethod
+    def rollup_operation(
+        cls,
+        granularity: Granularity,
+        year: int,
+        month: int,
+        deltas: dict[str, int | float],
+    ) -> tuple[Any, UpdateOne]:
+        """
+        ``$inc``-Upsert auf das Quartals- bzw. Jahresdokument, in dem ``month`` liegt.
+
+        :return: (Motor-Collection, Operation)
+        """
+        collection = cls.collection(granularity)
+        key = {"year": year, "month": granularity.period_start(month)}
+        operation = UpdateOne(
+            key,
+            cls._increment_update(deltas),
+            upsert=True,
+            namespace=collection.full_name,
+        )
+        return collection, operation
+
+    @classmethod
+    async def refresh_rollups(cls, year: int, months: Iterable[int]) -> None:
+        """
+        Summiert Quartale und Jahr, in denen ``months`` liegen, aus den
+        Monatsdokumenten neu und setzt sie per ``$set``.
+
+        Nur für Monate, die selbst per ``$set`` entstehen, etwa im Rollup aus
+        Tages- oder Stunden-Buckets: Dort gibt es kein Delta, das sich per
+        ``$inc`` weiterreichen ließe, ohne bei einer Wiederholung doppelt zu
+        zählen. Beliebig oft wiederholbar. Parallele Aufrufe überschreiben keine
+        neueren Summen, siehe ``REVISION_FIELD``.
+        """
+        fields = cls.stored_fields()
+        projection = dict.fromkeys(["month", REVISION_FIELD, *fields], 1)
+        cursor = cls.collection().find({"year": year}, projection)
+        documents = await cursor.to_list(None)
+        writes = []
+        for granularity in ROLLUPS:
+            for start in {granularity.period_start(month) for month in months}:
+                period = [
+                    document
+                    for document in documents
+                    if start <= document["month"] < start + granularity.value
+                ]
+                values = {
+                    name: sum(document.get(name) or 0 for document in period)
+                    for name in fields
+                }
+                values[REVISION_FIELD] = sum(
+                    document.get(REVISION_FIELD, 0) for document in period
+                )
+                writes.append(cls._set_rollup(granularity, year, start, values))
+        await asyncio.gather(*writes)
+
+    @classmethod
+    async def _set_rollup(
+        cls, granularity: Granularity, year: int, month: int, values: dict[str, Any]
+    ) -> None:
+        collection = cls.collection(granularity)
+        key = {"year": year, "month": month}
+        # Fehlt die Revision (Altbestand), gilt der gespeicherte Stand als älter.
+        not_newer = {**key, REVISION_FIELD: {"$not": {"$gt": values[REVISION_FIELD]}}}
+        result = await collection.update_one(not_newer, {"$set": values})
+        if result.matched_count:
+            return
+        result = await collection.update_one(
+            key,
+            {"$setOnInsert": {"_id": Binary.from_uuid(uuid4()), **values}},
+            upsert=True,
+        )
+        if result.upserted_id is None:
+            # Inzwischen von einem parallelen Aufruf angelegt
+            await collection.update_one(not_newer, {"$set": values})
+
+    @classmethod
+    async def increment_bucket(
+        cls,
+        layout: IngestionLayout,
+        key: dict[str, int],
+        deltas: dict[str, int | float],
+    ) -> None:
+        """Erhöht ein Bucket-Dokument, z. B. ``{year, month, day}``, per Upsert."""
+        await cls.bucket_collection(layout).update_one(
+            key, cls._increment_update(deltas), upsert=True
+        )
+
+    @classmethod
+    def increment_bucket_operation(
+        cls, key: dict[str, int], deltas: dict[str, int | float]
+    ) -> UpdateOne:
+        """``$inc``-Upsert auf ein Bucket-Dokument, z. B. ``{year, month, day}``."""
+        return UpdateOne(key, cls._increment_update(deltas), upsert=True)
+
+    @classmethod
+    def bucket_operation(
+        cls,
+        layout: IngestionLayout,
+        key: dict[str, int],
+        deltas: dict[str, int | float],
+    ) -> tuple[Any, UpdateOne]:
+        """
+        ``increment_bucket_operation`` mit Namespace für ``bulk_write_kpis``.
+
+        :return: (Motor-Collection, Operation)
+        """
+        collection = cls.bucket_collection(layout)
+        operation = UpdateOne(
+            key,
+            cls._increment_update(deltas),
+            upsert=True,
+            namespace=collection.full_name,
+        )
+        return collection, operation
+
+    @classmethod
+    def _month_update(cls, deltas: dict[str, int | float]) -> dict:
+        update = cls._increment_update(deltas)
+        baseline = {f"{BASELINE_FIELD}.{name}": delta for name, delta in deltas.items()}
+        update["$inc"] = {**deltas, **baseline, REVISION_FIELD: 1}
+        return update
+
+    @classmethod
+    def _increment_update(cls, deltas: dict[str, int | float]) -> dict:
+        unknown = deltas.keys() - cls.model_fields.keys()
+        if unknown:
+            raise ValueError(f"Unbekannte KPI-Felder für {cls.__name__}: {unknown}")
+
+        # Beim Anlegen des Monats bekommen nicht erhöhte Felder ihren Default,
+        # damit das Dokument vollständig ist.
+        on_insert: dict = {"_id": Binary.from_uuid(uuid4())}
+        for name, field in cls.model_fields.items():
+            if name in deltas or name in BaseKPI.model_fields:
+                continue
+            if not field.is_required():
+                on_insert[name] = field.default
+        return {"$inc": deltas, "$setOnInsert": on_insert}
+
+
+_client_bulk_write = True
+"""``False``, sobald der Server ``MongoClient.bulk_write`` ablehnt (vor 8.0)."""
+
+
+async def bulk_write_kpis(
+    operations: list[tuple[Any, UpdateOne]], *, ordered: bool
+) -> tuple[set[int], Optional[Exception]]:
+    """
+    Schreibt Upserts auf beliebige KPI-Collections in einem Round Trip.
+
+    Ab MongoDB 8.0 geht alles in einen ``bulk_write`` des Clients; ältere Server
+    bekommen je Collection einen ``bulk_write``, mit ``ordered`` nacheinander.
+    Mit ``ordered`` bricht der Write beim ersten Fehler ab, die folgenden
+    Operationen gelten als nicht geschrieben.
+
+    :param operations: (Motor-Collection, Operation mit ``namespace``) je Write
+    :return: (Indizes nicht geschriebener Operationen, erste Exception); bei
+        unklarem Ausgang, etwa nach einem Verbindungsabbruch, gelten alle
+        betroffenen Operationen als nicht geschrieben (at least once)
+    """
+    global _client_bulk_write
+    if not operations:
+        return set(), None
+    if _client_bulk_write:
+        client = operations[0][0].database.client
+        try:
+            await client.bulk_write(
+                [operation for _, operation in operations], ordered=ordered
+            )
+            return set(), None
+        except ClientBulkWriteException as e:
+            failed = {error["idx"] for error in e.write_errors or ()}
+            # Verbindungsfehler u. Ä. weiterreichen, damit Aufrufer sie erkennen
+            cause = e.error if isinstance(e.error, Exception) else e
+            return _failed_from(failed, len(operations), ordered), cause
+        except InvalidOperation as e:
+            # Einzige Meldung, die vor dem Senden kommt und den Server betrifft
+            if "8.0" not in str(e):
+                return set(range(len(operations))), e
+            _client_bulk_write = False
+            logger.info("🗃️ MongoDB vor 8.0: KPI-Writes je Collection gebündelt")
+        except Exception as e:
+            return set(range(len(operations))), e
+
+    groups: dict[str, list[int]] = {}
+    for index, (collection, _) in enumerate(operations):
+        groups.setdefault(collection.full_name, []).append(index)
+    batches = list(groups.values())
+
+    async def write(indexes: list[int]) -> set[int]:
+        collection = operations[indexes[0]][0]
+        try:
+            await collection.bulk_write(
+                [operations[i][1] for i in indexes], ordered=ordered
+            )
+            return set()
+        except BulkWriteError as e:
+            positions = {error["index"] for error in e.details.get("writeErrors", ())}
+            failed = _failed_from(positions, len(indexes), ordered)
+            raise _Partial({indexes[p] for p in failed}, e) from e
+        except Exception as e:
+            raise _Partial(set(indexes), e) from e
+
+    if ordered:
+        # Reihenfolge der ersten Operation je Collection, z. B. Monat vor Quartal
+        for position, indexes in enumerate(batches):
+            try:
+                await write(indexes)
+            except _Partial as e:
+                rest = {index for later in batches[position + 1 :] for index in later}
+                return e.failed | rest, e.error
+        return set(), None
+
+    results = await asyncio.gather(
+        *(write(indexes) for indexes in batches), return_exceptions=True
+    )
+    failed: set[int] = set()
+    error: Optional[Exception] = None
+    for result in results:
+        if isinstance(result, _Partial):
+            failed |= result.failed
+            error = error or result.error
+        elif isinstance(result, BaseException):
+            raise result
+    return failed, error
+
+
+class _Partial(Exception):
+    """Teilweise fehlgeschlagener ``bulk_write`` einer Collection."""
+
+    def __init__(self, failed: set[int], error: Exception) -> None:
+        super().__init__(str(error))
+        self.failed = failed
+        self.error = error
+
+
+def _failed_from(failed: set[int], count: int, ordered: bool) -> set[int]:
+    if not failed:
+        # Kein einzelner Write-Fehler gemeldet: Ausgang unklar
+        return set(range(count))
+    return set(range(min(failed), count)) if ordered else failed
+
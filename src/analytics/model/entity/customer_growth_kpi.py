@@ -11,5 +11,7 @@ class CustomerGrowthKPIType(BaseKPIType):
 class CustomerGrowthKPI(BaseKPI):
     new_customers: int = 0
 
-    class Settings:
+    headline = "new_customers"
+
+    class Settings(BaseKPI.Settings):
         name = "customer_growth_kpis"
@@ -13,5 +13,7 @@ class InvoiceKPI(BaseKPI):
     invoices_issued: int = 0
     overdue_invoices: int = 0
 
-    class Settings:
+    headline = "invoices_issued"
+
+    class Settings(BaseKPI.Settings):
         name = "invoice_kpis"
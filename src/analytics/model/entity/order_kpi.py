@@ -8,6 +8,8 @@ class OrderKPIType(BaseKPIType):
     total_orders: int
     basket_size_sum: float
     order_value_sum: float
+    avg_basket_size: float = 0.0
+    avg_order_value: float = 0.0
 
 
 class OrderKPI(BaseKPI):
@@ -15,6 +17,12 @@ class OrderKPI(BaseKPI):
     basket_size_sum: float = 0.0
     order_value_sum: float = 0.0
 
+    headline = "total_orders"
+    ratios = {
+        "avg_basket_size": ("basket_size_sum", "total_orders"),
+        "avg_order_value": ("order_value_sum", "total_orders"),
+    }
+
     @property
     def avg_basket_size(self):
         return self.basket_size_sum / self.total_orders if self.total_orders else 0
@@ -23,5 +31,5 @@ class OrderKPI(BaseKPI):
     def avg_order_value(self):
         return self.order_value_sum / self.total_orders if self.total_orders else 0
 
-    class Settings:
+    class Settings(BaseKPI.Settings):
         name = "order_kpis"
@@ -6,7 +6,9 @@ from analytics.model.entity.base import BaseKPI, BaseKPIType
 class RevenueKPI(BaseKPI):
     total_revenue: float = 0.0
 
-    class Settings:
+    headline = "total_revenue"
+
+    class Settings(BaseKPI.Settings):
         name = "revenue_kpis"
 
 
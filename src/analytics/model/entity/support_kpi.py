@@ -8,12 +8,16 @@ class SupportKPIType(BaseKPIType):
     avg_response_time_total: float
     support_requests: int
     request_count: int
+    avg_response_time: float = 0.0
 
 
 class SupportKPI(BaseKPI):
-    support_requests: int
-    avg_response_time_total: float
-    request_count: int
+    support_requests: int = 0
+    avg_response_time_total: float = 0.0
+    request_count: int = 0
+
+    headline = "support_requests"
+    ratios = {"avg_response_time": ("avg_response_time_total", "request_count")}
 
     @property
     def avg_response_time(self):
@@ -23,5 +27,5 @@ class SupportKPI(BaseKPI):
             else 0
         )
 
-    class Settings:
+    class Settings(BaseKPI.Settings):
         name = "support_kpis"
@@ -7,15 +7,19 @@ from analytics.model.entity.base import BaseKPI, BaseKPIType
 class SystemKPIType(BaseKPIType):
     error_count: int
     total_requests: int
+    system_error_rate: float = 0.0
 
 
 class SystemKPI(BaseKPI):
     error_count: int = 0
     total_requests: int = 0
 
+    headline = "total_requests"
+    ratios = {"system_error_rate": ("error_count", "total_requests")}
+
     @property
     def system_error_rate(self):
         return self.error_count / self.total_requests if self.total_requests else 0
 
-    class Settings:
+    class Settings(BaseKPI.Settings):
         name = "system_kpis"
@@ -13,5 +13,7 @@ class TransactionKPI(BaseKPI):
     transaction_volume: float = 0.0
     failed_transactions: int = 0
 
-    class Settings:
+    headline = "transaction_volume"
+
+    class Settings(BaseKPI.Settings):
         name = "transaction_kpis"
@@ -0,0 +1,76 @@
+"""REST-Schnittstelle für das KPI-Lesemodell."""
+
+from typing import Any, Final
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from loguru import logger
+
+from analytics.error.exceptions import NotFoundError
+from analytics.security.keycloak_service import KeycloakService
+from analytics.services.kpi_read_model import KpiReadModel, get_kpi_read_model
+
+__all__ = ["router"]
+
+ADMIN_ROLES: Final = ["admin"]
+"""Rollen, von denen eine für die Admin-Pfade des Lesemodells nötig ist."""
+
+
+async def _require_admin(request: Request) -> None:
+    """Lässt nur authentifizierte Requests mit Admin-Rolle durch.
+
+    :param request: Der eingehende Request
+    :raises HTTPException: 401 ohne gültigen Token, 403 ohne Admin-Rolle
+    """
+    keycloak: Final = await KeycloakService.from_request(request)
+    if keycloak is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Kein gültiger Bearer-Token gefunden",
+        )
+    keycloak.assert_roles(ADMIN_ROLES)
+
+
+# "Dependency Injection" durch Depends: gilt für alle Pfade des Routers
+router: Final = APIRouter(
+    prefix="/read-model", tags=["Admin"], dependencies=[Depends(_require_admin)]
+)
+
+
+@router.get("/consistency")
+async def consistency() -> dict[str, Any]:
+    """Das KPI-Lesemodell mit MongoDB vergleichen.
+
+    :return: Flag ``consistent`` und die gefundenen Abweichungen
+    :raises NotFoundError: Falls das Lesemodell deaktiviert ist
+    """
+    differences: Final = await _verify(_read_model())
+    return {"consistent": not differences, "differences": differences}
+
+
+@router.post("/reload")
+async def reload() -> dict[str, Any]:
+    """Das KPI-Lesemodell mit MongoDB vergleichen und bei Abweichungen neu laden.
+
+    :return: Flag ``consistent`` und die Abweichungen vor dem Neuladen
+    :raises NotFoundError: Falls das Lesemodell deaktiviert ist
+    """
+    read_model: Final = _read_model()
+    differences: Final = await _verify(read_model)
+    if differences:
+        await read_model.reload()
+        logger.info("🔄 KPI-Lesemodell neu geladen")
+    return {"consistent": not differences, "differences": differences}
+
+
+def _read_model() -> KpiReadModel:
+    read_model: Final = get_kpi_read_model()
+    if read_model is None:
+        raise NotFoundError
+    return read_model
+
+
+async def _verify(read_model: KpiReadModel) -> list[dict[str, Any]]:
+    differences: Final = await read_model.verify()
+    if differences:
+        logger.warning("KPI-Lesemodell weicht von MongoDB ab: {}", differences)
+    return differences
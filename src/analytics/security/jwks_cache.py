@@ -0,0 +1,158 @@
+"""
+JwksCache – prozessweiter Cache der Keycloak-Signaturschlüssel, indiziert per ``kid``.
+"""
+
+import asyncio
+import time
+from typing import Final, Optional
+
+import httpx
+from jose import jwk
+from jose.backends.base import Key
+from loguru import logger
+
+from analytics.config.keycloak import get_keycloak_settings
+
+__all__ = ["JwksCache", "get_jwks_cache"]
+
+
+class JwksCache:
+    """
+    Hält die öffentlichen Schlüssel des JWKS-Endpunkts als fertige Key-Objekte.
+
+    Eine Hintergrund-Task aktualisiert den Cache periodisch. Ein unbekannter ``kid``
+    löst höchstens einen erneuten Abruf aus; Abrufe sind auf einen pro
+    ``min_refresh_interval`` begrenzt, damit gefälschte ``kid``s keinen
+    Refresh-Sturm auf Keycloak erzeugen. Schlägt ein Abruf fehl, bleiben die
+    bekannten Schlüssel gültig.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float,
+        refresh_interval: float,
+        min_refresh_interval: float,
+        timeout: float,
+    ) -> None:
+        self._url: Final = url
+        self._ttl: Final = ttl
+        self._refresh_interval: Final = refresh_interval
+        self._min_refresh_interval: Final = min_refresh_interval
+        self._timeout: Final = timeout
+
+        self._keys: dict[str, Key] = {}
+        self._fetched_at = float("-inf")
+        self._last_attempt = float("-inf")
+        self._lock = asyncio.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Lädt die Schlüssel initial und startet die Hintergrund-Aktualisierung."""
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning("JWKS konnte beim Start nicht geladen werden: {}", e)
+        self._task = asyncio.create_task(self._refresh_periodically())
+        logger.info("🔑 JWKS-Cache gestartet ({} Schlüssel)", len(self._keys))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_key(self, kid: str | None) -> Key | None:
+        """
+        Liefert den Schlüssel zum ``kid``.
+
+        Im Normalfall ist das nur ein Dict-Zugriff. Ist der ``kid`` unbekannt oder
+        der Cache älter als die TTL, wird (gedrosselt) neu geladen.
+
+        :raises httpx.HTTPError: Falls noch nie ein JWKS geladen werden konnte
+        """
+        key = self._keys.get(kid) if kid else None
+        if key is not None and time.monotonic() - self._fetched_at < self._ttl:
+            return key
+
+        try:
+            await self.refresh()
+        except Exception as e:
+            if not self._keys:
+                raise
+            logger.warning("JWKS-Aktualisierung fehlgeschlagen: {}", e)
+        return self._keys.get(kid) if kid else None
+
+    async def refresh(self) -> bool:
+        """
+        Lädt das JWKS neu, sofern der letzte Abruf lange genug zurückliegt.
+
+        :return: True, falls tatsächlich neu geladen wurde
+        """
+        requested_at = time.monotonic()
+        async with self._lock:
+            # Gleichzeitige Aufrufer warten auf den laufenden Abruf statt selbst
+            # abzurufen.
+            if self._last_attempt >= requested_at:
+                return False
+            now = time.monotonic()
+            if now - self._last_attempt < self._min_refresh_interval:
+                return False
+            self._last_attempt = now
+
+            if self._client is None:
+                self._client = httpx.AsyncClient(timeout=self._timeout)
+            response = await self._client.get(self._url)
+            response.raise_for_status()
+            keys = self._parse(response.json())
+            if not keys:
+                raise ValueError("JWKS enthält keine Schlüssel")
+
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            logger.debug("🔑 JWKS aktualisiert: kids={}", list(keys))
+            return True
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("JWKS-Aktualisierung fehlgeschlagen: {}", e)
+
+    @staticmethod
+    def _parse(jwks: dict) -> dict[str, Key]:
+        keys: dict[str, Key] = {}
+        for key in jwks.get("keys", []):
+            if key.get("use") == "enc" or "kid" not in key:
+                continue
+            try:
+                keys[key["kid"]] = jwk.construct(key, key.get("alg", "RS256"))
+            except Exception as e:
+                logger.warning("JWK {} wird ignoriert: {}", key.get("kid"), e)
+        return keys
+
+
+_jwks_cache_instance: Optional[JwksCache] = None
+
+
+def get_jwks_cache() -> JwksCache:
+    global _jwks_cache_instance
+    if _jwks_cache_instance is None:
+        settings = get_keycloak_settings()
+        _jwks_cache_instance = JwksCache(
+            url=settings.jwks_url,
+            ttl=settings.jwks_ttl_seconds,
+            refresh_interval=settings.jwks_refresh_interval_seconds,
+            min_refresh_interval=settings.jwks_min_refresh_interval_seconds,
+            timeout=settings.jwks_timeout_seconds,
+        )
+    return _jwks_cache_instance
@@ -0,0 +1,85 @@
+"""
+KeycloakMiddleware – erkennt Introspection-Anfragen, ohne den Request-Body zu puffern.
+"""
+
+from collections import deque
+from typing import Final
+
+from loguru import logger
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = ["KeycloakMiddleware"]
+
+_INTROSPECTION_MARKERS: Final = (b"__schema", b"IntrospectionQuery")
+_MARKER_OVERLAP: Final = max(len(marker) for marker in _INTROSPECTION_MARKERS) - 1
+
+
+class KeycloakMiddleware:
+    """
+    Reine ASGI-Middleware vor dem GraphQL-Endpunkt.
+
+    Ob ein Request eine Introspection ist, wird am Header ``x-introspection`` oder
+    an den ersten ``peek_bytes`` des Bodys erkannt. Die dafür gelesenen
+    ``http.request``-Nachrichten werden unverändert an die Anwendung
+    weitergereicht; der Body wird weder zusammengesetzt noch kopiert.
+
+    Die Authentifizierung selbst erfolgt erst bei Bedarf über
+    ``KeycloakService.from_request``; das Ergebnis der Erkennung liegt in
+    ``request.state.introspection``.
+    """
+
+    def __init__(self, app: ASGIApp, peek_bytes: int = 4096) -> None:
+        self.app = app
+        self.peek_bytes = peek_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        introspection = Headers(scope=scope).get("x-introspection") == "true"
+        if introspection:
+            logger.debug("🔍 Gateway-Introspection via Header erkannt.")
+        elif scope["method"] == "POST":
+            introspection, receive = await self._peek(receive)
+
+        scope.setdefault("state", {})["introspection"] = introspection
+        await self.app(scope, receive, send)
+
+    async def _peek(self, receive: Receive) -> tuple[bool, Receive]:
+        """
+        Liest Body-Nachrichten, bis ein Introspection-Marker gefunden oder
+        ``peek_bytes`` erreicht ist, und liefert ein ``receive``, das die gelesenen
+        Nachrichten zuerst erneut ausliefert.
+        """
+        received: deque[Message] = deque()
+        seen = 0
+        tail = b""
+        found = False
+        while seen < self.peek_bytes:
+            message = await receive()
+            received.append(message)
+            if message["type"] != "http.request":
+                break
+
+            chunk = message.get("body", b"")
+            # Marker können über Chunk-Grenzen verteilt sein
+            boundary = tail + chunk[:_MARKER_OVERLAP]
+            if any(m in chunk or m in boundary for m in _INTROSPECTION_MARKERS):
+                found = True
+                break
+            seen += len(chunk)
+            tail = chunk[-_MARKER_OVERLAP:]
+            if not message.get("more_body", False):
+                break
+
+        if found:
+            logger.debug("🔍 Standard-IntrospectionQuery erkannt.")
+
+        async def replay() -> Message:
+            if received:
+                return received.popleft()
+            return await receive()
+
+        return found, replay
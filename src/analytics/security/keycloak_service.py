@@ -1,11 +1,13 @@
 from fastapi import Request, HTTPException, status
 from jose import jwt, JWTError
 from typing import List, Optional
-import os
-import httpx
 from loguru import logger
 
-from analytics.config import env
+from analytics.config.keycloak import get_keycloak_settings
+from analytics.security.jwks_cache import get_jwks_cache
+from analytics.security.token_cache import TokenCache
+
+_settings = get_keycloak_settings()
 
 
 class KeycloakService:
@@ -13,54 +15,62 @@ class KeycloakService:
     Service zur Extraktion und Validierung von JWTs aus Keycloak,
     inklusive dynamischem Laden des öffentlichen Schlüssels via JWKS-Endpunkt.
     Unterstützt das Überspringen von Introspection Queries.
+    Bereits verifizierte Tokens werden bis zu ihrem Ablauf im ``token_cache``
+    vorgehalten.
     """
 
+    token_cache = TokenCache(
+        max_size=_settings.token_cache_size,
+        max_ttl=_settings.token_cache_max_ttl_seconds,
+    )
+
     def __init__(self, request: Request, token: Optional[str], payload: dict):
         self.request = request
         self.token = token
         self.payload = payload
 
     @classmethod
-    async def create(cls, request: Request) -> "KeycloakService":
+    async def from_request(cls, request: Request) -> Optional["KeycloakService"]:
         """
-        Erstellt eine Instanz des KeycloakService. Bei IntrospectionQuery wird
-        keine Authentifizierung erzwungen.
+        Authentifiziert den Request beim ersten Zugriff und merkt sich das Ergebnis
+        in ``request.state.keycloak``.
+
+        Für Introspection-Anfragen (siehe ``KeycloakMiddleware``) und bei
+        ungültigem Token wird ``None`` geliefert.
         """
-        if await cls._is_introspection_request(request):
+        state = request.state
+        if hasattr(state, "keycloak"):
+            return state.keycloak
+
+        keycloak = None
+        if getattr(state, "introspection", False):
             logger.debug(
                 "🔍 IntrospectionQuery erkannt – Authentifizierung übersprungen."
             )
-            return cls(request, None, {})
+        else:
+            try:
+                keycloak = await cls.create(request)
+            except HTTPException:
+                pass
+        state.keycloak = keycloak
+        return keycloak
 
+    @classmethod
+    async def create(cls, request: Request) -> "KeycloakService":
+        """
+        Erstellt eine Instanz des KeycloakService aus dem Bearer-Token des Requests.
+        """
         try:
             token = cls._extract_token(request)
-            payload = await cls._decode_token(token)
+            payload = cls.token_cache.get(token)
+            if payload is None:
+                payload = await cls._decode_token(token)
+                cls.token_cache.put(token, payload)
             return cls(request, token, payload)
         except HTTPException as e:
             logger.warning("Keycloak Token-Fehler: {}", e.detail)
             raise
 
-    @classmethod
-    async def _is_introspection_request(cls, request: Request) -> bool:
-        """
-        Erkennt sowohl normale IntrospectionQuerys als auch Apollo-Gateway-Aufrufe
-        anhand eines speziellen Headers.
-        """
-        if request.headers.get("x-introspection") == "true":
-            logger.debug("🔍 Gateway-Introspection via Header erkannt.")
-            return True
-
-        if request.method != "POST":
-            return False
-        try:
-            body = await request.json()
-            if body.get("operationName") == "IntrospectionQuery":
-                logger.debug("🔍 Standard-IntrospectionQuery erkannt.")
-                return True
-        except Exception:
-            pass
-        return False
-
     @classmethod
     def _extract_token(cls, request: Request) -> str:
         """
@@ -77,41 +87,26 @@ class KeycloakService:
     @classmethod
     async def _decode_token(cls, token: str) -> dict:
         """
-        Dekodiert und verifiziert das JWT mithilfe der JWKS von Keycloak.
+        Dekodiert und verifiziert das JWT mit dem passenden Schlüssel aus dem
+        JWKS-Cache.
         """
-        realm = env.KC_SERVICE_REALM
-        host = env.KC_SERVICE_REALM
-        port = env.KC_SERVICE_PORT
-
-        jwks_url = (
-            f"http://{host}:{port}/auth/realms/{realm}/protocol/openid-connect/certs"
-        )
-        logger.debug("Keycloak JWKS URI: {}", jwks_url)
-
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(jwks_url)
-            jwks = response.json()
-
-            keys = jwks.get("keys")
-            if not keys:
-                raise ValueError("JWKS enthält keine Schlüssel")
-
             unverified_header = jwt.get_unverified_header(token)
-            for key in keys:
-                if key["kid"] == unverified_header["kid"]:
-                    return jwt.decode(
-                        token,
-                        key,
-                        algorithms=["RS256"],
-                        options={"verify_aud": False},
-                    )
-
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Kein passender Schlüssel im JWKS gefunden",
+            key = await get_jwks_cache().get_key(unverified_header.get("kid"))
+            if key is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Kein passender Schlüssel im JWKS gefunden",
+                )
+            return jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                options={"verify_aud": False},
             )
 
+        except HTTPException:
+            raise
         except JWTError as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,76 @@
+"""
+TokenCache – LRU-Cache für bereits verifizierte JWT-Payloads.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Final
+
+from prometheus_client import Counter
+
+__all__ = ["TokenCache"]
+
+_hits_counter: Final = Counter(
+    "analytics_token_cache_hits", "Treffer im Cache verifizierter Tokens"
+)
+_misses_counter: Final = Counter(
+    "analytics_token_cache_misses", "Fehlgriffe im Cache verifizierter Tokens"
+)
+
+
+class TokenCache:
+    """
+    Begrenzter LRU-Cache: SHA-256 des Tokens → dekodierter Payload.
+
+    Ein Eintrag gilt bis zum ``exp``-Claim des Tokens, höchstens aber ``max_ttl``
+    Sekunden. Der Token selbst wird nicht gespeichert, nur sein Digest.
+    Trefferzahlen stehen als ``hits``/``misses`` und als Prometheus-Counter bereit.
+    """
+
+    def __init__(self, max_size: int, max_ttl: float) -> None:
+        self._max_size: Final = max_size
+        self._max_ttl: Final = max_ttl
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> dict | None:
+        """Liefert den Payload eines noch gültigen, bereits verifizierten Tokens."""
+        key = self._digest(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, payload = entry
+            if time.time() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                _hits_counter.inc()
+                return payload
+            del self._entries[key]
+
+        self.misses += 1
+        _misses_counter.inc()
+        return None
+
+    def put(self, token: str, payload: dict) -> None:
+        """Merkt sich den Payload eines erfolgreich verifizierten Tokens."""
+        now = time.time()
+        expires_at = now + self._max_ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        if expires_at <= now or self._max_size <= 0:
+            return
+
+        key = self._digest(token)
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
@@ -0,0 +1,164 @@
+"""
+KpiQueryCache – TTL/LRU-Cache für KPI-Abfragen mit Invalidierung durch Writes.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Final, Hashable, Optional
+
+from prometheus_client import Counter
+
+from analytics.config.query_cache import (
+    query_cache_enabled,
+    query_cache_max_entries,
+    query_cache_ttl,
+)
+from analytics.graphql.filters import MonthRange
+from analytics.messaging.kpi_increment import on_kpi_written
+from analytics.model.entity.base import BaseKPI
+
+__all__ = ["KpiQueryCache", "get_kpi_query_cache"]
+
+_hits_counter: Final = Counter(
+    "analytics_kpi_query_cache_hits", "Treffer im KPI-Abfrage-Cache"
+)
+_misses_counter: Final = Counter(
+    "analytics_kpi_query_cache_misses", "Fehlgriffe im KPI-Abfrage-Cache"
+)
+_evictions_counter: Final = Counter(
+    "analytics_kpi_query_cache_evictions",
+    "Aus dem KPI-Abfrage-Cache entfernte Einträge",
+    ["reason"],
+)
+
+CacheKey = tuple[Hashable, ...]
+"""(Modell, normalisierter Zeitraum, weitere Abfrageparameter wie sort und limit)."""
+
+
+class _Entry:
+    __slots__ = ("expires_at", "lookback", "months", "result")
+
+    def __init__(
+        self,
+        expires_at: float,
+        months: Optional[MonthRange],
+        lookback: int,
+        result: Any,
+    ):
+        self.expires_at = expires_at
+        self.months = months
+        self.lookback = lookback
+        self.result = result
+
+
+class KpiQueryCache:
+    """
+    Cache für Ergebnisse von ``run_kpi_query``.
+
+    Schlüssel ist das Modell, der auf einen Monatszeitraum normalisierte
+    ``KpiFilter`` sowie ``sort`` und ``limit``. Ein Write auf (Collection, Jahr,
+    Monat) entfernt nur die Einträge derselben Collection, deren Zeitraum diesen
+    Monat enthält. Über eine Generation je Modell werden Ergebnisse verworfen, die
+    während eines Writes gelesen wurden.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self._max_entries: Final = max_entries
+        self._ttl: Final = ttl
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._generations: dict[type[BaseKPI], int] = {}
+        self._clears = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def generation(self, model: type[BaseKPI]) -> int:
+        """Stand der Writes auf ``model``; vor dem Lesen aus MongoDB abfragen."""
+        return self._clears + self._generations.get(model, 0)
+
+    def get(self, key: CacheKey) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                _hits_counter.inc()
+                return entry.result
+            self._evict(key, "ttl")
+
+        self.misses += 1
+        _misses_counter.inc()
+        return None
+
+    def put(
+        self, key: CacheKey, generation: int, result: Any, lookback: int = 0
+    ) -> None:
+        """
+        Speichert ein Ergebnis, sofern seit ``generation`` kein Write erfolgte.
+
+        :param lookback: Anzahl Monate vor dem Zeitraum, deren Writes das Ergebnis
+            ebenfalls verändern (z. B. 12 bei Vorjahresvergleichen)
+        """
+        model = key[0]
+        if generation != self.generation(model) or self._max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self._ttl
+        self._entries[key] = _Entry(expires_at, key[1], lookback, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._evict(next(iter(self._entries)), "lru")
+
+    def invalidate(
+        self,
+        model: type[BaseKPI],
+        year: int,
+        month: int,
+        deltas: dict[str, int | float] | None = None,
+    ) -> None:
+        """Entfernt alle Einträge von ``model``, deren Zeitraum (year, month) enthält."""
+        self._generations[model] = self.generation(model) + 1
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if key[0] is model and _covers(entry, year, month)
+        ]
+        for key in stale:
+            self._evict(key, "invalidation")
+
+    def clear(self) -> None:
+        """Entfernt alle Einträge, z. B. nachdem die KPI-Daten ersetzt wurden."""
+        self._clears += 1
+        for key in list(self._entries):
+            self._evict(key, "clear")
+
+    def _evict(self, key: CacheKey, reason: str) -> None:
+        del self._entries[key]
+        self.evictions += 1
+        _evictions_counter.labels(reason=reason).inc()
+
+
+def _covers(entry: _Entry, year: int, month: int) -> bool:
+    if entry.months is None:
+        return True
+    (from_year, from_month), (to_year, to_month) = entry.months
+    first = from_year * 12 + from_month - entry.lookback
+    return first <= year * 12 + month <= to_year * 12 + to_month
+
+
+_kpi_query_cache_instance: Optional[KpiQueryCache] = None
+
+
+def get_kpi_query_cache() -> Optional[KpiQueryCache]:
+    """Liefert den Abfrage-Cache oder ``None``, falls er deaktiviert ist."""
+    global _kpi_query_cache_instance
+    if not query_cache_enabled:
+        return None
+    if _kpi_query_cache_instance is None:
+        _kpi_query_cache_instance = KpiQueryCache(
+            query_cache_max_entries, query_cache_ttl
+        )
+        on_kpi_written(_kpi_query_cache_instance.invalidate)
+    return _kpi_query_cache_instance
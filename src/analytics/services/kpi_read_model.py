@@ -0,0 +1,300 @@
+"""
+KpiReadModel – alle KPI-Dokumente als kompakte, monatsindizierte Arrays im Speicher.
+"""
+
+import asyncio
+import math
+from array import array
+from typing import Any, Final, Optional, TypeVar
+
+from loguru import logger
+
+from analytics.config.mongo import KPI_MODELS
+from analytics.config.read_model import read_model_enabled, read_model_refresh_interval
+from analytics.graphql.filters import MonthRange
+from analytics.messaging.kpi_increment import on_kpi_written
+from analytics.model.entity.base import BaseKPI, format_kpi_id
+
+__all__ = ["KpiReadModel", "get_kpi_read_model"]
+
+T = TypeVar("T")
+
+
+class _KpiTable:
+    """
+    Spalten einer KPI-Collection, indiziert über ``year * 12 + month - 1``.
+
+    Jede Spalte ist ein ``array('d')``; ``present`` markiert, für welche Monate
+    ein Dokument existiert.
+    """
+
+    __slots__ = ("base", "columns", "ids", "int_fields", "present")
+
+    def __init__(self, model: type[BaseKPI]) -> None:
+        fields = model.stored_fields()
+        self.int_fields: Final = frozenset(
+            n for n in fields if model.model_fields[n].annotation is int
+        )
+        self.columns: dict[str, array] = {n: array("d") for n in fields}
+        self.ids: list[Optional[str]] = []
+        self.present = bytearray()
+        self.base = 0
+
+    def slot(self, year: int, month: int, create: bool = False) -> Optional[int]:
+        index = year * 12 + month - 1
+        size = len(self.present)
+        if size == 0:
+            if not create:
+                return None
+            self.base = index
+            self._grow(0, 1)
+        elif index < self.base:
+            if not create:
+                return None
+            self._grow(0, self.base - index)
+            self.base = index
+        elif index >= self.base + size:
+            if not create:
+                return None
+            self._grow(size, index - self.base - size + 1)
+        return index - self.base
+
+    def _grow(self, at: int, count: int) -> None:
+        for column in self.columns.values():
+            column[at:at] = array("d", bytes(8 * count))
+        self.ids[at:at] = [None] * count
+        self.present[at:at] = bytes(count)
+
+    def slots(self, months: Optional[MonthRange]) -> range:
+        if months is None:
+            return range(len(self.present))
+        (from_year, from_month), (to_year, to_month) = months
+        start = max(from_year * 12 + from_month - 1 - self.base, 0)
+        stop = min(to_year * 12 + to_month - self.base, len(self.present))
+        return range(start, max(start, stop))
+
+    def row(self, slot: int) -> dict[str, Any]:
+        year, month0 = divmod(self.base + slot, 12)
+        row: dict[str, Any] = {"id": self.ids[slot], "year": year, "month": month0 + 1}
+        for name, column in self.columns.items():
+            value = column[slot]
+            row[name] = int(value) if name in self.int_fields else value
+        return row
+
+
+class KpiReadModel:
+    """
+    In-Process-Lesemodell für die GraphQL-Resolver.
+
+    Beim Start werden alle KPI-Dokumente geladen; bestätigte Writes der
+    Kafka-Handler werden über ``on_kpi_written`` sofort eingearbeitet, auch
+    während ``reload`` (siehe dort); es startet daher vor dem Kafka-Consumer.
+    MongoDB bleibt der dauerhafte Speicher: Writes anderer Instanzen werden
+    durch ein periodisches Neuladen übernommen, und ``verify`` vergleicht das
+    Lesemodell auf Anfrage mit MongoDB.
+    """
+
+    def __init__(self, refresh_interval: float) -> None:
+        self._refresh_interval: Final = refresh_interval
+        self._tables: dict[type[BaseKPI], _KpiTable] = {}
+        self._loading: Optional[dict[type[BaseKPI], _KpiTable]] = None
+        self._replay: list[tuple[type[BaseKPI], int, int, dict, bool]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.loaded = False
+
+    async def start(self) -> None:
+        # Vor dem Laden registrieren, damit kein bestätigter Write verloren geht
+        on_kpi_written(self.apply)
+        await self.reload()
+        if self._refresh_interval > 0:
+            self._task = asyncio.create_task(self._reload_periodically())
+        logger.info("🧮 KPI-Lesemodell gestartet")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reload(self) -> None:
+        """
+        Lädt alle KPI-Collections neu aus MongoDB.
+
+        Deltas, die während des Ladens eintreffen, gehen weiter in die alten
+        Tabellen und werden vorgemerkt. Nach dem Laden werden sie in die neuen
+        Tabellen übernommen, wenn ihr Monat zu diesem Zeitpunkt schon gelesen war
+        oder gar nicht gelesen wurde; sonst enthält das gelesene Dokument sie.
+        """
+        tables = {model: _KpiTable(model) for model in KPI_MODELS}
+        self._loading = tables
+        try:
+            await self._load(tables)
+        finally:
+            self._loading = None
+            replay, self._replay = self._replay, []
+        for model, year, month, deltas, read in replay:
+            table = tables[model]
+            slot = table.slot(year, month)
+            if read or slot is None or not table.present[slot]:
+                _add(table, year, month, deltas)
+        self._tables = tables
+        self.loaded = True
+        logger.debug(
+            "🧮 KPI-Lesemodell geladen: {}",
+            {m.__name__: sum(t.present) for m, t in self._tables.items()},
+        )
+
+    def apply(
+        self,
+        model: type[BaseKPI],
+        year: int,
+        month: int,
+        deltas: dict[str, int | float],
+    ) -> None:
+        """Arbeitet einen bestätigten ``$inc``-Write in das Lesemodell ein."""
+        if self._loading is not None and model in self._loading:
+            loading = self._loading[model]
+            slot = loading.slot(year, month)
+            read = slot is not None and bool(loading.present[slot])
+            self._replay.append((model, year, month, dict(deltas), read))
+        table = self._tables.get(model)
+        if table is not None:
+            _add(table, year, month, deltas)
+
+    def query(
+        self,
+        model: type[BaseKPI],
+        dto_cls: type[T],
+        months: Optional[MonthRange],
+        limit: Optional[int] = None,
+        fields: frozenset[str] = frozenset(),
+        sort: bool = True,
+    ) -> list[T]:
+        """
+        Liefert die Monate im Zeitraum als DTOs.
+
+        Abgeleitete Felder werden nur berechnet, wenn sie in ``fields`` stehen.
+
+        :param sort: ``True`` verlangt aufsteigend nach Jahr und Monat, ``False``
+            lässt die Reihenfolge offen. Die Tabellen sind nach Monat indiziert,
+            daher ist das Ergebnis in beiden Fällen ohne Mehrkosten sortiert,
+            wie bei MongoDB, wo ``False`` nur den ``$sort``-Schritt einspart.
+        """
+        table = self._tables[model]
+        derive = bool(fields & model.derived_fields())
+        result: list[T] = []
+        for slot in table.slots(months):
+            if not table.present[slot]:
+                continue
+            row = table.row(slot)
+            if derive:
+                previous_month = _present_row(table, slot - 1)
+                previous_year = _present_row(table, slot - 12)
+                row.update(model.derive(row, previous_month, previous_year))
+            result.append(dto_cls(**row))
+            if limit and len(result) >= limit:
+                break
+        return result
+
+    async def verify(self) -> list[dict[str, Any]]:
+        """
+        Vergleicht das Lesemodell mit dem aktuellen Stand in MongoDB.
+
+        :return: Abweichungen je (Collection, Jahr, Monat, Feld); leer, falls konsistent
+        """
+        differences: list[dict[str, Any]] = []
+        for model, expected in (await self._load()).items():
+            actual = self._tables.get(model) or _KpiTable(model)
+            months = {
+                divmod(t.base + s, 12)
+                for t in (expected, actual)
+                for s in range(len(t.present))
+                if t.present[s]
+            }
+            for year, month0 in sorted(months):
+                month = month0 + 1
+                want = _row_or_none(expected, year, month)
+                have = _row_or_none(actual, year, month)
+                for name in expected.columns:
+                    want_value = want[name] if want else None
+                    have_value = have[name] if have else None
+                    if _differs(want_value, have_value):
+                        differences.append(
+                            {
+                                "collection": model.get_collection_name(),
+                                "year": year,
+                                "month": month,
+                                "field": name,
+                                "mongo": want_value,
+                                "read_model": have_value,
+                            }
+                        )
+        return differences
+
+    async def _load(
+        self, tables: Optional[dict[type[BaseKPI], _KpiTable]] = None
+    ) -> dict[type[BaseKPI], _KpiTable]:
+        if tables is None:
+            tables = {model: _KpiTable(model) for model in KPI_MODELS}
+        await asyncio.gather(*(self._load_table(m, t) for m, t in tables.items()))
+        return tables
+
+    @staticmethod
+    async def _load_table(model: type[BaseKPI], table: _KpiTable) -> None:
+        projection = {"_id": 1, "year": 1, "month": 1}
+        projection.update(dict.fromkeys(table.columns, 1))
+        cursor = model.get_motor_collection().find({}, projection)
+        async for doc in cursor:
+            slot = table.slot(doc["year"], doc["month"], create=True)
+            table.present[slot] = 1
+            table.ids[slot] = format_kpi_id(doc["_id"])
+            for name, column in table.columns.items():
+                column[slot] += doc.get(name) or 0
+
+    async def _reload_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.warning("KPI-Lesemodell nicht neu geladen: {}", e)
+
+
+def _add(
+    table: _KpiTable, year: int, month: int, deltas: dict[str, int | float]
+) -> None:
+    slot = table.slot(year, month, create=True)
+    table.present[slot] = 1
+    for name, delta in deltas.items():
+        table.columns[name][slot] += delta
+
+
+def _present_row(table: _KpiTable, slot: int) -> Optional[dict[str, Any]]:
+    return table.row(slot) if slot >= 0 and table.present[slot] else None
+
+
+def _row_or_none(table: _KpiTable, year: int, month: int) -> Optional[dict[str, Any]]:
+    slot = table.slot(year, month)
+    return table.row(slot) if slot is not None and table.present[slot] else None
+
+
+def _differs(expected: Any, actual: Any) -> bool:
+    if expected is None or actual is None:
+        return expected is not actual
+    return not math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-9)
+
+
+_kpi_read_model_instance: Optional[KpiReadModel] = None
+
+
+def get_kpi_read_model() -> Optional[KpiReadModel]:
+    """Liefert das Lesemodell oder ``None``, falls es deaktiviert ist."""
+    global _kpi_read_model_instance
+    if not read_model_enabled:
+        return None
+    if _kpi_read_model_instance is None:
+        _kpi_read_model_instance = KpiReadModel(read_model_refresh_interval)
+    return _kpi_read_model_instance
@@ -0,0 +1,212 @@
+"""
+KpiRollupService – leitet Monats-, Quartals- und Jahreswerte aus Tages- oder
+Stunden-Buckets bzw. Sharded Countern ab.
+"""
+
+import asyncio
+from typing import Final, Optional
+from uuid import uuid4
+
+from bson import Binary
+from loguru import logger
+from pymongo import UpdateOne
+
+from analytics.config.ingestion import ingestion_layout, ingestion_rollup_interval
+from analytics.config.mongo import KPI_MODELS, rebuild_kpi_rollup
+from analytics.messaging.kpi_increment import notify_kpi_written, on_bucket_written
+from analytics.model.entity.base import (
+    BASELINE_FIELD,
+    REVISION_FIELD,
+    ROLLUPS,
+    BaseKPI,
+    IngestionLayout,
+)
+
+__all__ = ["KpiRollupService", "get_kpi_rollup_service"]
+
+
+class KpiRollupService:
+    """
+    Hält die Monatsdokumente und ihre Rollups aktuell, wenn die Kafka-Handler
+    nur Tages- oder Stunden-Buckets bzw. einzelne Shards erhöhen. Die Summe über
+    alle Shards eines Monats ist damit für alle Leser transparent.
+
+    Geschriebene Monate werden über ``on_bucket_written`` als geändert markiert
+    und periodisch neu summiert. Die Summen werden per ``$set`` auf die
+    Baseline direkt geschriebener Werte (``BASELINE_FIELD``) addiert, sodass ein
+    Rollup beliebig oft und von mehreren Instanzen laufen darf. Erst
+    danach erfahren Lesemodell und Abfrage-Cache über ``notify_kpi_written``
+    von den Deltas.
+
+    Leser sehen ein Inkrement daher erst nach bis zu ``interval`` Sekunden
+    (``[app.ingestion] rollup-interval``), dafür bleibt jede Abfrage ein
+    Zugriff auf ein Dokument je Monat statt einer Summe über alle Buckets.
+    """
+
+    def __init__(self, layout: IngestionLayout, interval: float) -> None:
+        self._layout: Final = layout
+        self._interval: Final = interval
+        self._dirty: dict[tuple[type[BaseKPI], int, int], dict[str, int | float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        # Monate, deren Rollup vor einem Neustart nicht mehr lief, holt der
+        # vollständige Neuaufbau nach.
+        await self.rebuild()
+        on_bucket_written(self.mark)
+        self._task = asyncio.create_task(self._roll_up_periodically())
+        logger.info("🧺 KPI-Rollups aus {} gestartet", self._layout.suffix)
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.roll_up()
+
+    def mark(
+        self,
+        model: type[BaseKPI],
+        year: int,
+        month: int,
+        deltas: dict[str, int | float],
+    ) -> None:
+        """Merkt einen Monat samt seinen Deltas für den nächsten Rollup vor."""
+        fields = self._dirty.setdefault((model, year, month), {})
+        for name, delta in deltas.items():
+            fields[name] = fields.get(name, 0) + delta
+
+    async def roll_up(self) -> int:
+        """
+        Summiert alle geänderten Monate neu.
+
+        :return: Anzahl neu berechneter Monate
+        """
+        dirty, self._dirty = list(self._dirty.items()), {}
+        for position, ((model, year, month), deltas) in enumerate(dirty):
+            try:
+                await self._roll_up_month(model, year, month)
+            except Exception:
+                # Offene Monate beim nächsten Durchlauf erneut versuchen
+                for (model, year, month), deltas in dirty[position:]:
+                    self.mark(model, year, month, deltas)
+                raise
+            notify_kpi_written(model, year, month, deltas)
+        return len(dirty)
+
+    async def rebuild(self) -> None:
+        """
+        Baut alle Monatsdokumente und Rollups aus Baseline und Buckets neu auf.
+
+        Monatsdokumente ohne Baseline stammen aus einer älteren Version, etwa
+        direkt geschrieben vor dem Wechsel von ``month`` auf ``day``/``hour``
+        oder vom Dev-Seed. Was sie über ihre Bucket-Summe hinaus enthalten, wird
+        zur Baseline und bleibt so erhalten.
+        """
+        for model in KPI_MODELS:
+            months = await _bucket_sums(model, self._layout, {})
+            await _adopt_baselines(model, months)
+            await _set_sums(model, months)
+            for granularity in ROLLUPS:
+                await rebuild_kpi_rollup(model, granularity)
+
+    async def _roll_up_month(self, model: type[BaseKPI], year: int, month: int) -> None:
+        match = {"year": year, "month": month}
+        await _set_sums(model, await _bucket_sums(model, self._layout, match))
+        await model.refresh_rollups(year, (month,))
+
+    async def _roll_up_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                months = await self.roll_up()
+                if months:
+                    logger.debug("🧺 KPI-Rollup: {} Monate neu summiert", months)
+            except Exception as e:
+                logger.warning("KPI-Rollup fehlgeschlagen: {}", e)
+
+
+async def _bucket_sums(
+    model: type[BaseKPI], layout: IngestionLayout, match: dict
+) -> list[dict]:
+    """Summen der KPI-Felder aus den Buckets je (Jahr, Monat)."""
+    pipeline = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {"year": "$year", "month": "$month"},
+                **{name: {"$sum": f"${name}"} for name in model.stored_fields()},
+            }
+        },
+    ]
+    return await model.bucket_collection(layout).aggregate(pipeline).to_list(None)
+
+
+async def _adopt_baselines(model: type[BaseKPI], months: list[dict]) -> None:
+    """
+    Legt für Monatsdokumente ohne Baseline den direkt geschriebenen Anteil fest:
+    gespeicherter Wert abzüglich der Bucket-Summe aus ``_bucket_sums``, mindestens 0.
+    """
+    fields = model.stored_fields()
+    sums = {(row["_id"]["year"], row["_id"]["month"]): row for row in months}
+    collection = model.get_motor_collection()
+    legacy = {BASELINE_FIELD: {"$exists": False}}
+    operations = []
+    async for document in collection.find(legacy, ["year", "month", *fields]):
+        bucketed = sums.get((document["year"], document["month"]), {})
+        baseline = {
+            name: max((document.get(name) or 0) - bucketed.get(name, 0), 0)
+            for name in fields
+        }
+        operations.append(
+            UpdateOne(
+                {"_id": document["_id"], **legacy},
+                {"$set": {BASELINE_FIELD: baseline}},
+            )
+        )
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+
+async def _set_sums(model: type[BaseKPI], months: list[dict]) -> None:
+    """
+    Setzt je Monat aus ``_bucket_sums`` die KPI-Felder auf Baseline + Summe.
+
+    Neue Monatsdokumente werden zuerst mit UUID-``_id`` angelegt; die Summe
+    schreibt danach ein Pipeline-Update, das die Baseline im selben Dokument
+    atomar liest.
+    """
+    fields = model.stored_fields()
+    operations = []
+    for row in months:
+        key = {"year": row["_id"]["year"], "month": row["_id"]["month"]}
+        values = {
+            name: {"$add": [{"$ifNull": [f"${BASELINE_FIELD}.{name}", 0]}, row[name]]}
+            for name in fields
+        }
+        values[REVISION_FIELD] = {"$add": [{"$ifNull": [f"${REVISION_FIELD}", 0]}, 1]}
+        on_insert = {"_id": Binary.from_uuid(uuid4()), BASELINE_FIELD: {}}
+        operations += [
+            UpdateOne(key, {"$setOnInsert": on_insert}, upsert=True),
+            UpdateOne(key, [{"$set": values}]),
+        ]
+    if operations:
+        await model.get_motor_collection().bulk_write(operations)
+
+
+_kpi_rollup_service_instance: Optional[KpiRollupService] = None
+
+
+def get_kpi_rollup_service() -> Optional[KpiRollupService]:
+    """Liefert den Rollup-Dienst oder ``None`` im direkten Layout."""
+    global _kpi_rollup_service_instance
+    if ingestion_layout.direct:
+        return None
+    if _kpi_rollup_service_instance is None:
+        _kpi_rollup_service_instance = KpiRollupService(
+            ingestion_layout, ingestion_rollup_interval
+        )
+    return _kpi_rollup_service_instance
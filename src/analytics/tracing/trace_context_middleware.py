@@ -1,31 +1,57 @@
 # src/analytics/logging/trace_context_middleware.py
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.types import ASGIApp
-from analytics.tracing.trace_context import TraceContext
+from opentelemetry import trace
+from opentelemetry.propagate import extract
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
 from analytics.tracing.trace_context_util import TraceContextUtil
-from loguru import logger
-
-
-class TraceContextMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-
-    async def dispatch(self, request: Request, call_next):
-        trace_ctx = TraceContextUtil.from_current_span()
-        TraceContextUtil.set(trace_ctx)  # 💡 jetzt automatisch gesetzt
-        logger.debug("🧠 TraceContext gesetzt: {}", trace_ctx)
-        response = await call_next(request)
-        return response
-
-    async def dispatch2(self, request: Request, call_next):
-        trace_id = request.headers.get("x-trace-id", "")
-        span_id = request.headers.get("x-span-id", "")
-        logger.debug(
-            "🧠 TraceContext gesetzt: trace_id={}, span_id={}", trace_id, span_id
-        )
-        TraceContextUtil.set(TraceContext(trace_id=trace_id, span_id=span_id))
-
-        # TraceContextUtil.set(trace_ctx)  # 💡 jetzt automatisch gesetzt
-        response = await call_next(request)
-        return response
+
+
+class TraceContextMiddleware:
+    """
+    Reine ASGI-Middleware für das Tracing eingehender HTTP-Requests.
+
+    Startet genau einen Server-Span pro Request (Eltern-Kontext aus den
+    W3C-/B3-Headern) und setzt den ``TraceContextUtil``-Kontext. Request und
+    Response werden unverändert durchgereicht, Streaming-Responses bleiben
+    Streaming-Responses.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._tracer = trace.get_tracer(__name__)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        with self._tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=extract(Headers(scope=scope)),
+            kind=SpanKind.SERVER,
+            attributes={
+                "http.method": method,
+                "http.scheme": scope.get("scheme", "http"),
+                "http.target": scope["path"],
+            },
+        ) as span:
+            TraceContextUtil.set(TraceContextUtil.from_current_span())
+
+            async def send_with_status(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    span.set_attribute("http.status_code", status_code)
+                    if status_code >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                if route is not None and hasattr(route, "path"):
+                    span.update_name(f"{method} {route.path}")
+                    span.set_attribute("http.route", route.path)
@@ -0,0 +1,28 @@
+"""
+Gemeinsame Test-Konfiguration.
+
+``analytics.config.env`` liest Pflicht-Variablen schon beim Import; für Tests ohne
+Keycloak, MongoDB und Kafka genügen Platzhalter, gesetzte Werte bleiben erhalten.
+"""
+
+import os
+
+for _name, _value in {
+    "KC_SERVICE_HOST": "localhost",
+    "KC_SERVICE_PORT": "8080",
+    "KC_SERVICE_REALM": "test",
+    "KC_SERVICE_CLIENT_ID": "analytics",
+    "KC_SERVICE_SECRET": "test",
+    "CLIENT_SECRET": "test",
+    "APP_ENV": "test",
+    "EXCEL_EXPORT_ENABLED": "false",
+    "MONGO_DB_USER_NAME": "test",
+    "MONGO_DB_USER_PASSWORT": "test",
+    "MONGO_DB_URI": "mongodb://localhost:27017",
+    "MONGO_DB_DATABASE": "analytics_test",
+    "EXPORT_FORMAT": "csv",
+    "KAFKA_URI": "localhost:9092",
+    "TEMPO_URI": "http://localhost:4317",
+    "KEYS_PATH": "keys",
+}.items():
+    os.environ.setdefault(_name, _value)
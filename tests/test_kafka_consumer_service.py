@@ -0,0 +1,83 @@
+"""
+Fehlerpfade der Lane-Stufen des ``KafkaConsumerService`` ohne Kafka und MongoDB.
+"""
+
+from types import SimpleNamespace
+
+from aiokafka import TopicPartition
+
+from analytics.messaging.kafka_consumer_service import KafkaConsumerService
+from analytics.messaging.kafka_event_dispatcher import KafkaEventDispatcher
+from analytics.messaging.kpi_dedup import EVENT_ID_HEADER, KpiDeduplicator
+
+TOPIC = "analytics.test"
+
+
+class _Producer:
+    def __init__(self) -> None:
+        self.published: list[tuple[str, bytes, dict]] = []
+
+    async def publish(self, topic, payload, trace_ctx=None, headers=None) -> None:
+        self.published.append((topic, payload, dict(headers or ())))
+
+
+class _Committer:
+    def __init__(self) -> None:
+        self.offsets: list[tuple[TopicPartition, int]] = []
+
+    def track(self, tp: TopicPartition, offset: int, events: int = 1) -> None:
+        self.offsets.append((tp, offset))
+
+
+def _service(handler) -> tuple[KafkaConsumerService, _Producer]:
+    dispatcher = KafkaEventDispatcher()
+    dispatcher.register(TOPIC, handler)
+    producer = _Producer()
+    service = KafkaConsumerService(dispatcher, [TOPIC], producer=producer)
+    service._dedup = KpiDeduplicator(window=16, capacity=64)
+    service._committer = _Committer()
+    return service, producer
+
+
+def _message(offset: int = 7) -> SimpleNamespace:
+    return SimpleNamespace(
+        topic=TOPIC,
+        partition=0,
+        offset=offset,
+        headers=[(EVENT_ID_HEADER, b"event-1")],
+        value=b'{"id": 1}',
+    )
+
+
+async def test_failing_handler_is_dead_lettered_and_not_confirmed() -> None:
+    async def handler(event: dict) -> list:
+        raise RuntimeError("kaputt")
+
+    service, producer = _service(handler)
+    msg = _message()
+
+    await service._write(await service._prepare(msg))
+
+    assert [(t, p) for t, p, _ in producer.published] == [
+        (f"{TOPIC}.dlq", msg.value)
+    ]
+    headers = producer.published[0][2]
+    assert headers["x-dlq-offset"] == msg.offset
+    assert "kaputt" in headers["x-dlq-error"]
+    # Offset rückt vor, der Schlüssel bleibt aber unbestätigt
+    assert service._committer.offsets == [(TopicPartition(TOPIC, 0), msg.offset)]
+    assert not service._dedup.seen(service._event_key(msg))
+
+
+async def test_handled_event_is_confirmed() -> None:
+    async def handler(event: dict) -> list:
+        return []
+
+    service, producer = _service(handler)
+    msg = _message()
+
+    await service._write(await service._prepare(msg))
+
+    assert producer.published == []
+    assert service._committer.offsets == [(TopicPartition(TOPIC, 0), msg.offset)]
+    assert service._dedup.seen(service._event_key(msg))
@@ -0,0 +1,157 @@
+"""
+Korrektheit von ``KpiBucketKeys`` gegen ``datetime.fromisoformat``/``astimezone``.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Final, Optional
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from analytics.messaging.kpi_bucket_key import BucketKey, KpiBucketKeys
+
+ZONES: Final = [
+    None,
+    timezone.utc,
+    timezone(timedelta(hours=-3)),
+    ZoneInfo("Europe/Berlin"),
+    ZoneInfo("America/New_York"),
+    ZoneInfo("Asia/Kolkata"),
+    ZoneInfo("Australia/Lord_Howe"),
+    ZoneInfo("Pacific/Kiritimati"),
+]
+OFFSETS: Final = [
+    "",
+    "Z",
+    "+00:00",
+    "+01:00",
+    "-05:00",
+    "+05:30",
+    "+05:45",
+    "-03:30",
+    "+14:00",
+    "-12:00",
+    "+0100",
+    "+02",
+]
+INVALID: Final = [
+    "",
+    "nope",
+    "2024-05-01T12:30:00+25:00",
+    "2024-05-01T12:30:00+24:00",
+    "2024-05-01T12:30:00+1:00",
+    "2024-05-01T25:00:00",
+    "2024-13-01T12:00:00Z",
+    "2024-02-30T12:00:00Z",
+]
+INVALID_CLOCK: Final = [
+    "2024-05-01T12:99:99",
+    "2024-05-01T12:60",
+    "2024-05-01T12:30:61Z",
+    "2024-05-01T12:30:00Zx",
+    "2024-05-01T12:30:00.",
+]
+"""Ungültig nur nach dem Präfix; erkannt, solange Präfix und Offset neu sind."""
+
+
+def reference(value: str, zone: Optional[tzinfo]) -> BucketKey:
+    dt = datetime.fromisoformat(value)
+    if zone is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(zone)
+    return BucketKey(dt.year, dt.month, dt.day, dt.hour)
+
+
+def timestamps(seed: int, count: int) -> list[str]:
+    """Zufällige Zeitstempel, gehäuft an Monatsgrenzen und in DST-Nächten."""
+    rnd = random.Random(seed)
+    start = datetime(2019, 1, 1)
+    values = []
+    for _ in range(count):
+        dt = start + timedelta(seconds=rnd.randrange(8 * 365 * 86400))
+        if rnd.random() < 0.3:
+            dt = dt.replace(
+                day=rnd.choice([1, 28]), hour=rnd.choice([0, 1, 2, 3, 22, 23])
+            )
+        fraction = rnd.choice(["", ".5", ".123", ".123456"])
+        seconds = dt.strftime(":%S") if fraction or rnd.random() < 0.5 else ""
+        value = dt.strftime("%Y-%m-%dT%H:%M") + seconds + fraction
+        value += rnd.choice(OFFSETS)
+        if rnd.random() < 0.05:
+            value = value.replace("T", " ")
+        values.append(value)
+    return values
+
+
+@pytest.mark.parametrize("zone", ZONES, ids=str)
+def test_key_matches_fromisoformat(zone: Optional[tzinfo]) -> None:
+    keys = KpiBucketKeys(zone)
+    for value in timestamps(seed=1, count=20_000):
+        assert keys.key(value) == reference(value, zone), value
+
+
+@pytest.mark.parametrize("zone", ZONES, ids=str)
+def test_keys_matches_key(zone: Optional[tzinfo]) -> None:
+    values = timestamps(seed=2, count=5_000)
+    expected = [reference(v, zone) for v in values]
+    # Einmal kalt, einmal mit gefülltem Cache
+    assert KpiBucketKeys(zone).keys(values) == expected
+    keys = KpiBucketKeys(zone)
+    keys.keys(values)
+    assert keys.keys(values) == expected
+
+
+@pytest.mark.parametrize("zone", ZONES, ids=str)
+def test_datetime_and_other_formats(zone: Optional[tzinfo]) -> None:
+    keys = KpiBucketKeys(zone)
+    dt = datetime(2024, 3, 31, 1, 30, tzinfo=timezone.utc)
+    assert keys.key(dt) == reference(dt.isoformat(), zone)
+    assert keys.keys([dt]) == [reference(dt.isoformat(), zone)]
+    for value in ["2025-03-04", "2025-03-04T10", "20250304T101112Z"]:
+        assert keys.key(value) == reference(value, zone), value
+
+
+@pytest.mark.parametrize("zone", ZONES, ids=str)
+@pytest.mark.parametrize("value", INVALID)
+def test_invalid_rejected_with_warm_cache(
+    zone: Optional[tzinfo], value: str
+) -> None:
+    keys = KpiBucketKeys(zone)
+    # Gleiches Präfix und gleicher Offset liegen bereits im Cache
+    keys.key("2024-05-01T12:00:00+00:00")
+    keys.key("2024-05-01T12:00:00Z")
+    keys.key("2024-05-01T12:00:00")
+    with pytest.raises(ValueError):
+        datetime.fromisoformat(value)
+    with pytest.raises(ValueError):
+        keys.key(value)
+    with pytest.raises(ValueError):
+        keys.keys(["2024-05-01T12:00:00Z", value])
+
+
+@pytest.mark.parametrize("order", [1, -1], ids=["forward", "backward"])
+def test_cache_independent_of_order_across_dst_change(order: int) -> None:
+    # Lord Howe wechselt um 15:30 UTC von +10:30 auf +11:00, mitten in der Stunde
+    zone = ZoneInfo("Australia/Lord_Howe")
+    values = [
+        "2023-09-30T15:10:00Z",
+        "2023-09-30T15:29:59Z",
+        "2023-09-30T15:30:00Z",
+        "2023-09-30T15:40:00Z",
+    ][::order]
+    keys = KpiBucketKeys(zone)
+    for _ in range(2):
+        assert keys.keys(values) == [reference(v, zone) for v in values]
+
+
+@pytest.mark.parametrize("zone", ZONES, ids=str)
+@pytest.mark.parametrize("value", INVALID_CLOCK)
+def test_invalid_clock_rejected_with_cold_cache(
+    zone: Optional[tzinfo], value: str
+) -> None:
+    with pytest.raises(ValueError):
+        datetime.fromisoformat(value)
+    with pytest.raises(ValueError):
+        KpiBucketKeys(zone).key(value)
+    with pytest.raises(ValueError):
+        KpiBucketKeys(zone).keys([value])
@@ -0,0 +1,60 @@
+"""
+Wiederanlauf des ``KpiDeduplicator`` aus Snapshot und Schlüssel-Log.
+"""
+
+from pathlib import Path
+
+from analytics.messaging.kpi_dedup import KpiDeduplicator
+
+
+def _dedup(path: Path) -> KpiDeduplicator:
+    dedup = KpiDeduplicator(window=16, capacity=64, path=str(path))
+    dedup.load()
+    return dedup
+
+
+def test_confirmed_keys_survive_crash_before_commit(tmp_path: Path) -> None:
+    path = tmp_path / "dedup.bin"
+    dedup = _dedup(path)
+    dedup.reserve(1)
+    dedup.reserve(2)
+    dedup.confirm([1])
+    # Absturz nach dem KPI-Write, aber vor save() und dem Offset-Commit
+
+    restarted = _dedup(path)
+
+    # Das erneut zugestellte Event wird erkannt, das ungeschriebene nicht
+    assert restarted.seen(1)
+    assert not restarted.seen(2)
+
+
+def test_save_compacts_log_into_snapshot(tmp_path: Path) -> None:
+    path = tmp_path / "dedup.bin"
+    log = tmp_path / "dedup.bin.log"
+    dedup = _dedup(path)
+    dedup.confirm([1, 2])
+    dedup.save()
+    assert log.stat().st_size == 0
+    dedup.confirm([3])
+    dedup.close()
+
+    restarted = _dedup(path)
+
+    assert all(restarted.seen(key) for key in (1, 2, 3))
+
+
+def test_torn_log_entry_is_dropped(tmp_path: Path) -> None:
+    path = tmp_path / "dedup.bin"
+    log = tmp_path / "dedup.bin.log"
+    dedup = _dedup(path)
+    dedup.confirm([1])
+    dedup.close()
+    with log.open("ab") as f:
+        f.write(b"\x02" * 5)
+
+    restarted = _dedup(path)
+    restarted.confirm([3])
+    restarted.close()
+
+    assert _dedup(path).seen(3)
+    assert log.stat().st_size == 32
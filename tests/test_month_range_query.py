@@ -0,0 +1,81 @@
+"""
+``build_month_range_query`` gegen den früheren ``$expr``-Filter mit ``$dateFromParts``.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from typing import Final
+
+import mongomock
+import pytest
+
+from analytics.graphql.filters import KpiFilter
+from analytics.graphql.query import build_filter_query, build_month_range_query
+
+YEARS: Final = range(2018, 2027)
+
+
+@pytest.fixture(scope="module")
+def collection() -> mongomock.Collection:
+    collection = mongomock.MongoClient().analytics.kpis
+    collection.insert_many(
+        [{"year": year, "month": month} for year in YEARS for month in range(1, 13)]
+    )
+    return collection
+
+
+def expr_query(from_date: date, to_date: date) -> dict:
+    """Der Filter vor der Umstellung auf Bereichsprädikate."""
+    first_day = {"$dateFromParts": {"year": "$year", "month": "$month"}}
+    return {
+        "$expr": {
+            "$and": [
+                {"$gte": [first_day, datetime.combine(from_date, datetime.min.time())]},
+                {"$lte": [first_day, datetime.combine(to_date, datetime.min.time())]},
+            ]
+        }
+    }
+
+
+def months(collection: mongomock.Collection, query: dict) -> set[tuple[int, int]]:
+    return {(d["year"], d["month"]) for d in collection.find(query)}
+
+
+def random_dates(seed: int, count: int) -> list[tuple[date, date]]:
+    """Zufällige Zeiträume, gehäuft an Monats- und Jahresgrenzen."""
+    rnd = random.Random(seed)
+    start = date(YEARS.start - 1, 6, 1)
+    span = (date(YEARS.stop, 6, 1) - start).days
+    ranges = []
+    for _ in range(count):
+        bounds = []
+        for _ in range(2):
+            day = start + timedelta(days=rnd.randrange(span))
+            if rnd.random() < 0.3:
+                day = day.replace(day=1)
+            bounds.append(day)
+        if rnd.random() < 0.8:
+            bounds.sort()
+        ranges.append((bounds[0], bounds[1]))
+    return ranges
+
+
+@pytest.mark.parametrize("from_date, to_date", random_dates(seed=4, count=500))
+def test_filter_matches_expr(
+    collection: mongomock.Collection, from_date: date, to_date: date
+) -> None:
+    query = build_filter_query(KpiFilter(from_date=from_date, to_date=to_date))
+    assert "$expr" not in query
+    assert months(collection, query) == months(
+        collection, expr_query(from_date, to_date)
+    )
+
+
+def test_month_range_bounds_inclusive(collection: mongomock.Collection) -> None:
+    rnd = random.Random(5)
+    all_months = [(y, m) for y in YEARS for m in range(1, 13)]
+    for _ in range(300):
+        first, last = rnd.choice(all_months), rnd.choice(all_months)
+        expected = {month for month in all_months if first <= month <= last}
+        query = build_month_range_query(first, last)
+        assert months(collection, query) == expected, (first, last)
@@ -0,0 +1,65 @@
+"""
+Zugriffsschutz der Admin-Pfade des KPI-Lesemodells ohne Keycloak und MongoDB.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from analytics.router import read_model_router
+from analytics.security.keycloak_service import KeycloakService
+
+
+class _ReadModel:
+    def __init__(self, differences: list) -> None:
+        self.differences = differences
+        self.reloads = 0
+
+    async def verify(self) -> list:
+        return self.differences
+
+    async def reload(self) -> None:
+        self.reloads += 1
+
+
+def _client(monkeypatch: pytest.MonkeyPatch, roles: list[str] | None) -> TestClient:
+    async def from_request(request):
+        if roles is None:
+            return None
+        return KeycloakService(request, "token", {"realm_access": {"roles": roles}})
+
+    monkeypatch.setattr(KeycloakService, "from_request", from_request)
+    app = FastAPI()
+    app.include_router(read_model_router.router)
+    return TestClient(app)
+
+
+def _use(monkeypatch: pytest.MonkeyPatch, read_model: _ReadModel) -> None:
+    monkeypatch.setattr(read_model_router, "get_kpi_read_model", lambda: read_model)
+
+
+@pytest.mark.parametrize(("roles", "status_code"), [(None, 401), (["user"], 403)])
+def test_requires_admin_role(monkeypatch, roles, status_code) -> None:
+    read_model = _ReadModel([{"kpi": "x"}])
+    _use(monkeypatch, read_model)
+    client = _client(monkeypatch, roles)
+
+    assert client.get("/read-model/consistency").status_code == status_code
+    assert client.post("/read-model/reload").status_code == status_code
+    assert read_model.reloads == 0
+
+
+def test_consistency_does_not_reload(monkeypatch) -> None:
+    read_model = _ReadModel([{"kpi": "x"}])
+    _use(monkeypatch, read_model)
+    client = _client(monkeypatch, ["admin"])
+
+    response = client.get("/read-model/consistency", params={"reload": "true"})
+
+    assert response.json() == {"consistent": False, "differences": [{"kpi": "x"}]}
+    assert read_model.reloads == 0
+    assert client.post("/read-model/reload").status_code == 200
+    assert read_model.reloads == 1
+    assert client.get("/read-model/reload").status_code == 405